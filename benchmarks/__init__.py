@@ -0,0 +1,11 @@
+"""Performance benchmarks for the translator
+
+They aren't installed with the package. Run them from the root of a source checkout, which has the ``examples``
+directory they read, e.g.::
+
+    python -m benchmarks.phases -o results.json
+    python -m benchmarks.foundations
+"""
+import pathlib
+
+exampledir = pathlib.Path(__file__).resolve().parent.parent / 'examples'
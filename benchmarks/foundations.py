@@ -0,0 +1,79 @@
+"""Benchmark sorting a house with many foundations by area
+
+Compares computing each foundation's area once in ``sort_foundations`` against the previous approach of computing
+it once as the sort key and again for the floor areas. Results are printed as JSON.
+
+    python -m benchmarks.foundations -n 48
+"""
+import argparse
+from copy import deepcopy
+import json
+import sys
+import timeit
+
+from hescorehpxml import HPXMLtoHEScoreTranslator
+from . import exampledir
+
+
+def make_many_foundations_house(n_foundations):
+    """Make a translator for an HPXML v3 house with ``n_foundations`` slab foundations of different areas"""
+    tr = HPXMLtoHEScoreTranslator(str(exampledir / 'house3_v3.xml'))
+    fnd = tr.xpath(tr.hpxmldoc, '//h:Foundation', raise_err=True)
+    slab = tr.xpath(tr.hpxmldoc, '//h:Slab', raise_err=True)
+    area = tr.addns('h:Area')
+    for i in range(n_foundations - 1, -1, -1):
+        new_slab = deepcopy(slab)
+        for el in new_slab.iter(tr.addns('h:SystemIdentifier')):
+            el.set('id', '{}_{}'.format(el.get('id'), i))
+        new_slab[0].addnext(new_slab.makeelement(area))
+        new_slab[1].text = str(100 + (i * 37) % 500)
+        slab.addnext(new_slab)
+        new_fnd = deepcopy(fnd)
+        new_fnd.find(tr.addns('h:SystemIdentifier')).set('id', 'fnd1_{}'.format(i))
+        new_fnd.find(tr.addns('h:AttachedToSlab')).set('idref', 'slab1_{}'.format(i))
+        fnd.addnext(new_fnd)
+    fnd.getparent().remove(fnd)
+    slab.getparent().remove(slab)
+    tr.invalidate()
+    return tr
+
+
+def sort_foundations_twice(tr, foundations, ctx):
+    """The previous approach: compute the areas as the sort key and again for the floor areas"""
+    def get_fnd_area(fnd):
+        return tr.get_foundation_area(fnd, ctx)
+
+    foundations = sorted(foundations, key=get_fnd_area, reverse=True)
+    return foundations, list(map(get_fnd_area, foundations))
+
+
+def run(n_foundations=48, number=20, repeat=5):
+    tr = make_many_foundations_house(n_foundations)
+    ctx = next(tr.get_building_contexts())
+    foundations = tr.xpath(ctx.building, 'descendant::h:Foundations/h:Foundation', aslist=True)
+    assert tr.sort_foundations(foundations, ctx) == sort_foundations_twice(tr, foundations, ctx)
+
+    def time_it(func):
+        times = timeit.repeat(func, number=number, repeat=repeat)
+        return {'best_s': min(times) / number, 'mean_s': sum(times) / len(times) / number}
+
+    results = {'n_foundations': n_foundations, 'number': number, 'repeat': repeat}
+    results['sort_foundations'] = time_it(lambda: tr.sort_foundations(foundations, ctx))
+    results['sort_foundations_twice'] = time_it(lambda: sort_foundations_twice(tr, foundations, ctx))
+    results['get_building_zone_floor'] = time_it(lambda: tr.get_building_zone_floor(ctx, {}))
+    results['speedup'] = results['sort_foundations_twice']['best_s'] / results['sort_foundations']['best_s']
+    return results
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--n-foundations', type=int, default=48, help='Number of foundations. Default: 48.')
+    parser.add_argument('--number', type=int, default=20, help='Calls per timing. Default: 20.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timings. Default: 5.')
+    args = parser.parse_args(argv)
+    json.dump(run(args.n_foundations, args.number, args.repeat), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Time each phase of translating the example houses, scaled up versions of them, and synthetic houses
+
+The phases are parsing, HPXML schema validation, each get_building_* stage of the translation, HEScore JSON schema
+validation, and serializing the result. Results are written as JSON so they can be compared between releases.
+
+    python -m benchmarks.phases -o results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from lxml import etree
+
+from hescorehpxml.base import HPXMLtoHEScoreTranslatorBase, get_hescore_json_validator, parse_hpxml
+from hescorehpxml import get_translator_class
+from hescorehpxml.resultcache import get_package_version
+from . import exampledir
+from .scaleup import SCALEUP_EXAMPLES, get_scaled_example
+from .synthetic import generate_house
+
+STAGES = (
+    'get_building_address',
+    'get_hpwes',
+    'get_building_about',
+    'get_building_zone_floor',
+    'get_building_zone_roof',
+    'get_skylights',
+    'get_building_zone_wall',
+    'get_hvac',
+    'get_systems_dhw',
+    'get_generation',
+    'validate_hescore_inputs',
+)
+
+
+def timed_method(method, timings, name):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings[name] = timings.get(name, 0.) + time.perf_counter() - start
+    return wrapper
+
+
+def time_translation(hpxml_bytes):
+    """Translate a document once and time each phase
+
+    :param hpxml_bytes: HPXML document
+    :returns: dict of phase name to seconds
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    # The same parser and options as the translators use
+    hpxmldoc = parse_hpxml(hpxml_bytes)
+    timings['parse'] = time.perf_counter() - start
+
+    tr = get_translator_class(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmldoc))(hpxmldoc, validate='never')
+    start = time.perf_counter()
+    tr.schema.assertValid(hpxmldoc)
+    timings['xsd_validate'] = time.perf_counter() - start
+
+    # Time the stages by shadowing the methods on the instance
+    for name in STAGES:
+        setattr(tr, name, timed_method(getattr(tr, name), timings, name))
+    start = time.perf_counter()
+    hescore_bldg = tr.hpxml_to_hescore()
+    # This includes the stages and another JSON schema validation
+    timings['translate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    error = next(get_hescore_json_validator().iter_errors(hescore_bldg), None)
+    timings['json_validate'] = time.perf_counter() - start
+    assert error is None
+
+    start = time.perf_counter()
+    json.dumps(hescore_bldg, indent=2)
+    timings['serialize'] = time.perf_counter() - start
+    return timings
+
+
+def get_cases(scale_factors=(10, 100), synthetic_sizes=(100, 1000)):
+    """List (name, HPXML bytes) for every example, the scaled up houses, and the synthetic houses"""
+    cases = []
+    for filename in sorted(exampledir.glob('*.xml')):
+        cases.append((filename.stem, filename.read_bytes()))
+    for filebase in SCALEUP_EXAMPLES:
+        for factor in scale_factors:
+            cases.append(('{}_x{}'.format(filebase, factor), etree.tostring(get_scaled_example(filebase, factor))))
+    for hpxml_version in (2, 3):
+        for size in synthetic_sizes:
+            cases.append((
+                'synthetic_v{}_s{}'.format(hpxml_version, size),
+                etree.tostring(generate_house(size, hpxml_version=hpxml_version))
+            ))
+    return cases
+
+
+def run_case(hpxml_bytes, repeat=5):
+    """Time a translation ``repeat`` times and summarize each phase"""
+    runs = [time_translation(hpxml_bytes) for _ in range(repeat)]
+    phases = {}
+    for name in runs[0]:
+        times = [x[name] for x in runs]
+        phases[name] = {'min_s': min(times), 'median_s': statistics.median(times)}
+    return phases
+
+
+def run(repeat=5, scale_factors=(10, 100), synthetic_sizes=(100, 1000), pattern=None):
+    get_hescore_json_validator()
+    results = {
+        'hescorehpxml_version': get_package_version(),
+        'python_version': platform.python_version(),
+        'lxml_version': '.'.join(map(str, etree.LXML_VERSION)),
+        'repeat': repeat,
+        'cases': {},
+    }
+    for name, hpxml_bytes in get_cases(scale_factors, synthetic_sizes):
+        if pattern is not None and pattern not in name:
+            continue
+        case = {
+            'bytes': len(hpxml_bytes),
+            'elements': sum(1 for _ in etree.fromstring(hpxml_bytes).iter(etree.Element)),
+        }
+        try:
+            case['phases'] = run_case(hpxml_bytes, repeat)
+        except Exception as ex:
+            case['error'] = '{}: {}'.format(type(ex).__name__, ex)
+        results['cases'][name] = case
+    return results
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-o', '--output',
+        type=argparse.FileType('w'),
+        default=sys.stdout,
+        help='Filename of output file in json format. If not provided, will go to stdout.'
+    )
+    parser.add_argument('--repeat', type=int, default=5, help='Number of times to translate each house. Default: 5.')
+    parser.add_argument(
+        '--scale',
+        type=int,
+        nargs='*',
+        default=[10, 100],
+        help='Factors to scale up the houses in {} by. Default: 10 100.'.format(', '.join(SCALEUP_EXAMPLES))
+    )
+    parser.add_argument(
+        '--synthetic',
+        type=int,
+        nargs='*',
+        default=[100, 1000],
+        help='Sizes of synthetic houses to generate. Default: 100 1000.'
+    )
+    parser.add_argument('-k', dest='pattern', help='Only run cases with names containing this.')
+    args = parser.parse_args(argv)
+    json.dump(run(args.repeat, args.scale, args.synthetic, args.pattern), args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Make bigger versions of the example houses for benchmarking"""
+from copy import deepcopy
+from lxml import etree
+
+from hescorehpxml import get_translator_class
+from hescorehpxml.base import HPXMLtoHEScoreTranslatorBase
+from . import exampledir
+
+# Examples that still translate when their surfaces and systems are multiplied
+SCALEUP_EXAMPLES = ('house4', 'house6_v3')
+
+SCALED_ELEMENTS = (
+    'Attic', 'Roof', 'Wall', 'FrameFloor', 'Window', 'HeatingSystem', 'CoolingSystem', 'HeatPump', 'HVACDistribution'
+)
+DIVIDED_ELEMENTS = ('Area', 'RoofArea', 'FractionHeatLoadServed', 'FractionCoolLoadServed', 'FloorAreaServed')
+
+
+def scale_up_house(hpxmldoc, factor):
+    """Multiply the attics, roofs, walls, attic floors, windows and HVAC systems in the first building
+
+    Each element gets ``factor - 1`` copies with new ids, and references between copies are updated to point at
+    each other. Areas and fractions served are divided by ``factor`` so the house still adds up the same. Walls
+    without an area get one since HEScore needs areas to combine walls. Frame floors attached to foundations are
+    left alone.
+
+    :param hpxmldoc: HPXML ``etree._ElementTree``, which is changed in place
+    :param factor: number of times to multiply the elements
+    :returns: hpxmldoc
+    """
+    ns = {'h': etree.QName(hpxmldoc.getroot()).namespace}
+
+    def tag(name):
+        return etree.QName(ns['h'], name).text
+
+    b = hpxmldoc.getroot().find('h:Building', ns)
+    fnd_idrefs = set(b.xpath('descendant::h:Foundation//@idref', namespaces=ns))
+    scaled = []
+    for name in SCALED_ELEMENTS:
+        for el in b.iter(tag(name)):
+            if el.getparent().tag == tag('AtticType'):
+                continue
+            sysid = el.find('h:SystemIdentifier', ns)
+            if sysid is not None and sysid.get('id') in fnd_idrefs:
+                continue
+            scaled.append(el)
+
+    for el in scaled:
+        if el.tag == tag('Wall') and el.find('h:Area', ns) is None:
+            area = el.makeelement(tag('Area'))
+            area.text = '1000'
+            el.find('h:WallType', ns).addnext(area)
+        for name in DIVIDED_ELEMENTS:
+            for divided_el in el.findall('h:' + name, ns):
+                divided_el.text = repr(float(divided_el.text) / factor)
+
+    for i in range(factor - 1, 0, -1):
+        new_ids = {}
+        copies = []
+        for el in scaled:
+            new_el = deepcopy(el)
+            for sysid in new_el.iter(tag('SystemIdentifier')):
+                new_ids[sysid.get('id')] = '{}_x{}'.format(sysid.get('id'), i)
+                sysid.set('id', new_ids[sysid.get('id')])
+            copies.append((el, new_el))
+        for el, new_el in copies:
+            for ref in new_el.xpath('descendant-or-self::*[@idref]'):
+                ref.set('idref', new_ids.get(ref.get('idref'), ref.get('idref')))
+            el.addnext(new_el)
+    return hpxmldoc
+
+
+def get_scaled_example(filebase, factor):
+    """Parse an example file and scale it up, checking that it is still valid HPXML"""
+    hpxmldoc = etree.parse(str(exampledir / (filebase + '.xml')))
+    scale_up_house(hpxmldoc, factor)
+    translator_class = get_translator_class(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmldoc))
+    translator_class.load_schema().schema.assertValid(hpxmldoc)
+    return hpxmldoc
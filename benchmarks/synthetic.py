@@ -0,0 +1,351 @@
+"""Generate large synthetic HPXML houses for load and scaling tests
+
+The houses are made deterministically from a seed and a size and are valid against the bundled HPXML v2.3 or v3.1
+schema. ``size`` is the number of walls, windows, skylights, attics (each with a roof and attic floor), and
+heating and cooling systems. There is one foundation for every 10.
+
+    python -m benchmarks.synthetic --size 1000 -n 5 -o path/to/dir
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from lxml import etree
+from lxml.builder import ElementMaker
+
+from hescorehpxml import get_translator_class
+from hescorehpxml.base import HPXMLtoHEScoreTranslatorBase
+
+NAMESPACES = {
+    2: 'http://hpxmlonline.com/2014/6',
+    3: 'http://hpxmlonline.com/2019/10',
+}
+SCHEMA_VERSIONS = {
+    2: '2.3',
+    3: '3.1',
+}
+ROOF_TYPES = ('asphalt or fiberglass shingles', 'wood shingles or shakes', 'slate or tile shingles')
+ORIENTATIONS = ('north', 'northeast', 'east', 'southeast', 'south', 'southwest', 'west', 'northwest')
+
+
+def num(x):
+    return '{:.6g}'.format(x)
+
+
+class HouseGenerator(object):
+    """Builds one synthetic HPXML house, see :func:`generate_house`"""
+
+    def __init__(self, size, seed, hpxml_version):
+        if hpxml_version not in NAMESPACES:
+            raise ValueError('hpxml_version must be one of {}'.format(', '.join(map(str, NAMESPACES))))
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self.size = size
+        self.hpxml_version = hpxml_version
+        self.rng = random.Random(seed)
+        self.E = ElementMaker(namespace=NAMESPACES[hpxml_version], nsmap={None: NAMESPACES[hpxml_version]})
+
+    def sysid(self, id_):
+        return self.E.SystemIdentifier(id=id_)
+
+    def insulation(self, tag, id_, rvalue):
+        E = self.E
+        return getattr(E, tag)(self.sysid(id_), E.Layer(E.NominalRValue(str(rvalue))))
+
+    def split(self, total, n):
+        """Split an area into ``n`` random parts that add up to it"""
+        weights = [self.rng.uniform(1, 2) for _ in range(n)]
+        total_weight = sum(weights)
+        return [total * x / total_weight for x in weights]
+
+    def make(self):
+        E = self.E
+        rng = self.rng
+        n = self.size
+        v3 = self.hpxml_version == 3
+        front = rng.randrange(0, 8, 2)
+        sides = [ORIENTATIONS[(front + 2 * i) % 8] for i in range(4)]
+
+        # Attics, roofs, and attic floors
+        conditioned_floor_area = rng.randint(1000, 4000)
+        attic_areas = self.split(conditioned_floor_area, n)
+        roofs, attics, attic_floors = [], [], []
+        for i, attic_area in enumerate(attic_areas, 1):
+            roof_color = rng.choice(('light', 'medium', 'medium dark', 'dark', 'reflective'))
+            roof_type = rng.choice(ROOF_TYPES)
+            if v3:
+                roofs.append(E.Roof(
+                    self.sysid('roof{}'.format(i)),
+                    E.Area(num(attic_area * 1.1)),
+                    E.RoofType(roof_type),
+                    E.RoofColor(roof_color),
+                    E.RadiantBarrier('false'),
+                    self.insulation('Insulation', 'roof{}ins'.format(i), 0),
+                ))
+                attics.append(E.Attic(
+                    self.sysid('attic{}'.format(i)),
+                    E.AtticType(E.Attic(E.Vented('true'))),
+                    E.AttachedToRoof(idref='roof{}'.format(i)),
+                    E.AttachedToFrameFloor(idref='atticfloor{}'.format(i)),
+                ))
+                attic_floors.append(E.FrameFloor(
+                    self.sysid('atticfloor{}'.format(i)),
+                    E.Area(num(attic_area)),
+                    self.insulation('Insulation', 'atticfloor{}ins'.format(i), rng.choice((0, 11, 19, 30, 38, 49))),
+                ))
+            else:
+                roofs.append(E.Roof(
+                    self.sysid('roof{}'.format(i)),
+                    E.RoofColor(roof_color),
+                    E.RoofType(roof_type),
+                    E.RoofArea(num(attic_area * 1.1)),
+                ))
+                attics.append(E.Attic(
+                    self.sysid('attic{}'.format(i)),
+                    E.AttachedToRoof(idref='roof{}'.format(i)),
+                    E.AtticType('vented attic'),
+                    self.insulation('AtticFloorInsulation', 'atticfloor{}ins'.format(i),
+                                    rng.choice((0, 11, 19, 30, 38, 49))),
+                    self.insulation('AtticRoofInsulation', 'roof{}ins'.format(i), 0),
+                    E.Area(num(attic_area)),
+                ))
+
+        # Foundations, all slabs
+        n_foundations = max(1, n // 10)
+        slab_areas = self.split(conditioned_floor_area, n_foundations)
+        foundations, slabs = [], []
+        for i, slab_area in enumerate(slab_areas, 1):
+            slab = E.Slab(
+                self.sysid('slab{}'.format(i)),
+                E.Area(num(slab_area)),
+                self.insulation('PerimeterInsulation', 'slab{}ins'.format(i), rng.choice((0, 5, 10))),
+            )
+            if v3:
+                slabs.append(slab)
+                foundations.append(E.Foundation(
+                    self.sysid('fnd{}'.format(i)),
+                    E.FoundationType(E.SlabOnGrade()),
+                    E.AttachedToSlab(idref='slab{}'.format(i)),
+                ))
+            else:
+                foundations.append(E.Foundation(
+                    self.sysid('fnd{}'.format(i)),
+                    E.FoundationType(E.SlabOnGrade()),
+                    slab,
+                ))
+
+        # Walls and the windows in them
+        # Every side needs at least one wall
+        n_walls = max(n, 4)
+        side_area = 4 * conditioned_floor_area ** 0.5 * rng.randint(8, 10) / 4
+        side_wall_areas = [iter(self.split(side_area, len(range(j, n_walls, 4)))) for j in range(4)]
+        walls, windows = [], []
+        for i in range(1, n_walls + 1):
+            orientation = sides[(i - 1) % 4]
+            wall_area = next(side_wall_areas[(i - 1) % 4])
+            walls.append(E.Wall(
+                self.sysid('wall{}'.format(i)),
+                E.ExteriorAdjacentTo('outside' if v3 else 'ambient'),
+                E.InteriorAdjacentTo('living space'),
+                E.WallType(E.WoodStud()),
+                E.Area(num(wall_area)),
+                E.Orientation(orientation),
+                E.Siding(rng.choice(('wood siding', 'stucco', 'vinyl siding', 'aluminum siding', 'brick veneer'))),
+                self.insulation('Insulation', 'wall{}ins'.format(i), rng.choice((0, 3, 7, 11, 13, 15, 19, 21))),
+            ))
+            windows.append(E.Window(
+                self.sysid('window{}'.format(i)),
+                E.Area(num(wall_area * rng.uniform(0.05, 0.2))),
+                E.Orientation(orientation),
+                E.UFactor('{:.2f}'.format(rng.uniform(0.2, 1.0))),
+                E.SHGC('{:.2f}'.format(rng.uniform(0.2, 0.8))),
+                E.AttachedToWall(idref='wall{}'.format(i)),
+            ))
+
+        skylights = []
+        for i, skylight_area in enumerate(self.split(rng.randint(10, 50), n), 1):
+            skylights.append(E.Skylight(
+                self.sysid('skylight{}'.format(i)),
+                E.Area(num(skylight_area)),
+                E.UFactor('{:.2f}'.format(rng.uniform(0.2, 1.0))),
+                E.SHGC('{:.2f}'.format(rng.uniform(0.2, 0.8))),
+                E.AttachedToRoof(idref='roof{}'.format(rng.randint(1, n))),
+            ))
+
+        # HVAC, each heating and cooling system pair shares a duct system
+        heating_systems, cooling_systems, distributions = [], [], []
+        floor_area_served = num(conditioned_floor_area / n)
+        for i in range(1, n + 1):
+            heating_systems.append(E.HeatingSystem(
+                self.sysid('furnace{}'.format(i)),
+                E.YearInstalled(str(rng.randint(1980, 2020))),
+                E.DistributionSystem(idref='ducts{}'.format(i)),
+                E.HeatingSystemType(E.Furnace()),
+                E.HeatingSystemFuel(rng.choice(('natural gas', 'electricity', 'propane'))),
+                E.AnnualHeatingEfficiency(E.Units('AFUE'), E.Value('{:.2f}'.format(rng.uniform(0.78, 0.98)))),
+                E.FloorAreaServed(floor_area_served),
+            ))
+            cooling_systems.append(E.CoolingSystem(
+                self.sysid('centralair{}'.format(i)),
+                E.YearInstalled(str(rng.randint(1980, 2020))),
+                E.DistributionSystem(idref='ducts{}'.format(i)),
+                E.CoolingSystemType('central air conditioner' if v3 else 'central air conditioning'),
+                E.FloorAreaServed(floor_area_served),
+                E.AnnualCoolingEfficiency(E.Units('SEER'), E.Value(str(rng.randint(8, 20)))),
+            ))
+            distributions.append(E.HVACDistribution(
+                self.sysid('ducts{}'.format(i)),
+                E.DistributionSystemType(E.AirDistribution(E.Ducts(
+                    E.DuctInsulationRValue(str(rng.choice((0, 4, 6, 8)))),
+                    E.DuctLocation('living space' if v3 else 'conditioned space'),
+                    E.FractionDuctArea('1'),
+                ))),
+            ))
+
+        enclosure = [E.AirInfiltration(E.AirInfiltrationMeasurement(
+            self.sysid('infilt1'),
+            E.TypeOfInfiltrationMeasurement('blower door'),
+            E.HousePressure('50'),
+            E.BuildingAirLeakage(E.UnitofMeasure('ACH'), E.AirLeakage('{:.1f}'.format(rng.uniform(2, 15)))),
+        ))]
+        if v3:
+            enclosure += [
+                E.Attics(*attics),
+                E.Foundations(*foundations),
+                E.Roofs(*roofs),
+                E.Walls(*walls),
+                E.FrameFloors(*attic_floors),
+                E.Slabs(*slabs),
+            ]
+        else:
+            enclosure += [
+                E.AtticAndRoof(E.Roofs(*roofs), E.Attics(*attics)),
+                E.Foundations(*foundations),
+                E.Walls(*walls),
+            ]
+        enclosure += [E.Windows(*windows), E.Skylights(*skylights)]
+
+        building = E.Building(
+            E.BuildingID(id='bldg1'),
+            E.Site(
+                E.SiteID(id='bldg1site'),
+                E.Address(
+                    E.AddressType('street'),
+                    E.Address1('{} Synthetic Street'.format(rng.randint(1, 9999))),
+                    E.CityMunicipality('Golden'),
+                    E.StateCode('CO'),
+                    E.ZipCode('80401'),
+                ),
+            ),
+            E.ProjectStatus(E.EventType('audit'), E.Date('2020-01-01')),
+            E.BuildingDetails(
+                E.BuildingSummary(
+                    E.Site(E.OrientationOfFrontOfHome(sides[0])),
+                    E.BuildingConstruction(
+                        E.YearBuilt(str(rng.randint(1900, 2020))),
+                        E.ResidentialFacilityType('single-family detached'),
+                        E.NumberofConditionedFloorsAboveGrade('1'),
+                        E.AverageCeilingHeight(str(rng.randint(7, 12))),
+                        E.NumberofBedrooms(str(rng.randint(1, 10))),
+                        E.ConditionedFloorArea(str(conditioned_floor_area)),
+                    ),
+                ),
+                E.Enclosure(*enclosure),
+                E.Systems(
+                    E.HVAC(
+                        E.HVACPlant(*(heating_systems + cooling_systems)),
+                        *distributions
+                    ),
+                    E.WaterHeating(E.WaterHeatingSystem(
+                        self.sysid('dhw1'),
+                        E.FuelType('natural gas'),
+                        E.WaterHeaterType('storage water heater'),
+                        E.YearInstalled(str(rng.randint(1990, 2020))),
+                    )),
+                ),
+            ),
+        )
+        root = E.HPXML(
+            E.XMLTransactionHeaderInformation(
+                E.XMLType(),
+                E.XMLGeneratedBy('benchmarks.synthetic'),
+                E.CreatedDateAndTime('2020-01-01T00:00:00'),
+                E.Transaction('create'),
+            ),
+            E.SoftwareInfo(),
+            building,
+            schemaVersion=SCHEMA_VERSIONS[self.hpxml_version],
+        )
+        return etree.ElementTree(root)
+
+
+def generate_house(size=10, seed=0, hpxml_version=3, validate=True):
+    """Generate a synthetic HPXML house
+
+    :param size: number of walls, windows, skylights, attics, and heating and cooling systems
+    :param seed: random seed, the same seed and size always give the same house
+    :param hpxml_version: 2 for HPXML v2.3, 3 for HPXML v3.1
+    :param validate: check the house against the bundled HPXML schema
+    :returns: ``etree._ElementTree``
+    """
+    hpxmldoc = HouseGenerator(size, seed, hpxml_version).make()
+    if validate:
+        translator_class = get_translator_class(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmldoc))
+        translator_class.load_schema().schema.assertValid(hpxmldoc)
+    return hpxmldoc
+
+
+def iter_houses(count, size=10, seed=0, hpxml_version=3, validate=True):
+    """Generate ``count`` houses with seeds ``seed``, ``seed + 1``, ... one at a time
+
+    The houses can be passed straight to a translator without writing them to disk, i.e.::
+
+        for hpxmldoc in iter_houses(100, size=50):
+            hpxml_version = HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmldoc)
+            get_translator_class(hpxml_version)(hpxmldoc).hpxml_to_hescore()
+    """
+    for i in range(count):
+        yield generate_house(size, seed + i, hpxml_version, validate)
+
+
+def write_houses(dirname, count, size=10, seed=0, hpxml_version=3, validate=True):
+    """Write ``count`` houses to ``dirname`` as ``synthetic_v<version>_s<size>_<seed>.xml``
+
+    :returns: list of filenames
+    """
+    os.makedirs(dirname, exist_ok=True)
+    filenames = []
+    for i, hpxmldoc in enumerate(iter_houses(count, size, seed, hpxml_version, validate)):
+        filename = os.path.join(dirname, 'synthetic_v{}_s{}_{}.xml'.format(hpxml_version, size, seed + i))
+        hpxmldoc.write(filename, pretty_print=True, xml_declaration=True, encoding='utf-8')
+        filenames.append(filename)
+    return filenames
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10, help='Number of each kind of surface and system. Default: 10.')
+    parser.add_argument('-n', '--count', type=int, default=1, help='Number of houses. Default: 1.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the first house. Default: 0.')
+    parser.add_argument('--hpxml-version', type=int, choices=sorted(NAMESPACES), default=3,
+                        help='HPXML major version. Default: 3.')
+    output_group = parser.add_mutually_exclusive_group(required=True)
+    output_group.add_argument('-o', '--output-dir', help='Directory to write the houses to.')
+    output_group.add_argument('--translate', action='store_true',
+                              help='Translate the houses without writing them and report the times.')
+    args = parser.parse_args(argv)
+
+    if args.output_dir:
+        for filename in write_houses(args.output_dir, args.count, args.size, args.seed, args.hpxml_version):
+            print(filename)
+    else:
+        for i, hpxmldoc in enumerate(iter_houses(args.count, args.size, args.seed, args.hpxml_version)):
+            translator_class = get_translator_class(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmldoc))
+            start = time.perf_counter()
+            translator_class(hpxmldoc).hpxml_to_hescore()
+            print('seed {}: {:.3f} s'.format(args.seed + i, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,73 @@
 import argparse
+import json
 import logging
 import os
 import sys
 from jsonschema import ValidationError, SchemaError
-from .base import HPXMLtoHEScoreTranslatorBase
+from .assembly_rvalues import get_assembly_rvalue_table
+from .base import HPXMLtoHEScoreTranslatorBase, get_hescore_json_validator, parse_hpxml
 from .hpxml2 import HPXML2toHEScoreTranslator
 from .hpxml3 import HPXML3toHEScoreTranslator
 from .exceptions import HPXMLtoHEScoreError
+from .instrumentation import StageCollector
 
 
-def HPXMLtoHEScoreTranslator(hpxmlfilename):
-    schema_version = HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmlfilename)
+def HPXMLtoHEScoreTranslator(hpxmlfilename, validate='once', huge_tree=False, **kwargs):
+    """Make a translator for the HPXML version of a document
+
+    :param hpxmlfilename: filename, file-like object, or bytes, bytearray or memoryview of the HPXML document, or an
+        already parsed lxml ElementTree
+    :param huge_tree: turn off libxml2's limits on the size and depth of the document, for very large files from
+        trusted sources only
+
+    The other arguments are passed to the translator.
+    """
+    # Parse the document once and hand the tree to the translator for its version
+    hpxmldoc = parse_hpxml(hpxmlfilename, huge_tree)
+    translator_class = get_translator_class(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmldoc))
+    return translator_class(hpxmldoc, validate=validate, **kwargs)
+
+
+def get_translator_class(schema_version):
+    """Get the translator class for an HPXML schema version from ``detect_hpxml_version()``
+
+    :raises HPXMLtoHEScoreError: if the version isn't supported
+    """
     major_version = schema_version[0]
     if major_version == 3:
-        return HPXML3toHEScoreTranslator(hpxmlfilename)
+        return HPXML3toHEScoreTranslator
     elif major_version == 2:
-        return HPXML2toHEScoreTranslator(hpxmlfilename)
+        return HPXML2toHEScoreTranslator
     else:
-        raise HPXMLtoHEScoreError('Schema version {} not supported.'.format('.'.join(schema_version)))
+        raise HPXMLtoHEScoreError('Schema version {} not supported.'.format('.'.join(map(str, schema_version))))
+
+
+def warm_caches():
+    """Load everything the translators share ahead of the first translation in this process"""
+    for translator_class in (HPXML2toHEScoreTranslator, HPXML3toHEScoreTranslator):
+        translator_class.load_schema()
+    get_hescore_json_validator()
+    get_assembly_rvalue_table('wall')
 
 
 def main(argv=sys.argv[1:]):
-    parser = argparse.ArgumentParser(description='Convert HPXML v2.x or v3.x files to HEScore inputs')
+    if argv and argv[0] == 'batch':
+        from .batch import batch_main
+        return batch_main(argv[1:])
+    elif argv and argv[0] == 'worker':
+        from .worker import worker_main
+        return worker_main(argv[1:])
+    elif argv and argv[0] == 'stream':
+        from .streaming import stream_main
+        return stream_main(argv[1:])
+    elif argv and argv[0] == 'index':
+        from .buildingindex import index_main
+        return index_main(argv[1:])
+
+    parser = argparse.ArgumentParser(
+        description='Convert HPXML v2.x or v3.x files to HEScore inputs',
+        epilog='Run "%(prog)s batch -h" for help converting many files at once, "%(prog)s stream -h" for help converting every building in a very large file, "%(prog)s index -h" for help indexing the buildings in a very large file, or "%(prog)s worker -h" for help running a translation worker.'  # noqa 501
+    )
     parser.add_argument(
         'hpxml_input',
         help='Filename of hpxml file'
@@ -44,11 +90,31 @@ def main(argv=sys.argv[1:]):
         '--contractorid',
         help='HPXML contractor id to use in translating HPwES data if there are more than one <Contractor/> elements. Default: first one.'  # noqa 501
     )
+    parser.add_argument(
+        '--validate',
+        choices=HPXMLtoHEScoreTranslatorBase.VALIDATE_MODES,
+        default='once',
+        help='When to validate the HPXML file against the schema. Use "never" only for files already validated upstream. Default: once.'  # noqa 501
+    )
     parser.add_argument(
         '--scrubbed-hpxml',
         type=argparse.FileType('wb'),
         help='Path to save HPXML file scrubbed of PII.'
     )
+    parser.add_argument(
+        '--stage-stats',
+        type=argparse.FileType('w'),
+        help='Filename to write the time, XPath query count and element count of each translation stage to in json format.'  # noqa 501
+    )
+    parser.add_argument(
+        '--huge-tree',
+        action='store_true',
+        help='Turn off the limits on the size and depth of the HPXML file. Only use this for very large files from trusted sources.'  # noqa 501
+    )
+    parser.add_argument(
+        '--index',
+        help='Filename of an index of the HPXML file from "%(prog)s index". Only the building and the sections it needs are read and validated.'  # noqa 501
+    )
 
     args = parser.parse_args(argv)
     logging.basicConfig(level=logging.ERROR, format='%(levelname)s:%(message)s')
@@ -58,8 +124,22 @@ def main(argv=sys.argv[1:]):
             args.scrubbed_hpxml.close()
             os.remove(args.scrubbed_hpxml.name)
 
+    collector = StageCollector() if args.stage_stats else None
     try:
-        t = HPXMLtoHEScoreTranslator(args.hpxml_input)
+        hpxml_input = args.hpxml_input
+        if args.index:
+            from .buildingindex import BuildingIndex
+            hpxml_input = BuildingIndex.load(args.index).read_building(
+                args.hpxml_input,
+                hpxml_bldg_id=args.bldgid,
+                hpxml_project_id=args.projectid
+            )
+        t = HPXMLtoHEScoreTranslator(
+            hpxml_input,
+            validate=args.validate,
+            instrument=collector,
+            huge_tree=args.huge_tree
+        )
     except HPXMLtoHEScoreError as ex:
         exclass = type(ex).__name__
         logging.error('%s:%s', exclass, str(ex))
@@ -87,6 +167,8 @@ def main(argv=sys.argv[1:]):
     finally:
         if args.scrubbed_hpxml:
             t.export_scrubbed_hpxml(args.scrubbed_hpxml)
+        if args.stage_stats:
+            json.dump(collector.to_dict(), args.stage_stats, indent=2)
 
 
 if __name__ == '__main__':
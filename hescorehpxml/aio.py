@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+
+from . import HPXMLtoHEScoreTranslator, warm_caches
+from .exceptions import picklable_error
+
+
+def translate(hpxml_input, validate='once', hpxml_bldg_id=None, hpxml_project_id=None, hpxml_contractor_id=None,
+              huge_tree=False):
+    """Translate one HPXML document, what the pool workers run
+
+    :returns: the same dict as ``hpxml_to_hescore()``
+    """
+    t = HPXMLtoHEScoreTranslator(hpxml_input, validate=validate, huge_tree=huge_tree)
+    return t.hpxml_to_hescore(
+        hpxml_bldg_id=hpxml_bldg_id,
+        hpxml_project_id=hpxml_project_id,
+        hpxml_contractor_id=hpxml_contractor_id
+    )
+
+
+def translate_in_process(*args, **kwargs):
+    """``translate()`` for a process pool, where the errors have to be pickled to get back
+
+    :raises: the same exceptions as ``hpxml_to_hescore()``, lxml and jsonschema ones as the subclasses
+        ``picklable_error()`` copies them to
+    """
+    try:
+        return translate(*args, **kwargs)
+    except Exception as ex:
+        raise picklable_error(ex) from None
+
+
+class AsyncTranslator(object):
+    """Translate HPXML documents in a thread or process pool from asyncio code
+
+    Only ``max_in_flight`` translations are handed to the pool at a time, further calls to :meth:`translate` wait
+    for a slot. A translation that is cancelled or times out before it starts is dropped. One that is already
+    running can't be interrupted, so it keeps its slot until it finishes and its result is thrown away.
+
+    Use it as an async context manager or call :meth:`close` when done to shut down the pool::
+
+        async with AsyncTranslator(max_workers=4, processes=True) as translator:
+            hescore_inputs = await translator.translate(hpxml_bytes, timeout=10)
+
+    :param max_workers: number of threads or processes in the pool, defaults to what the executor picks
+    :param processes: use a process pool instead of a thread pool. Documents have to be filenames or bytes then.
+    :param max_in_flight: maximum number of translations in the pool at once, defaults to twice the number of
+        workers
+    :param timeout: default number of seconds to wait for each translation, None to wait as long as it takes
+    :param executor: ``concurrent.futures`` executor to use instead of making a pool, it isn't shut down by
+        :meth:`close`
+    """
+
+    def __init__(self, max_workers=None, processes=False, max_in_flight=None, timeout=None, executor=None):
+        self._owns_executor = executor is None
+        if executor is None:
+            executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+            executor = executor_class(max_workers=max_workers, initializer=warm_caches)
+        self.executor = executor
+        if max_in_flight is None:
+            max_in_flight = 2 * (getattr(executor, '_max_workers', None) or os.cpu_count() or 1)
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        # Made on first use so it belongs to the running event loop
+        self._semaphore = None
+
+    async def translate(self, hpxml_input, timeout=None, **kwargs):
+        """Translate an HPXML document without blocking the event loop
+
+        :param hpxml_input: anything ``HPXMLtoHEScoreTranslator`` accepts. With a process pool, a filename or bytes.
+        :param timeout: seconds to wait for the translation, including waiting for a slot, defaults to the
+            translator's ``timeout``
+        :param kwargs: ``validate``, ``huge_tree``, ``hpxml_bldg_id``, ``hpxml_project_id``, and
+            ``hpxml_contractor_id``
+        :returns: the same dict as ``hpxml_to_hescore()``
+        :raises: the same exceptions as ``hpxml_to_hescore()``, or ``asyncio.TimeoutError`` if it took too long.
+            With a process pool, lxml and jsonschema errors are copies made by ``picklable_error()``.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        return await asyncio.wait_for(self._translate(hpxml_input, kwargs), timeout)
+
+    async def _translate(self, hpxml_input, kwargs):
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        func = translate
+        if isinstance(self.executor, ProcessPoolExecutor):
+            func = translate_in_process
+            if isinstance(hpxml_input, (bytearray, memoryview)):
+                hpxml_input = bytes(hpxml_input)
+        await self._semaphore.acquire()
+        try:
+            cfuture = self.executor.submit(func, hpxml_input, **kwargs)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        # Hold the slot until the pool is done with it, not just until we stop waiting
+        def release_slot(_):
+            try:
+                loop.call_soon_threadsafe(self._semaphore.release)
+            except RuntimeError:
+                # The event loop is closed
+                pass
+        cfuture.add_done_callback(release_slot)
+        return await asyncio.wrap_future(cfuture)
+
+    def close(self, wait=True):
+        """Shut down the pool if this made it"""
+        if self._owns_executor:
+            self.executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
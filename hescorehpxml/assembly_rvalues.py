@@ -0,0 +1,122 @@
+from bisect import bisect_left
+import csv
+import os
+import threading
+from types import MappingProxyType
+
+thisdir = os.path.dirname(os.path.abspath(__file__))
+
+CONSTRUCTIONS = ('wall', 'roof', 'ceiling', 'floor', 'knee_wall', 'int_wall')
+
+
+class AssemblyRValueTable(object):
+    """Immutable lookup of HEScore assembly codes and their effective R-values
+
+    The doe2 codes in the lookup tables are laid out as
+    ``<construction:2><construction type:2><nominal R-value:2>[<exterior finish:2>]``, e.g. ``ewwf13wo``. The codes are
+    indexed by construction type and exterior finish and sorted by effective R-value so the code nearest to an
+    R-value can be found by bisection.
+    """
+
+    __slots__ = ('construction', 'rvalues', '_index', '_nominal_index')
+
+    def __init__(self, construction, rows):
+        """
+        construction - one of the CONSTRUCTIONS
+        rows - iterable of (doe2code, effective R-value) pairs in lookup table order
+        """
+        self.construction = construction
+        rvalues = {}
+        groups = {}
+        nominal_group = []
+        for i, (doe2code, rvalue) in enumerate(rows):
+            rvalues[doe2code] = rvalue
+            # The table order is kept to break ties the same way as a linear search would.
+            for key in ((None, None), (doe2code[2:4], doe2code[6:8] or None)):
+                groups.setdefault(key, []).append((rvalue, i, doe2code))
+            nominal_group.append((int(doe2code[4:6]), i, doe2code))
+        self.rvalues = MappingProxyType(rvalues)
+        self._index = MappingProxyType({key: self._make_group(group) for key, group in groups.items()})
+        self._nominal_index = self._make_group(nominal_group)
+
+    @staticmethod
+    def _make_group(group):
+        group.sort()
+        return tuple(x[0] for x in group), tuple(x[1:] for x in group)
+
+    @staticmethod
+    def _nearest(group, rvalue):
+        values, entries = group
+        i = bisect_left(values, rvalue)
+        candidates = []
+        if i < len(values):
+            candidates.append(i)
+        if i > 0:
+            candidates.append(i - 1)
+        mindist = min(abs(values[j] - rvalue) for j in candidates)
+        # Walk out both sides to collect every entry at the minimum distance.
+        nearest = []
+        j = i - 1
+        while j >= 0 and abs(values[j] - rvalue) == mindist:
+            nearest.append(entries[j])
+            j -= 1
+        j = i
+        while j < len(values) and abs(values[j] - rvalue) == mindist:
+            nearest.append(entries[j])
+            j += 1
+        return min(nearest)[1]
+
+    def __getitem__(self, doe2code):
+        return self.rvalues[doe2code]
+
+    def nearest(self, rvalue, construction_type=None, exterior_finish=None):
+        """Find the assembly code with the effective R-value closest to ``rvalue``
+
+        :param rvalue: effective R-value to match
+        :param construction_type: only consider codes with this construction type, i.e. ``'wf'``
+        :param exterior_finish: only consider codes with this exterior finish, i.e. ``'wo'``
+        :returns: tuple of (doe2code, effective R-value)
+        """
+        key = (None, None) if construction_type is None else (construction_type, exterior_finish)
+        try:
+            group = self._index[key]
+        except KeyError:
+            raise ValueError('There are no {} assembly codes with construction type {} and exterior finish {}'.format(
+                self.construction, construction_type, exterior_finish))
+        doe2code = self._nearest(group, rvalue)
+        return doe2code, self.rvalues[doe2code]
+
+    def nearest_nominal(self, nominal_rvalue):
+        """Find the assembly code with the nominal R-value closest to ``nominal_rvalue``
+
+        :returns: tuple of (doe2code, effective R-value)
+        """
+        doe2code = self._nearest(self._nominal_index, nominal_rvalue)
+        return doe2code, self.rvalues[doe2code]
+
+
+def read_assembly_rvalue_table(construction):
+    assert construction in CONSTRUCTIONS
+    with open(os.path.join(thisdir, 'lookups', f'lu_{construction}_eff_rvalue.csv'), newline='') as f:
+        reader = csv.DictReader(f)
+        return AssemblyRValueTable(construction, [(row['doe2code'], float(row['Eff-R-value'])) for row in reader])
+
+
+_assembly_rvalue_tables = None
+_assembly_rvalue_tables_lock = threading.Lock()
+
+
+def get_assembly_rvalue_table(construction):
+    """Get the lookup table for a construction, the tables are read once per process
+
+    :param construction: one of 'wall', 'roof', 'ceiling', 'floor', 'knee_wall', 'int_wall'
+    :rtype: AssemblyRValueTable
+    """
+    global _assembly_rvalue_tables
+    if _assembly_rvalue_tables is None:
+        with _assembly_rvalue_tables_lock:
+            if _assembly_rvalue_tables is None:
+                _assembly_rvalue_tables = MappingProxyType(
+                    {x: read_assembly_rvalue_table(x) for x in CONSTRUCTIONS}
+                )
+    return _assembly_rvalue_tables[construction]
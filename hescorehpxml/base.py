@@ -2,27 +2,281 @@ from builtins import map
 from builtins import zip
 from builtins import object
 from copy import deepcopy
-import csv
 import datetime as dt
+import hashlib
 import json
 import math
 from lxml import etree, objectify
 from collections import defaultdict, namedtuple
 from decimal import Decimal
 from collections import OrderedDict
+from contextlib import contextmanager
 import os
 import re
-from jsonschema import validate, FormatChecker
-
+import threading
+import time
+from jsonschema import FormatChecker
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from .assembly_rvalues import get_assembly_rvalue_table
+from .components import (
+    BuildingComponents,
+    COMPONENT_KINDS,
+    has_rigid_sheathing,
+    sum_nominal_rvalues,
+)
 from .exceptions import (
     TranslationError,
     InputOutOfBounds,
     ElementNotFoundError,
     RoundOutOfBounds,
 )
+from .instrumentation import StageStats
 
 thisdir = os.path.dirname(os.path.abspath(__file__))
 nsre = re.compile(r'([a-zA-Z][a-zA-Z0-9]*):')
+jsonschemapath = os.path.join(thisdir, 'schemas', 'hescore_json.schema.json')
+
+HPXMLSchema = namedtuple('HPXMLSchema', ['schemapath', 'schema', 'namespace'])
+BuildingResult = namedtuple('BuildingResult', ['building_id', 'hescore', 'error'])
+BYTES_TYPES = (bytes, bytearray, memoryview)
+SectionInputs = namedtuple('SectionInputs', ['xpaths', 'project', 'hescore'])
+
+
+class BuildingContext(object):
+    """The elements, ids and intermediate results for translating one <Building>
+
+    All the state for a building is kept here instead of on the translator so that several buildings from the same
+    document can be translated at once in different threads.
+    """
+
+    __slots__ = (
+        'building', 'project', 'contractor', 'building_id', 'sidemap', 'hescore', 'subtree_digests', '_id_index',
+        '_components', '_components_by_element'
+    )
+
+    def __init__(self, building, project, contractor, building_id):
+        self.building = building
+        self.project = project
+        self.contractor = contractor
+        self.building_id = building_id
+        self.sidemap = None
+        self.hescore = None
+        self.subtree_digests = {}
+        self._id_index = None
+        self._components = None
+        self._components_by_element = None
+
+    def _index(self):
+        """Index the SystemIdentifier ids and read the components of the building in one walk"""
+        ns = etree.QName(self.building).namespace
+        sysid_tag = etree.QName(ns, 'SystemIdentifier').text
+        kinds_by_tag = {}
+        for name, (record_class, kinds) in COMPONENT_KINDS.items():
+            kinds_by_tag[etree.QName(ns, name).text] = (record_class, [
+                (kind, None if parent is None else etree.QName(ns, parent).text) for kind, parent in kinds
+            ])
+        id_index = {}
+        components = BuildingComponents()
+        by_element = {}
+        for i, el in enumerate(self.building.iter(sysid_tag, *kinds_by_tag)):
+            if el.tag == sysid_tag:
+                id_index.setdefault(el.get('id'), (i, el.getparent()))
+                continue
+            record_class, kinds = kinds_by_tag[el.tag]
+            parent_tag = el.getparent().tag
+            for kind, parent in kinds:
+                if parent is None or parent == parent_tag:
+                    component = by_element.get(el)
+                    if component is None:
+                        component = by_element[el] = record_class(el)
+                    getattr(components, kind).append(component)
+        self._id_index = id_index
+        self._components = components
+        self._components_by_element = by_element
+
+    @property
+    def id_index(self):
+        """Map of SystemIdentifier id to (document position, element) in the building, built in one walk on first use"""
+        if self._id_index is None:
+            self._index()
+        return self._id_index
+
+    @property
+    def components(self):
+        """``BuildingComponents`` of the building, found in the same walk as the ``id_index``"""
+        if self._components is None:
+            self._index()
+        return self._components
+
+    def get_elements_by_id(self, ids, tag):
+        """Get the elements in the building with one of the SystemIdentifier ids and the tag, in document order
+
+        :param ids: iterable of ids
+        :param tag: tag of the elements to return in ``{namespace}localname`` form, others with the ids are skipped
+        :returns: list of elements
+        """
+        id_index = self.id_index
+        found = set(id_index[x] for x in ids if x in id_index)
+        return [el for i, el in sorted(found, key=lambda x: x[0]) if el.tag == tag]
+
+    def get_component(self, element):
+        """Get the record of a component element of the building, one of ``components``"""
+        if self._components_by_element is None:
+            self._index()
+        return self._components_by_element[element]
+
+    def get_components_by_id(self, ids, tag):
+        """Get the records of the components with one of the SystemIdentifier ids and the tag, in document order
+
+        Works like :meth:`get_elements_by_id`, for tags of the components in ``COMPONENT_KINDS``.
+        """
+        return [self.get_component(el) for el in self.get_elements_by_id(ids, tag)]
+
+
+_hpxml_schemas = {}
+_hescore_json_validator = None
+_schema_cache_lock = threading.Lock()
+
+
+def get_hpxml_schema(schema_dir):
+    """Get the compiled HPXML schema for one of the directories in ``schemas/``
+
+    The xsd is parsed and compiled the first time it is requested and the result is shared by every translator in
+    the process after that.
+
+    :param schema_dir: name of the schema directory, i.e. ``SCHEMA_DIR`` of a translator class
+    :returns: HPXMLSchema namedtuple of the path to HPXML.xsd, the compiled ``etree.XMLSchema`` and the HPXML namespace
+    """
+    with _schema_cache_lock:
+        try:
+            return _hpxml_schemas[schema_dir]
+        except KeyError:
+            pass
+        schemapath = os.path.join(thisdir, 'schemas', schema_dir, 'HPXML.xsd')
+        schematree = etree.parse(schemapath)
+        namespace = schematree.xpath(
+            '//xs:schema/@targetNamespace',
+            namespaces={'xs': 'http://www.w3.org/2001/XMLSchema'}
+        )[0]
+        hpxml_schema = HPXMLSchema(schemapath, etree.XMLSchema(schematree), str(namespace))
+        _hpxml_schemas[schema_dir] = hpxml_schema
+        return hpxml_schema
+
+
+class XPathRegistry(dict):
+    """Compiled ``etree.XPath`` expressions for one namespace map, keyed by expression text
+
+    Expressions are compiled the first time they are looked up. Only the first ``maxsize`` expressions are kept so
+    that expressions built from document content can't grow the registry without bound.
+    """
+
+    def __init__(self, namespaces, maxsize=10000):
+        super().__init__()
+        self.namespaces = dict(namespaces)
+        self.maxsize = maxsize
+
+    def __missing__(self, xpathquery):
+        compiled_xpath = etree.XPath(xpathquery, namespaces=self.namespaces, smart_strings=False)
+        if len(self) < self.maxsize:
+            self[xpathquery] = compiled_xpath
+        return compiled_xpath
+
+
+_xpath_registries = {}
+
+
+def get_xpath_registry(namespaces):
+    """Get the process-wide XPathRegistry for a namespace map"""
+    key = tuple(sorted(namespaces.items()))
+    try:
+        return _xpath_registries[key]
+    except KeyError:
+        with _schema_cache_lock:
+            return _xpath_registries.setdefault(key, XPathRegistry(namespaces))
+
+
+def get_hescore_json_validator():
+    """Get the validator for the HEScore JSON schema
+
+    The schema is loaded and checked the first time it is requested and the validator, with a format checker
+    attached, is shared by every translator in the process after that.
+
+    :returns: jsonschema validator instance, the schema itself is available as its ``schema`` attribute
+    """
+    global _hescore_json_validator
+    with _schema_cache_lock:
+        if _hescore_json_validator is None:
+            with open(jsonschemapath, 'r') as f:
+                json_schema = json.load(f)
+            validator_class = validator_for(json_schema)
+            validator_class.check_schema(json_schema)
+            _hescore_json_validator = validator_class(json_schema, format_checker=FormatChecker())
+        return _hescore_json_validator
+
+
+# Don't load DTDs, expand entities or touch the network for any HPXML input
+HPXML_PARSER_OPTIONS = dict(
+    load_dtd=False,
+    dtd_validation=False,
+    resolve_entities=False,
+    no_network=True,
+)
+_hpxml_parsers = threading.local()
+
+
+def get_hpxml_parser(huge_tree=False):
+    """Get this thread's parser for HPXML documents
+
+    lxml parsers can't be used by two threads at once, so each thread gets its own that it reuses for every document.
+    Blank text between elements is dropped to keep the trees small.
+
+    :param huge_tree: turn off libxml2's limits on the size and depth of a document, for very large files from
+        trusted sources only
+    :returns: ``etree.XMLParser``
+    """
+    parsers = _hpxml_parsers.__dict__
+    try:
+        return parsers[huge_tree]
+    except KeyError:
+        return parsers.setdefault(huge_tree, etree.XMLParser(
+            remove_blank_text=True,
+            collect_ids=True,
+            huge_tree=huge_tree,
+            **HPXML_PARSER_OPTIONS
+        ))
+
+
+def parse_hpxml(hpxml_input, huge_tree=False):
+    """Parse an HPXML document from anything the translators accept
+
+    :param hpxml_input: filename or file-like object, ``bytes``, ``bytearray`` or ``memoryview`` of the document,
+        or an already parsed ``etree._ElementTree`` or root element, which is returned as is
+    :param huge_tree: see :func:`get_hpxml_parser`
+    :returns: ``etree._ElementTree``
+    """
+    if isinstance(hpxml_input, etree._ElementTree):
+        return hpxml_input
+    elif isinstance(hpxml_input, etree._Element):
+        return hpxml_input.getroottree()
+    elif isinstance(hpxml_input, BYTES_TYPES):
+        # lxml parses anything supporting the buffer protocol in place
+        return etree.fromstring(hpxml_input, get_hpxml_parser(huge_tree)).getroottree()
+    else:
+        return etree.parse(hpxml_input, get_hpxml_parser(huge_tree))
+
+
+def read_root_element(buf, chunksize=4096):
+    """Parse only as far as the root element's start tag of a document in a buffer"""
+    parser = etree.XMLPullParser(events=('start',), **HPXML_PARSER_OPTIONS)
+    buf = memoryview(buf).cast('B')
+    for pos in range(0, len(buf), chunksize):
+        parser.feed(bytes(buf[pos:pos + chunksize]))
+        for _, root in parser.read_events():
+            return root
+    # Raises an XMLSyntaxError when there is no root element
+    return parser.close()
 
 
 def tobool(x):
@@ -69,39 +323,200 @@ def weighted_average(items, weights):
     return sum(item * weight for item, weight in zip(items, weights)) / sum(weights)
 
 
+def _json_default(x):
+    if isinstance(x, set):
+        return sorted(x)
+    raise TypeError('{!r} is not JSON serializable'.format(x))
+
+
+# Everything each section of the translation reads, for keying the section cache. The xpaths are relative to the
+# <Building> and each subtree they select is hashed. project is whether the <Project> is read, and hescore lists the
+# earlier sections of the HEScore inputs that are, with dots between nested keys.
+_ENCLOSURE_EXCEPT = 'h:BuildingDetails/h:Enclosure/*[not(self::h:AirInfiltration{})]'
+SECTION_INPUTS = OrderedDict([
+    ('address', SectionInputs(['h:BuildingID', 'h:Site', 'h:extension'], False, [])),
+    ('about', SectionInputs(
+        [
+            '/h:HPXML/h:XMLTransactionHeaderInformation',
+            'h:ProjectStatus',
+            'h:BuildingDetails/h:BuildingSummary',
+            'h:BuildingDetails/h:Enclosure/h:AirInfiltration',
+            'h:extension',
+        ],
+        True,
+        []
+    )),
+    ('zone_floor', SectionInputs(
+        ['h:BuildingDetails/h:BuildingSummary', _ENCLOSURE_EXCEPT.format(' or self::h:Windows or self::h:Skylights')],
+        False,
+        ['about']
+    )),
+    ('zone_roof', SectionInputs(
+        ['h:BuildingDetails/h:BuildingSummary', _ENCLOSURE_EXCEPT.format(' or self::h:Windows or self::h:Skylights')],
+        False,
+        ['about', 'zone.zone_floor']
+    )),
+    ('skylights', SectionInputs(
+        ['h:BuildingDetails/h:BuildingSummary', _ENCLOSURE_EXCEPT.format(' or self::h:Windows')],
+        False,
+        ['zone.zone_roof']
+    )),
+    ('zone_wall', SectionInputs(
+        ['h:BuildingDetails/h:BuildingSummary', _ENCLOSURE_EXCEPT.format(' or self::h:Skylights')],
+        False,
+        ['about']
+    )),
+    ('hvac', SectionInputs(
+        ['h:BuildingDetails/h:Systems/h:HVAC'], False, ['about', 'zone.zone_floor', 'zone.zone_roof']
+    )),
+    ('dhw', SectionInputs(['h:BuildingDetails/h:Systems/h:WaterHeating'], False, [])),
+    ('generation', SectionInputs(['h:BuildingDetails/h:Systems/h:Photovoltaics'], False, [])),
+])
+
+# Sections that use today's date when the building doesn't have this element, today's date goes in their key then
+SECTION_TODAY_FALLBACKS = {
+    'about': 'h:ProjectStatus/h:Date',
+}
+
+
+# Parts of a <Building> that only go into the address and comments. They are left out when looking for buildings that
+# are the same so each one's own can be translated, see translate_all_buildings().
+DEDUPE_STRIPPED = (
+    'h:BuildingID',
+    'h:CustomerID',
+    'h:ContractorID',
+    'h:Site',
+    'h:extension/h:HESExternalID',
+    'h:extension/h:Comments',
+    # Once those are gone
+    'h:extension[not(*)]',
+)
+ID_ATTRIBUTES = ('id', 'idref', 'sameas')
+
+
 class HPXMLtoHEScoreTranslatorBase(object):
     SCHEMA_DIR = None
+    VALIDATE_MODES = ('once', 'always', 'never')
+    SECTION_INPUTS = SECTION_INPUTS
 
     @staticmethod
     def detect_hpxml_version(hpxmlfilename):
-        doc = etree.parse(hpxmlfilename)
-        schema_version = list(map(int, doc.getroot().attrib['schemaVersion'].split('.')))
+        if isinstance(hpxmlfilename, etree._ElementTree):
+            root = hpxmlfilename.getroot()
+        elif isinstance(hpxmlfilename, etree._Element):
+            root = hpxmlfilename
+        elif isinstance(hpxmlfilename, BYTES_TYPES):
+            root = read_root_element(hpxmlfilename)
+        else:
+            # Only read as far as the root element's start tag
+            try:
+                pos = hpxmlfilename.tell()
+            except (AttributeError, OSError):
+                pos = None
+            events = etree.iterparse(hpxmlfilename, events=('start',), **HPXML_PARSER_OPTIONS)
+            _, root = next(events)
+            del events
+            if pos is not None:
+                hpxmlfilename.seek(pos)
+        schema_version = list(map(int, root.attrib['schemaVersion'].split('.')))
         schema_version.extend((3 - len(schema_version)) * [0])
         return schema_version
 
-    def __init__(self, hpxmlfilename):
-        self.hpxmldoc = etree.parse(hpxmlfilename)
-        self.schemapath = os.path.join(thisdir, 'schemas', self.SCHEMA_DIR, 'HPXML.xsd')
-        self.jsonschemapath = os.path.join(thisdir, 'schemas', 'hescore_json.schema.json')
-        schematree = etree.parse(self.schemapath)
-        self.schema = etree.XMLSchema(schematree)
-        if not self.schema.validate(self.hpxmldoc):
-            raise TranslationError(
-                'Failed to validate against the following HPXML schema: {}'.format(self.SCHEMA_DIR)
-            )
+    @classmethod
+    def load_schema(cls):
+        """Compile (or get the already compiled) HPXML schema for this translator class"""
+        return get_hpxml_schema(cls.SCHEMA_DIR)
+
+    def __init__(self, hpxmlfilename, validate='once', instrument=None, huge_tree=False, section_cache=None):
+        """
+        hpxmlfilename - filename, file-like object, or bytes, bytearray or memoryview of the HPXML document, or an
+            already parsed lxml ElementTree. Parsed trees are used as is and buffers are parsed without copying them.
+        validate (optional) - When to validate the document against the HPXML schema.
+            'once' validates when the document is loaded and again only after ``invalidate()`` is called,
+            'always' validates on load and before every translation, and
+            'never' skips validation for documents already validated upstream.
+        instrument (optional) - hescorehpxml.instrumentation.Instrument to send the time, XPath query count and
+            element count of each translation stage to. Can also be set later as the ``instrument`` attribute.
+        huge_tree (optional) - Turn off libxml2's limits on the size and depth of the document when parsing it.
+            Only for very large files from trusted sources.
+        section_cache (optional) - hescorehpxml.sectioncache.SectionCache to reuse translated sections from when
+            their inputs haven't changed. Share one between translators to speed up translating resubmitted buildings.
+        """
+        if validate not in self.VALIDATE_MODES:
+            raise ValueError('validate must be one of {}, not {!r}'.format(', '.join(self.VALIDATE_MODES), validate))
+        self.validate_mode = validate
+        self.instrument = instrument
+        self._instrument_local = threading.local()
+        self.section_cache = section_cache
+        self.hpxmldoc = parse_hpxml(hpxmlfilename, huge_tree)
+        hpxml_schema = self.load_schema()
+        self.schemapath = hpxml_schema.schemapath
+        self.jsonschemapath = jsonschemapath
+        self.schema = hpxml_schema.schema
+        self._hpxmldoc_is_valid = False
+        if self.validate_mode != 'never':
+            with self.stage('hpxml_validate'):
+                is_valid = self.schema.validate(self.hpxmldoc)
+            if not is_valid:
+                raise TranslationError(
+                    'Failed to validate against the following HPXML schema: {}'.format(self.SCHEMA_DIR)
+                )
+            self._hpxmldoc_is_valid = True
         self.ns = {'xs': 'http://www.w3.org/2001/XMLSchema'}
-        self.ns['h'] = schematree.xpath('//xs:schema/@targetNamespace', namespaces=self.ns)[0]
-        self._wall_assembly_eff_rvalues = None
-        self._roof_assembly_eff_rvalues = None
-        self._ceiling_assembly_eff_rvalues = None
-        self._floor_assembly_eff_rvalues = None
-        self._knee_wall_assembly_eff_rvalues = None
-        self._int_wall_assembly_eff_rvalues = None
+        self.ns['h'] = hpxml_schema.namespace
+        self.xpaths = get_xpath_registry(self.ns)
+
+    def invalidate(self):
+        """Mark the HPXML document as modified
+
+        Call this after changing ``hpxmldoc`` in place so that it is validated again before the next translation.
+        """
+        self._hpxmldoc_is_valid = False
+
+    def assert_valid_hpxml(self):
+        """Validate the HPXML document against the schema as needed by the validation mode
+
+        :raises lxml.etree.DocumentInvalid: if the document is not valid
+        """
+        if self.validate_mode == 'never':
+            return
+        if self.validate_mode == 'always' or not self._hpxmldoc_is_valid:
+            with self.stage('hpxml_validate'):
+                self.schema.assertValid(self.hpxmldoc)
+            self._hpxmldoc_is_valid = True
+
+    @contextmanager
+    def stage(self, name, building_id=None):
+        """Report the time and XPath queries of a stage to the instrument, if there is one"""
+        instrument = self.instrument
+        if instrument is None:
+            yield
+            return
+        # Stages can be nested and each one counts the queries made while it's running
+        counters = [0, 0]
+        active_counters = self._instrument_local.__dict__.setdefault('active_counters', [])
+        active_counters.append(counters)
+        instrument.stage_started(name, building_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            active_counters.pop()
+            instrument.stage_finished(StageStats(name, building_id, seconds, counters[0], counters[1]))
+
+    def count_xpath(self, res):
+        n_elements = len(res) if isinstance(res, list) else 0
+        for counters in getattr(self._instrument_local, 'active_counters', ()):
+            counters[0] += 1
+            counters[1] += n_elements
 
     def xpath(self, el, xpathquery, aslist=False, raise_err=False, **kwargs):
         if isinstance(el, etree._ElementTree):
             el = el.getroot()
-        res = el.xpath(xpathquery, namespaces=self.ns, **kwargs)
+        res = self.xpaths[xpathquery](el, **kwargs)
+        if self.instrument is not None:
+            self.count_xpath(res)
         if raise_err and isinstance(res, list) and len(res) == 0:
             raise ElementNotFoundError(el, xpathquery, kwargs)
         if aslist:
@@ -131,7 +546,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
         )
 
         # Clean out the Customer elements
-        for customer in root.xpath('h:Customer', namespaces=self.ns):
+        for customer in self.xpath(root, 'h:Customer', aslist=True):
             customer_id = customer.CustomerDetails.Person.SystemIdentifier.attrib['id']
             root.replace(
                 customer,
@@ -157,18 +572,17 @@ class HPXMLtoHEScoreTranslatorBase(object):
             'h:Building/h:CustomerID'
         ]
         for el_name in elements_to_remove:
-            for el in root.xpath(el_name, namespaces=self.ns):
+            for el in self.xpath(root, el_name, aslist=True):
                 el.getparent().remove(el)
 
         # Write out the scrubbed doc
         etree.ElementTree(root).write(outfile_obj, pretty_print=True)
 
     def get_wall_assembly_rvalue(self, wall):
-        return convert_to_type(float, self.xpath(wall, 'h:Insulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, wall.assembly_rvalue)
 
     def get_wall_assembly_code_and_rvalue(self, hpxmlwall, is_exterior_wall):
-        xpath = self.xpath
-        wallid = xpath(hpxmlwall, 'h:SystemIdentifier/@id', raise_err=True)
+        wallid = hpxmlwall.get_id()
 
         # siding
         sidingmap = {'wood siding': 'wo',
@@ -194,23 +608,18 @@ class HPXMLtoHEScoreTranslatorBase(object):
         assembly_eff_rvalue = self.get_wall_assembly_rvalue(hpxmlwall)
 
         # Construction type and Siding
-        wall_type = xpath(hpxmlwall, 'name(h:WallType/*)', raise_err=True)
+        wall_type = hpxmlwall.wall_type
 
         if is_exterior_wall:
             if wall_type == 'WoodStud':
-                has_rigid_ins = xpath(
-                    hpxmlwall,
-                    'boolean(h:Insulation/h:Layer[h:NominalRValue > 0][h:InstallationType="continuous"][boolean('
-                    'h:InsulationMaterial/h:Rigid)])'
-                )
-                if has_rigid_ins or\
-                        tobool(xpath(hpxmlwall, 'h:WallType/h:WoodStud/h:ExpandedPolystyreneSheathing/text()')):
+                has_rigid_ins = has_rigid_sheathing(hpxmlwall.layers)
+                if has_rigid_ins or tobool(hpxmlwall.expanded_polystyrene_sheathing):
                     wallconstype = 'ps'
-                elif tobool(xpath(hpxmlwall, 'h:WallType/h:WoodStud/h:OptimumValueEngineering/text()')):
+                elif tobool(hpxmlwall.optimum_value_engineering):
                     wallconstype = 'ov'
                 else:
                     wallconstype = 'wf'
-                hpxmlsiding = xpath(hpxmlwall, 'h:Siding/text()')
+                hpxmlsiding = hpxmlwall.siding
                 try:
                     sidingtype = sidingmap[hpxmlsiding]
                 except KeyError:
@@ -226,7 +635,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 sidingtype = 'nn'
             elif wall_type in ('ConcreteMasonryUnit', 'Stone'):
                 wallconstype = 'cb'
-                hpxmlsiding = xpath(hpxmlwall, 'h:Siding/text()')
+                hpxmlsiding = hpxmlwall.siding
                 if hpxmlsiding is None:
                     sidingtype = 'nn'
                 else:
@@ -245,23 +654,16 @@ class HPXMLtoHEScoreTranslatorBase(object):
         # R-value and construction code
         if assembly_eff_rvalue is not None:
             if is_exterior_wall:
-                closest_wall_code, closest_code_rvalue = min(
-                    [(doe2code, code_rvalue)
-                     for doe2code, code_rvalue in self.wall_assembly_eff_rvalues.items()
-                     if doe2code[2:4] == wallconstype and doe2code[6:8] == sidingtype],
-                    key=lambda x: abs(x[1] - assembly_eff_rvalue)
-                )
+                closest_wall_code, closest_code_rvalue = get_assembly_rvalue_table('wall').nearest(
+                    assembly_eff_rvalue, wallconstype, sidingtype)
                 return closest_wall_code, assembly_eff_rvalue
             else:
-                closest_wall_code, closest_code_rvalue = min(
-                    [(doe2code, code_rvalue)
-                     for doe2code, code_rvalue in self.int_wall_assembly_eff_rvalues.items()],
-                    key=lambda x: abs(x[1] - assembly_eff_rvalue)
-                )
+                closest_wall_code, closest_code_rvalue = get_assembly_rvalue_table('int_wall').nearest(
+                    assembly_eff_rvalue)
                 return closest_wall_code, assembly_eff_rvalue
 
         elif self.every_wall_layer_has_nominal_rvalue(hpxmlwall):
-            wall_rvalue = xpath(hpxmlwall, 'sum(h:Insulation/h:Layer/h:NominalRValue)', raise_err=True)
+            wall_rvalue = sum_nominal_rvalues(hpxmlwall.layers)
             if is_exterior_wall:
                 # If the wall as a NominalRValue element for every layer (or there are no layers)
                 # and there isn't an AssemblyEffectiveRValue element
@@ -335,13 +737,11 @@ class HPXMLtoHEScoreTranslatorBase(object):
             }
         }
 
-        xpath = self.xpath
-
-        frame_type = xpath(window, 'name(h:FrameType/*)')
+        frame_type = window.frame_type
         if frame_type == '':
             frame_type = None
-        glass_layers = xpath(window, 'h:GlassLayers/text()')
-        glass_type = xpath(window, 'h:GlassType/text()')
+        glass_layers = window.glass_layers
+        glass_type = window.glass_type
         is_hescore_dp = self.check_is_doublepane(window, glass_layers)
         is_storm_lowe = False
 
@@ -361,14 +761,14 @@ class HPXMLtoHEScoreTranslatorBase(object):
         else:
             raise TranslationError('Unhandled glass layers: {}'.format(glass_layers))
 
-        gas_fill = xpath(window, 'h:GasFill/text()')
+        gas_fill = window.gas_fill
         argon_filled = False
         # Only double-pane window can be argon filled
         if glass_layers == 'double-pane' and gas_fill == 'argon':
             argon_filled = True
 
         if frame_type in ('Aluminum', 'Metal'):
-            thermal_break = tobool(xpath(window, 'h:FrameType/*/h:ThermalBreak/text()'))
+            thermal_break = tobool(window.thermal_break)
             if thermal_break:
                 # Aluminum with Thermal Break
                 window_frame = 'Aluminum with Thermal Break'
@@ -440,24 +840,21 @@ class HPXMLtoHEScoreTranslatorBase(object):
             raise TranslationError('HEScore does not support the HPXML fuel type %s' % fuel_type)
 
     def get_heating_system_type(self, htgsys):
-        xpath = self.xpath
-        ns = self.ns
-
         sys_heating = OrderedDict()
-        if htgsys.tag.endswith('HeatPump'):
+        if htgsys.is_heat_pump:
             # heat pump new fuel type added in v3: https://github.com/hpxmlwg/hpxml/pull/159.
             # Should we also translate fuel type for heat pumps?
             sys_heating['fuel_primary'] = 'electric'
-            heat_pump_type = xpath(htgsys, 'h:HeatPumpType/text()')
+            heat_pump_type = htgsys.heat_pump_type
             if heat_pump_type is None:
                 sys_heating['type'] = 'heat_pump'
             else:
                 sys_heating['type'] = self.heat_pump_type_map[heat_pump_type]
         else:
-            assert htgsys.tag.endswith('HeatingSystem')
-            fuel_type = xpath(htgsys, 'h:HeatingSystemFuel/text()', raise_err=True)
+            assert htgsys.element.tag.endswith('HeatingSystem')
+            fuel_type = htgsys.require('heating_system_fuel')
             sys_heating['fuel_primary'] = self.add_fuel_type(fuel_type)
-            hpxml_heating_type = xpath(htgsys, 'name(h:HeatingSystemType/*)', raise_err=True)
+            hpxml_heating_type = htgsys.heating_system_type
             try:
                 sys_heating['type'] = {'Furnace': 'central_furnace',
                                        'WallFurnace': 'wall_furnace',
@@ -491,10 +888,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                                   'boiler': ['AFUE'],
                                   'gchp': ['COP']}[sys_heating['type']]
 
-            eff_unit_els = htgsys.xpath(
-                '(h:AnnualHeatingEfficiency|h:AnnualHeatEfficiency)/h:Units/text()',
-                namespaces=ns
-            )
+            eff_unit_els = [eff.units for eff in htgsys.heating_efficiencies if eff.units is not None]
             eff_unit = None
             efficiency = None
             if len(eff_unit_els) > 0:
@@ -505,17 +899,17 @@ class HPXMLtoHEScoreTranslatorBase(object):
                     elif htg_type_eff_units.index(eff_unit_el) < index:  # Preference to first units
                         index = htg_type_eff_units.index(eff_unit_el)
                         eff_unit = eff_unit_el
-                        eff_value_els = htgsys.xpath('(h:AnnualHeatingEfficiency|h:AnnualHeatEfficiency)' +
-                                                     '[h:Units=$effunits]/h:Value/text()',
-                                                     namespaces=ns,
-                                                     effunits=eff_unit)
+                        eff_value_els = [
+                            eff.value for eff in htgsys.heating_efficiencies
+                            if eff.units == eff_unit and eff.value is not None
+                        ]
                         if len(eff_value_els) > 0:
                             efficiency = eff_value_els[0]
             if eff_unit is None or efficiency is None:
                 # Use the year instead
                 sys_heating['efficiency_method'] = 'shipment_weighted'
                 try:
-                    sys_heating['year'] = int(htgsys.xpath('(h:YearInstalled|h:ModelYear)/text()', namespaces=ns)[0])
+                    sys_heating['year'] = int(htgsys.years[0])
                 except IndexError:
                     raise TranslationError(
                         'Heating efficiency could not be determined. ' +
@@ -527,25 +921,22 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 sys_heating['efficiency_method'] = 'user'
                 sys_heating['efficiency_unit'] = eff_unit.lower()
                 sys_heating['efficiency'] = float(efficiency)
-        sys_heating['_capacity'] = convert_to_type(float, xpath(htgsys, 'h:HeatingCapacity/text()'))
-        sys_heating['_fracload'] = convert_to_type(float, xpath(htgsys, 'h:FractionHeatLoadServed/text()'))
-        sys_heating['_floorarea'] = convert_to_type(float, xpath(htgsys, 'h:FloorAreaServed/text()'))
+        sys_heating['_capacity'] = convert_to_type(float, htgsys.heating_capacity)
+        sys_heating['_fracload'] = convert_to_type(float, htgsys.fraction_heat_load_served)
+        sys_heating['_floorarea'] = convert_to_type(float, htgsys.floor_area_served)
         return sys_heating
 
     def get_cooling_system_type(self, clgsys):
-        xpath = self.xpath
-        ns = self.ns
-
         sys_cooling = OrderedDict()
-        if clgsys.tag.endswith('HeatPump'):
-            heat_pump_type = xpath(clgsys, 'h:HeatPumpType/text()')
+        if clgsys.is_heat_pump:
+            heat_pump_type = clgsys.heat_pump_type
             if heat_pump_type is None:
                 sys_cooling['type'] = 'heat_pump'
             else:
                 sys_cooling['type'] = self.heat_pump_type_map[heat_pump_type]
         else:
-            assert clgsys.tag.endswith('CoolingSystem')
-            hpxml_cooling_type = xpath(clgsys, 'h:CoolingSystemType/text()', raise_err=True)
+            assert clgsys.element.tag.endswith('CoolingSystem')
+            hpxml_cooling_type = clgsys.require('cooling_system_type')
             try:
                 sys_cooling['type'] = {'central air conditioning': 'split_dx',  # version 2.*
                                        'central air conditioner': 'split_dx',  # version 3.*
@@ -565,10 +956,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                               'iec': [],
                               'idec': []}[sys_cooling['type']]
         if len(clg_type_eff_units) > 0:
-            eff_unit_els = clgsys.xpath(
-                '(h:AnnualCoolingEfficiency|h:AnnualCoolEfficiency)/h:Units/text()',
-                namespaces=ns
-            )
+            eff_unit_els = [eff.units for eff in clgsys.cooling_efficiencies if eff.units is not None]
             eff_unit = None
             efficiency = None
             if len(eff_unit_els) > 0:
@@ -579,17 +967,16 @@ class HPXMLtoHEScoreTranslatorBase(object):
                     elif clg_type_eff_units.index(eff_unit_el) < index:  # Preference to first units
                         index = clg_type_eff_units.index(eff_unit_el)
                         eff_unit = eff_unit_el
-                        eff_value_els = clgsys.xpath('(h:AnnualCoolingEfficiency|h:AnnualCoolEfficiency)' +
-                                                     '[h:Units=$effunits]/h:Value/text()',
-                                                     namespaces=ns,
-                                                     effunits=eff_unit)
+                        eff_value_els = [
+                            eff.value for eff in clgsys.cooling_efficiencies
+                            if eff.units == eff_unit and eff.value is not None
+                        ]
                         if len(eff_value_els) > 0:
                             efficiency = eff_value_els[0]
             if eff_unit is None or efficiency is None:
                 # Use the year instead
                 try:
-                    sys_cooling['year'] = int(clgsys.xpath(
-                        '(h:YearInstalled|h:ModelYear)/text()', namespaces=ns)[0])
+                    sys_cooling['year'] = int(clgsys.years[0])
                     sys_cooling['efficiency_method'] = 'shipment_weighted'
                 except IndexError:
                     raise TranslationError(
@@ -602,44 +989,35 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 sys_cooling['efficiency_method'] = 'user'
                 sys_cooling['efficiency_unit'] = eff_unit.lower()
                 sys_cooling['efficiency'] = float(efficiency)
-        sys_cooling['_capacity'] = convert_to_type(float, xpath(clgsys, 'h:CoolingCapacity/text()'))
-        sys_cooling['_fracload'] = convert_to_type(float, xpath(clgsys, 'h:FractionCoolLoadServed/text()'))
-        sys_cooling['_floorarea'] = convert_to_type(float, xpath(clgsys, 'h:FloorAreaServed/text()'))
+        sys_cooling['_capacity'] = convert_to_type(float, clgsys.cooling_capacity)
+        sys_cooling['_fracload'] = convert_to_type(float, clgsys.fraction_cool_load_served)
+        sys_cooling['_floorarea'] = convert_to_type(float, clgsys.floor_area_served)
         return sys_cooling
 
-    def get_hvac_distribution(self, hvacd_el, bldg):
+    def get_hvac_distribution(self, hvacd, bldg):
         hvac_distribution = {}
 
-        airdist_el = self.xpath(hvacd_el, 'h:DistributionSystemType/h:AirDistribution')
-        if isinstance(airdist_el, list):
+        if len(hvacd.air_distributions) > 1:
             # There really shouldn't be more than one
             assert False
-        elif airdist_el is None:
+        elif not hvacd.air_distributions:
             # This isn't a ducted system, return None
             return
+        airdist = hvacd.air_distributions[0]
 
         # Determine if the entire system is sealed (best we can do, not available duct by duct)
-        is_sealed = self.xpath(
-            airdist_el,
-            '(h:DuctLeakageMeasurement/h:LeakinessObservedVisualInspection="connections sealed w mastic") ' +
-            'or (ancestor::h:HVACDistribution/h:HVACDistributionImprovement/h:DuctSystemSealed="true")')
+        is_sealed = any(
+            measurement.leakiness_observed_visual_inspection == 'connections sealed w mastic'
+            for measurement in airdist.leakage_measurements
+        ) or hvacd.duct_system_sealed == 'true'
 
         # Distinguish between the two cases for duct leakage measurements:
         # (a) duct leakage measurement without DuctType specified and
         # (b) duct leakage measurements for supply and return ducts (i.e., with DuctType specified)
-        leakage_to_outside = self.xpath(
-            airdist_el,
-            'h:DuctLeakageMeasurement[not(h:DuctType)]/h:DuctLeakage[h:TotalOrToOutside="to outside" ' +
-            'and h:Units="CFM25"]/h:Value/text()')
+        leakage_to_outside = airdist.get_leakage_to_outside(None)
         if leakage_to_outside is None:
-            supply_duct_leakage = self.xpath(
-                airdist_el,
-                'h:DuctLeakageMeasurement[h:DuctType="supply"]/h:DuctLeakage' +
-                '[h:TotalOrToOutside="to outside" and h:Units="CFM25"]/h:Value/text()')
-            return_duct_leakage = self.xpath(
-                airdist_el,
-                'h:DuctLeakageMeasurement[h:DuctType="return"]/h:DuctLeakage' +
-                '[h:TotalOrToOutside="to outside" and h:Units="CFM25"]/h:Value/text()')
+            supply_duct_leakage = airdist.get_leakage_to_outside('supply')
+            return_duct_leakage = airdist.get_leakage_to_outside('return')
             if supply_duct_leakage is not None and return_duct_leakage is not None:
                 leakage_to_outside = float(supply_duct_leakage) + float(return_duct_leakage)
 
@@ -653,12 +1031,12 @@ class HPXMLtoHEScoreTranslatorBase(object):
         duct_fracs_by_hescore_duct_loc = defaultdict(float)
         hescore_duct_loc_has_insulation = defaultdict(bool)
         duct_locs = defaultdict(str)
-        for idx, duct_el in enumerate(self.xpath(airdist_el, 'h:Ducts', aslist=True)):
+        for idx, duct in enumerate(airdist.ducts):
             # Duct Identifier
             duct_id = f'duct{idx}'
 
             # Duct Location
-            hpxml_duct_location = self.xpath(duct_el, 'h:DuctLocation/text()')
+            hpxml_duct_location = duct.location
             hescore_duct_location = self.get_duct_location(hpxml_duct_location, bldg)
 
             if hescore_duct_location is None:
@@ -667,13 +1045,11 @@ class HPXMLtoHEScoreTranslatorBase(object):
             duct_locs[duct_id] = hescore_duct_location
 
             # Fraction of Duct Area
-            frac_duct_area = float(self.xpath(duct_el, 'h:FractionDuctArea/text()', raise_err=True))
+            frac_duct_area = float(duct.require('fraction_duct_area'))
             duct_fracs_by_hescore_duct_loc[duct_id] = frac_duct_area
 
             # Duct Insulation
-            duct_has_ins = self.xpath(duct_el, 'h:DuctInsulationRValue > 0 or h:DuctInsulationThickness > 0 or\
-                                      count(h:DuctInsulationMaterial[not(h:None)]) > 0')
-            hescore_duct_loc_has_insulation[duct_id] = duct_has_ins
+            hescore_duct_loc_has_insulation[duct_id] = duct.is_insulated
 
         # Renormalize duct fractions so they add up to one (handles supply/return method if both are specified)
         total_duct_frac = sum(duct_fracs_by_hescore_duct_loc.values())
@@ -829,16 +1205,91 @@ class HPXMLtoHEScoreTranslatorBase(object):
             b = xpath(self.hpxmldoc, 'h:Building[1]', raise_err=True)
             hpxml_bldg_id = xpath(b, 'h:BuildingID/@id', raise_err=True)
 
+        p = self.get_project_element(hpxml_project_id)
+        c = self.get_contractor_element(hpxml_bldg_id, hpxml_contractor_id)
+
+        self.assert_valid_hpxml()
+
+        return self.translate_building(BuildingContext(b, p, c, hpxml_bldg_id))
+
+    def translate_all_buildings(self, hpxml_project_id=None, hpxml_contractor_id=None, dedupe=False,
+                                translations=None):
+        '''
+        Convert every <Building> in a HPXML file, one at a time
+
+        The document is validated and the <Project> and <Contractor> elements are looked up once for all the buildings.
+        Errors translating a building are returned in its result rather than raised so the rest can be translated.
+
+        hpxml_project_id (optional) - If there is more than one <Project> element in an HPXML file,
+            use this one for every building. Otherwise just use the first one.
+        hpxml_contractor_id (optional) - If there is more than one <Contractor> element in an HPXML file,
+            use this one for every building. Otherwise use the one each building references or the first one.
+
+        dedupe (optional) - Translate buildings that are the same apart from their ids, address and comments
+            once and copy the result to the rest with their own address and comments.
+        translations (optional) - dict of the translations to dedupe against, pass the same one to share them
+            between calls. Defaults to a new one.
+
+        Returns a generator of BuildingResult(building_id, hescore, error) namedtuples where one of hescore and
+        error is None.
+        '''
+        if dedupe and translations is None:
+            translations = {}
+        for ctx in self.get_building_contexts(hpxml_project_id, hpxml_contractor_id):
+            try:
+                if not dedupe:
+                    hes_bldg = self.translate_building(ctx)
+                else:
+                    fingerprint = self.get_building_fingerprint(ctx)
+                    if fingerprint in translations:
+                        hes_bldg = self.translate_duplicate_building(ctx, translations[fingerprint])
+                    else:
+                        hes_bldg = self.translate_building(ctx)
+                        translations[fingerprint] = deepcopy(hes_bldg)
+            except Exception as ex:
+                yield BuildingResult(ctx.building_id, None, ex)
+            else:
+                yield BuildingResult(ctx.building_id, hes_bldg, None)
+
+    def get_building_contexts(self, hpxml_project_id=None, hpxml_contractor_id=None):
+        '''
+        Validate the document and make a BuildingContext for every <Building> in it
+
+        Each context can be passed to translate_building(), including from several threads at once.
+
+        hpxml_project_id and hpxml_contractor_id are the same as for translate_all_buildings()
+        '''
+        xpath = self.xpath
+        p = self.get_project_element(hpxml_project_id)
+        if hpxml_contractor_id is not None:
+            c = self.get_contractor_element(None, hpxml_contractor_id)
+        else:
+            contractors = OrderedDict()
+            for contractor in xpath(self.hpxmldoc, 'h:Contractor', aslist=True):
+                contractor_id = xpath(contractor, 'h:ContractorDetails/h:SystemIdentifier/@id')
+                contractors.setdefault(contractor_id, contractor)
+            default_contractor = next(iter(contractors.values()), None)
+
+        self.assert_valid_hpxml()
+
+        for b in xpath(self.hpxmldoc, 'h:Building', aslist=True):
+            if hpxml_contractor_id is None:
+                c = contractors.get(xpath(b, 'h:ContractorID/@id'), default_contractor)
+            yield BuildingContext(b, p, c, xpath(b, 'h:BuildingID/@id'))
+
+    def get_project_element(self, hpxml_project_id=None):
         if hpxml_project_id is not None:
-            p = xpath(
+            return self.xpath(
                 self.hpxmldoc,
                 'h:Project[h:ProjectID/@id=$projectid]',
                 raise_err=True,
                 projectid=hpxml_project_id
             )
         else:
-            p = xpath(self.hpxmldoc, 'h:Project[1]')
+            return self.xpath(self.hpxmldoc, 'h:Project[1]')
 
+    def get_contractor_element(self, hpxml_bldg_id, hpxml_contractor_id=None):
+        xpath = self.xpath
         if hpxml_contractor_id is not None:
             c = xpath(
                 self.hpxmldoc,
@@ -855,42 +1306,169 @@ class HPXMLtoHEScoreTranslatorBase(object):
             )
             if c is None:
                 c = xpath(self.hpxmldoc, 'h:Contractor[1]')
+        return c
+
+    def get_subtree_digest(self, el, ctx):
+        try:
+            return ctx.subtree_digests[el]
+        except KeyError:
+            digest = hashlib.sha256(etree.tostring(el, method='c14n')).digest()
+            ctx.subtree_digests[el] = digest
+            return digest
+
+    def get_section_key(self, section, ctx):
+        """Hash everything a section of the translation reads, see ``SECTION_INPUTS``"""
+        section_inputs = self.SECTION_INPUTS[section]
+        h = hashlib.sha256()
+        h.update('{}.{}:{}'.format(type(self).__module__, type(self).__name__, section).encode('utf-8'))
+        for xpathquery in section_inputs.xpaths:
+            h.update(xpathquery.encode('utf-8'))
+            for el in self.xpath(ctx.building, xpathquery, aslist=True):
+                h.update(self.get_subtree_digest(el, ctx))
+        if section_inputs.project and ctx.project is not None:
+            h.update(b'project')
+            h.update(self.get_subtree_digest(ctx.project, ctx))
+        today_fallback = SECTION_TODAY_FALLBACKS.get(section)
+        if today_fallback is not None and self.xpath(ctx.building, today_fallback) is None:
+            h.update(dt.date.today().isoformat().encode('utf-8'))
+        for hescore_key in section_inputs.hescore:
+            h.update(hescore_key.encode('utf-8'))
+            value = ctx.hescore
+            for k in hescore_key.split('.'):
+                value = value[k]
+            h.update(json.dumps(value, default=_json_default).encode('utf-8'))
+        return h.hexdigest()
+
+    def get_building_fingerprint(self, ctx):
+        """Hash a building leaving out its ids and the parts in ``DEDUPE_STRIPPED``
+
+        The ids are renumbered in the order they first appear, so buildings only have the same hash if their
+        elements refer to each other the same way. The <Project> and <Contractor> are hashed too, and so are the
+        translator class and the <Transaction> in the header, which the translation also reads, so fingerprints can be
+        compared between documents.
+        """
+        b = deepcopy(ctx.building)
+        for xpathquery in DEDUPE_STRIPPED:
+            for el in self.xpath(b, xpathquery, aslist=True):
+                el.getparent().remove(el)
+        new_ids = {}
+        for el in b.iter():
+            if el.text is not None and not el.text.strip():
+                el.text = None
+            if el.tail is not None and not el.tail.strip():
+                el.tail = None
+            for attr in ID_ATTRIBUTES:
+                value = el.get(attr)
+                if value is not None:
+                    el.set(attr, new_ids.setdefault(value, 'id{}'.format(len(new_ids))))
+        h = hashlib.sha256(etree.tostring(b, method='c14n', with_comments=False))
+        for el in (ctx.project, ctx.contractor):
+            h.update(b'none' if el is None else self.get_subtree_digest(el, ctx))
+        transaction_type = self.xpath(self.hpxmldoc, 'h:XMLTransactionHeaderInformation/h:Transaction/text()')
+        h.update(json.dumps(['{}.{}'.format(type(self).__module__, type(self).__name__), transaction_type]).encode())
+        return h.hexdigest()
+
+    def translate_duplicate_building(self, ctx, hescore):
+        """Translate a building from the translation of one with the same ``get_building_fingerprint()``
+
+        Only the address and comments are translated, everything else is copied. The rest has already been validated,
+        so only the sections they are in are validated again.
+        """
+        with self.stage('translate', ctx.building_id):
+            hes_bldg = deepcopy(hescore)
+            hes_bldg['address'] = self.get_building_address(ctx.building)
+            hes_bldg['about'].pop('comments', None)
+            self.set_building_comments(hes_bldg['about'], ctx.building, ctx.project)
+            json_validator = get_hescore_json_validator()
+            for section in ('address', 'about'):
+                section_validator = json_validator.evolve(schema=json_validator.schema['properties'][section])
+                if not section_validator.is_valid(hes_bldg[section]):
+                    # Validate it all to raise the same error a full translation would
+                    raise best_match(json_validator.iter_errors(hes_bldg))
+            return hes_bldg
+
+    def translate_section(self, section, ctx, method, *args):
+        """Call the method that translates a section, or get its result from the section cache"""
+        if self.section_cache is None:
+            return method(*args)
+        key = self.get_section_key(section, ctx)
+        try:
+            return self.section_cache.get(section, key)
+        except KeyError:
+            pass
+        result = method(*args)
+        self.section_cache.put(key, result)
+        return result
 
-        self.schema.assertValid(self.hpxmldoc)
+    def translate_building(self, ctx):
+        '''
+        Convert a <Building> element to a python dict with the same structure as the HEScore API
+
+        ctx - BuildingContext of the <Building>, <Project> and <Contractor> elements to use
+        '''
+        with self.stage('translate', ctx.building_id):
+            return self._translate_building(ctx)
 
-        with open(self.jsonschemapath, 'r') as f:
-            json_schema = json.loads(f.read())
-            f.close()
+    def _translate_building(self, ctx):
+        json_validator = get_hescore_json_validator()
+        b = ctx.building
+        p = ctx.project
+        c = ctx.contractor
+        stage = self.stage
+        bldg_id = ctx.building_id
 
         # Create return dict
-        hes_bldg = OrderedDict()
-        hes_bldg['version'] = json_schema['properties']['version']['const']
-        hes_bldg['address'] = self.get_building_address(b)
-        if self.check_hpwes(p, b):
-            hes_bldg['hpwes'] = self.get_hpwes(p, c)
-
-        hes_bldg['about'] = self.get_building_about(b, p)
+        hes_bldg = ctx.hescore = OrderedDict()
+        hes_bldg['version'] = json_validator.schema['properties']['version']['const']
+        with stage('address', bldg_id):
+            hes_bldg['address'] = self.translate_section('address', ctx, self.get_building_address, b)
+        with stage('hpwes', bldg_id):
+            if self.check_hpwes(p, b):
+                hes_bldg['hpwes'] = self.get_hpwes(p, c)
+
+        with stage('about', bldg_id):
+            hes_bldg['about'] = self.translate_section('about', ctx, self.get_building_about, b, p)
+        ctx.sidemap = self.get_sidemap(hes_bldg['about']['orientation'])
         hes_bldg['zone'] = OrderedDict()
         hes_bldg['zone']['zone_roof'] = None  # to save the spot in the order
-        hes_bldg['zone']['zone_floor'] = self.get_building_zone_floor(b, hes_bldg['about'])
+        with stage('zone_floor', bldg_id):
+            hes_bldg['zone']['zone_floor'] = self.translate_section(
+                'zone_floor', ctx, self.get_building_zone_floor, ctx, hes_bldg['about']
+            )
         stories = self.get_nstories(hes_bldg['about'])
         footprint_area = self.get_footprint_area(hes_bldg, stories)
-        hes_bldg['zone']['zone_roof'] = self.get_building_zone_roof(b, footprint_area)
-        skylights = self.get_skylights(b, hes_bldg['zone']['zone_roof'])
+        with stage('zone_roof', bldg_id):
+            hes_bldg['zone']['zone_roof'] = self.translate_section(
+                'zone_roof', ctx, self.get_building_zone_roof, ctx, footprint_area
+            )
+        with stage('skylights', bldg_id):
+            skylights = self.translate_section(
+                'skylights', ctx, self.get_skylights, ctx, hes_bldg['zone']['zone_roof']
+            )
         for roof_num in range(len(hes_bldg['zone']['zone_roof'])):
             hes_bldg['zone']['zone_roof'][roof_num]['zone_skylight'] = skylights[roof_num]
-        hes_bldg['zone']['zone_wall'] = self.get_building_zone_wall(b, hes_bldg['about'])
+        with stage('zone_wall', bldg_id):
+            hes_bldg['zone']['zone_wall'] = self.translate_section(
+                'zone_wall', ctx, self.get_building_zone_wall, ctx, hes_bldg['about'], ctx.sidemap
+            )
         hes_bldg['systems'] = OrderedDict()
-        hes_bldg['systems']['hvac'] = self.get_hvac(b, hes_bldg)
-        hes_bldg['systems']['domestic_hot_water'] = self.get_systems_dhw(b)
-        generation = self.get_generation(b)
+        with stage('hvac', bldg_id):
+            hes_bldg['systems']['hvac'] = self.translate_section('hvac', ctx, self.get_hvac, ctx, hes_bldg)
+        with stage('dhw', bldg_id):
+            hes_bldg['systems']['domestic_hot_water'] = self.translate_section('dhw', ctx, self.get_systems_dhw, ctx)
+        with stage('generation', bldg_id):
+            generation = self.translate_section('generation', ctx, self.get_generation, ctx)
         if generation:
             hes_bldg['systems']['generation'] = generation
         self.remove_hidden_keys(hes_bldg)
 
         # Validate against JSON schema
-        validate(hes_bldg, json_schema, format_checker=FormatChecker())
-        self.validate_hescore_inputs(hes_bldg)
+        with stage('json_validate', bldg_id):
+            error = best_match(json_validator.iter_errors(hes_bldg))
+        if error is not None:
+            raise error
+        with stage('bounds_check', bldg_id):
+            self.validate_hescore_inputs(hes_bldg)
         return hes_bldg
 
     @staticmethod
@@ -924,10 +1502,9 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
     def get_building_address(self, b):
         xpath = self.xpath
-        ns = self.ns
         bldgaddr = OrderedDict()
         hpxmladdress = xpath(b, 'h:Site/h:Address[h:AddressType="street"]', raise_err=True)
-        bldgaddr['address'] = ' '.join(hpxmladdress.xpath('h:Address1/text() | h:Address2/text()', namespaces=ns))
+        bldgaddr['address'] = ' '.join(xpath(hpxmladdress, 'h:Address1/text() | h:Address2/text()', aslist=True))
         if not bldgaddr['address'].strip():
             raise ElementNotFoundError(hpxmladdress, 'h:Address1/text() | h:Address2/text()', {})
         bldgaddr['city'] = xpath(b, 'h:Site/h:Address/h:CityMunicipality/text()', raise_err=True)
@@ -1077,26 +1654,24 @@ class HPXMLtoHEScoreTranslatorBase(object):
         except TranslationError:
             raise TranslationError('Either AzimuthOfFrontOfHome or OrientationOfFrontOfHome is required.')
         bldg_about['orientation'] = self.azimuth_to_hescore_orientation[house_azimuth]
-        self.sidemap = {house_azimuth: 'front', (house_azimuth + 90) % 360: 'left',
-                        (house_azimuth + 180) % 360: 'back', (house_azimuth + 270) % 360: 'right'}
 
         blower_door_test = None
         air_infilt_est = None
         is_enclosure_air_sealed = False
-        for air_infilt_meas in b.xpath('h:BuildingDetails/h:Enclosure/h:AirInfiltration/h:AirInfiltrationMeasurement',
-                                       namespaces=ns):
+        for air_infilt_meas in xpath(b, 'h:BuildingDetails/h:Enclosure/h:AirInfiltration/h:AirInfiltrationMeasurement',
+                                     aslist=True):
             # Take the last blower door test that is in CFM50, or if that's not available, ACH50
             house_pressure = convert_to_type(float, xpath(air_infilt_meas, 'h:HousePressure/text()'))
             blower_door_test_units = xpath(air_infilt_meas, 'h:BuildingAirLeakage/h:UnitofMeasure/text()')
             if house_pressure == 50 and (blower_door_test_units == 'CFM' or
                                          (blower_door_test_units == 'ACH' and blower_door_test is None)):
                 blower_door_test = air_infilt_meas
-            elif air_infilt_meas.xpath('count(h:LeakinessDescription)', namespaces=ns) > 0:
+            elif xpath(air_infilt_meas, 'count(h:LeakinessDescription)') > 0:
                 air_infilt_est = air_infilt_meas
-        if b.xpath('count(h:BuildingDetails/h:Enclosure/h:AirInfiltration/h:AirSealing)', namespaces=ns) > 0:
+        if xpath(b, 'count(h:BuildingDetails/h:Enclosure/h:AirInfiltration/h:AirSealing)') > 0:
             is_enclosure_air_sealed = True
-        if b.xpath('count(h:BuildingDetails/h:Enclosure/h:AirInfiltration/h:AirInfiltrationMeasurement\
-                /h:BuildingAirLeakage)', namespaces=ns) > 0 and blower_door_test is None:
+        if xpath(b, 'count(h:BuildingDetails/h:Enclosure/h:AirInfiltration/h:AirInfiltrationMeasurement\
+                /h:BuildingAirLeakage)') > 0 and blower_door_test is None:
             raise TranslationError(
                 'BuildingAirLeakage/UnitofMeasure must be either "CFM" or "ACH" and HousePressure must be 50')
         if blower_door_test is None and air_infilt_est is None and not is_enclosure_air_sealed:
@@ -1123,60 +1698,46 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 bldg_about['air_sealing_present'] = False
         elif is_enclosure_air_sealed:
             bldg_about['air_sealing_present'] = True
-        # Get comments
+        self.set_building_comments(bldg_about, b, p)
+        return bldg_about
+
+    def set_building_comments(self, bldg_about, b, p):
+        xpath = self.xpath
         extension_comment = xpath(b, 'h:extension/h:Comments/text()')
         if extension_comment is not None:
             bldg_about['comments'] = extension_comment
         elif p is not None:
             bldg_about['comments'] = xpath(p, 'h:ProjectDetails/h:Notes/text()')
-        return bldg_about
 
     def get_assembly_eff_rvalues_dict(self, construction):
-        assert construction in ['wall', 'roof', 'ceiling', 'floor', 'knee_wall', 'int_wall']
-        with open(os.path.join(thisdir, 'lookups', f'lu_{construction}_eff_rvalue.csv'), newline='') as f:
-            reader = csv.DictReader(f)
-            assembly_eff_rvalues = {}
-            for row in reader:
-                assembly_eff_rvalues[row['doe2code']] = float(row['Eff-R-value'])
-        return assembly_eff_rvalues
+        return dict(get_assembly_rvalue_table(construction).rvalues)
 
     @property
     def wall_assembly_eff_rvalues(self):
-        if self._wall_assembly_eff_rvalues is None:
-            self._wall_assembly_eff_rvalues = self.get_assembly_eff_rvalues_dict('wall')
-        return self._wall_assembly_eff_rvalues
+        return get_assembly_rvalue_table('wall').rvalues
 
     @property
     def roof_assembly_eff_rvalues(self):
-        if self._roof_assembly_eff_rvalues is None:
-            self._roof_assembly_eff_rvalues = self.get_assembly_eff_rvalues_dict('roof')
-        return self._roof_assembly_eff_rvalues
+        return get_assembly_rvalue_table('roof').rvalues
 
     @property
     def ceiling_assembly_eff_rvalues(self):
-        if self._ceiling_assembly_eff_rvalues is None:
-            self._ceiling_assembly_eff_rvalues = self.get_assembly_eff_rvalues_dict('ceiling')
-        return self._ceiling_assembly_eff_rvalues
+        return get_assembly_rvalue_table('ceiling').rvalues
 
     @property
     def floor_assembly_eff_rvalues(self):
-        if self._floor_assembly_eff_rvalues is None:
-            self._floor_assembly_eff_rvalues = self.get_assembly_eff_rvalues_dict('floor')
-        return self._floor_assembly_eff_rvalues
+        return get_assembly_rvalue_table('floor').rvalues
 
     @property
     def knee_wall_assembly_eff_rvalues(self):
-        if self._knee_wall_assembly_eff_rvalues is None:
-            self._knee_wall_assembly_eff_rvalues = self.get_assembly_eff_rvalues_dict('knee_wall')
-        return self._knee_wall_assembly_eff_rvalues
+        return get_assembly_rvalue_table('knee_wall').rvalues
 
     @property
     def int_wall_assembly_eff_rvalues(self):
-        if self._int_wall_assembly_eff_rvalues is None:
-            self._int_wall_assembly_eff_rvalues = self.get_assembly_eff_rvalues_dict('int_wall')
-        return self._int_wall_assembly_eff_rvalues
+        return get_assembly_rvalue_table('int_wall').rvalues
 
-    def get_building_zone_roof(self, b, footprint_area):
+    def get_building_zone_roof(self, ctx, footprint_area):
+        b = ctx.building
 
         def get_predominant_roof_property(atticds, attic_key):
             roof_area_by_cat = defaultdict(float)
@@ -1190,21 +1751,18 @@ class HPXMLtoHEScoreTranslatorBase(object):
             except RoundOutOfBounds:
                 raise TranslationError('Roof R-value outside HEScore bounds, roof id: %s' % roofid)
 
-        xpath = self.xpath
-
         # building.zone.zone_roof--------------------------------------------------
-        attics = {}
-        for attic in xpath(b, 'descendant::h:Attics/h:Attic', aslist=True, raise_err=True):
-            atticid = xpath(attic, 'h:SystemIdentifier/@id', raise_err=True, aslist=False)
-            attics[atticid] = attic
-        roofs = {}
-        for roof in xpath(b, 'descendant::h:Roof', aslist=True, raise_err=True):
-            roofid = xpath(roof, 'h:SystemIdentifier/@id', raise_err=True, aslist=False)
-            roofs[roofid] = roof
+        components = ctx.components
+        if not components.attics:
+            raise ElementNotFoundError(b, 'descendant::h:Attics/h:Attic', {})
+        attics = OrderedDict((attic.get_id(), attic) for attic in components.attics)
+        if not components.roofs:
+            raise ElementNotFoundError(b, 'descendant::h:Roof', {})
+        roofs = OrderedDict((roof.get_id(), roof) for roof in components.roofs)
 
         atticds = []
         for atticid, attic in attics.items():
-            roofids = xpath(attic, 'h:AttachedToRoof/@idref', aslist=True)
+            roofids = list(attic.roof_idrefs)
 
             if len(roofids) == 0:
                 if len(roofs) == 1:
@@ -1222,7 +1780,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
             # Ceiling or Roof area
             if atticd['rooftype'] == 'vented_attic':
-                atticd['ceiling_area'] = self.get_ceiling_area(attic)
+                atticd['ceiling_area'] = self.get_ceiling_area(attic, ctx)
             else:  # cathedral ceiling, flat roof, bowstring roof, and below apartment
                 atticd['roof_area'] = sum(self.get_attic_roof_area(roofs[roofid]) for roofid in roofids)
 
@@ -1249,7 +1807,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                         raise
 
                 # Roof color
-                solar_absorptance = convert_to_type(float, xpath(roof, 'h:SolarAbsorptance/text()'))
+                solar_absorptance = convert_to_type(float, roof.solar_absorptance)
                 if solar_absorptance is not None:
                     attic_roof_d['roof_absorptance'] = solar_absorptance
                     attic_roof_d['roofcolor'] = 'cool_color'
@@ -1261,14 +1819,14 @@ class HPXMLtoHEScoreTranslatorBase(object):
                             'medium dark': 'medium_dark',
                             'dark': 'dark',
                             'reflective': 'white'
-                        }[xpath(roof, 'h:RoofColor/text()', raise_err=True)]
+                        }[roof.require('roof_color')]
                     except KeyError:
                         raise TranslationError(
                             f"Attic {atticid}: Invalid or missing RoofColor in Roof: {attic_roof_d['roof_id']}"
                         )
 
                 # Exterior finish
-                hpxml_roof_type = xpath(roof, 'h:RoofType/text()')
+                hpxml_roof_type = roof.roof_type
                 try:
                     attic_roof_d['extfinish'] = {
                         'shingles': 'co',
@@ -1292,7 +1850,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
                 # construction type
                 has_rigid_sheathing = self.attic_has_rigid_sheathing(attic, roof)
-                has_radiant_barrier = xpath(roof, 'h:RadiantBarrier="true"')
+                has_radiant_barrier = roof.radiant_barrier == 'true'
                 if has_radiant_barrier:
                     attic_roof_d['roofconstype'] = 'rb'
                 elif has_rigid_sheathing:
@@ -1308,12 +1866,8 @@ class HPXMLtoHEScoreTranslatorBase(object):
                         constype_for_lookup = 'wf'
                     else:
                         constype_for_lookup = attic_roof_d['roofconstype']
-                    closest_roof_code, closest_code_rvalue = \
-                        min([(doe2code, code_rvalue)
-                             for doe2code, code_rvalue in self.roof_assembly_eff_rvalues.items()
-                             if doe2code[2:4] in constype_for_lookup and
-                             doe2code[6:8] == attic_roof_d['extfinish']],
-                            key=lambda x: abs(x[1] - float(roof_assembly_rvalue)))
+                    closest_roof_code, closest_code_rvalue = get_assembly_rvalue_table('roof').nearest(
+                        float(roof_assembly_rvalue), constype_for_lookup, attic_roof_d['extfinish'])
                     attic_roof_d['roof_assembly_rvalue'] = closest_code_rvalue
                     # Model as a roof without radiant barrier if R-value is > 0 and the radiant barrier is present
                     if attic_roof_d['roofconstype'] == 'rb' and int(closest_roof_code[4:6]) > 0:
@@ -1381,26 +1935,22 @@ class HPXMLtoHEScoreTranslatorBase(object):
             # Knee Walls
             if atticd['rooftype'] == 'vented_attic':
                 knee_wall_ds = []
-                for knee_wall in self.get_attic_knee_walls(attic):
+                for knee_wall in self.get_attic_knee_walls(attic, ctx):
                     knee_wall_d = {}
                     knee_wall_d['assembly_eff_rvalue'] = self.get_wall_assembly_rvalue(knee_wall)
                     if knee_wall_d['assembly_eff_rvalue'] is not None:
-                        knee_wall_d['assembly_code'], _ = min(
-                            self.knee_wall_assembly_eff_rvalues.items(),
-                            key=lambda x: abs(x[1] - knee_wall_d['assembly_eff_rvalue'])
-                        )
+                        knee_wall_d['assembly_code'], _ = get_assembly_rvalue_table('knee_wall').nearest(
+                            knee_wall_d['assembly_eff_rvalue'])
                     elif self.every_wall_layer_has_nominal_rvalue(knee_wall):
-                        nominal_rvalue = self.xpath(knee_wall, 'sum(h:Insulation/h:Layer/h:NominalRValue)')
-                        knee_wall_d['assembly_code'], knee_wall_d['assembly_eff_rvalue'] = min(
-                            self.knee_wall_assembly_eff_rvalues.items(),
-                            key=lambda x: abs(int(re.search(r'(\d+)', x[0]).group(1)) - nominal_rvalue)
-                        )
+                        nominal_rvalue = sum_nominal_rvalues(knee_wall.layers)
+                        knee_wall_d['assembly_code'], knee_wall_d['assembly_eff_rvalue'] = \
+                            get_assembly_rvalue_table('knee_wall').nearest_nominal(nominal_rvalue)
                     else:
                         raise TranslationError(
                             'Attic knee walls need to have either an AssemblyRValue '
                             'or a NominalRValue on every insulation layer.'
                         )
-                    knee_wall_d['area'] = float(self.xpath(knee_wall, 'h:Area/text()', raise_err=True))
+                    knee_wall_d['area'] = float(knee_wall.require('area'))
                     knee_wall_ds.append(knee_wall_d)
                 atticd['knee_walls'] = knee_wall_ds
 
@@ -1410,15 +1960,12 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 sum([attic_roofs_dict['roof_area'] / attic_roofs_dict['roof_assembly_rvalue']
                     for attic_roofs_dict in attic_roof_ls])
 
-            attic_floor_rvalue = self.get_attic_floor_assembly_rvalue(attic, b)
+            attic_floor_rvalue = self.get_attic_floor_assembly_rvalue(attic, ctx)
             if attic_floor_rvalue is not None:
-                _, closest_code_rvalue = min(
-                    self.ceiling_assembly_eff_rvalues.items(),
-                    key=lambda x: abs(x[1] - attic_floor_rvalue)
-                )
+                _, closest_code_rvalue = get_assembly_rvalue_table('ceiling').nearest(attic_floor_rvalue)
                 atticd['attic_floor_assembly_rvalue'] = closest_code_rvalue
-            elif self.every_attic_floor_layer_has_nominal_rvalue(attic, b):
-                attic_floor_rvalue = self.get_attic_floor_rvalue(attic, b)
+            elif self.every_attic_floor_layer_has_nominal_rvalue(attic, ctx):
+                attic_floor_rvalue = self.get_attic_floor_rvalue(attic, ctx)
                 closest_attic_floor_rvalue = roof_round_to_nearest(
                     roofid, attic_floor_rvalue, (0, 3, 6, 9, 11, 13, 15, 19, 21, 25, 30, 35, 38, 44, 49, 55, 60))
                 lookup_code = f"ecwf{closest_attic_floor_rvalue:02d}"
@@ -1500,18 +2047,13 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 # Since there is no lookup key for roof_code "rfrb**", this step is required separately
                 roof_code = f"rfrb00{atticd['extfinish']}"
             else:
-                closest_roof_code, closest_code_rvalue = \
-                    min([(doe2code, code_rvalue)
-                        for doe2code, code_rvalue in self.roof_assembly_eff_rvalues.items()
-                        if doe2code[2:4] in atticd['roofconstype'] and doe2code[6:8] == atticd['extfinish']],
-                        key=lambda x: abs(x[1] - atticd['roof_assembly_rvalue']))
+                closest_roof_code, closest_code_rvalue = get_assembly_rvalue_table('roof').nearest(
+                    atticd['roof_assembly_rvalue'], atticd['roofconstype'], atticd['extfinish'])
                 roof_code = closest_roof_code
 
             # Get Attic Floor R-value
-            closest_floor_code, closest_code_rvalue = \
-                min([(doe2code, code_rvalue)
-                     for doe2code, code_rvalue in self.ceiling_assembly_eff_rvalues.items()],
-                    key=lambda x: abs(x[1] - atticd['attic_floor_assembly_rvalue']))
+            closest_floor_code, closest_code_rvalue = get_assembly_rvalue_table('ceiling').nearest(
+                atticd['attic_floor_assembly_rvalue'])
             attic_floor_code = closest_floor_code
 
             # Knee Walls
@@ -1528,10 +2070,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                     ua += kw['area'] / kw['assembly_eff_rvalue']
                     area += kw['area']
                 eff_rvalue = area / ua
-                assembly_code, _ = min(
-                    self.knee_wall_assembly_eff_rvalues.items(),
-                    key=lambda x: abs(x[1] - eff_rvalue)
-                )
+                assembly_code, _ = get_assembly_rvalue_table('knee_wall').nearest(eff_rvalue)
                 knee_wall_d = {
                     'area': area,
                     'assembly_code': assembly_code
@@ -1558,26 +2097,18 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
         return zone_roof
 
-    def get_skylights(self, b, zone_roof):
-        ns = self.ns
-        xpath = self.xpath
-        skylights = b.xpath('descendant::h:Skylight', namespaces=ns)
-
+    def get_skylights(self, ctx, zone_roof):
         skylight_by_roof_id = {}
         skylight_by_roof_num = {}
         for i in range(len(zone_roof)):
             skylight_by_roof_num[i] = []
 
-        for skylight in skylights:
-            if xpath(skylight, 'h:AttachedToRoof/@idref') is None:
+        for skylight in ctx.components.skylights:
+            if not skylight.roof_idrefs:
                 # No roof attached, attach to the first roof
                 skylight_by_roof_num[0].append(skylight)
             else:
-                try:
-                    skylight_by_roof_id[xpath(skylight, 'h:AttachedToRoof/@idref')].append(skylight)
-                except KeyError:
-                    skylight_by_roof_id[xpath(skylight, 'h:AttachedToRoof/@idref')] = []
-                    skylight_by_roof_id[xpath(skylight, 'h:AttachedToRoof/@idref')].append(skylight)
+                skylight_by_roof_id.setdefault(skylight.roof_idrefs[0], []).append(skylight)
 
         for roof_id, skylights in list(skylight_by_roof_id.items()):
             # roof_found = False
@@ -1602,8 +2133,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 skylight_d['skylight_area'] = 0
                 continue
             # Get areas, u-factors, and shgcs if they exist
-            uvalues, shgcs, areas = map(list, zip(*[[xpath(skylight, 'h:%s/text()' % x)
-                                                     for x in ('UFactor', 'SHGC', 'Area')]
+            uvalues, shgcs, areas = map(list, zip(*[[skylight.ufactor, skylight.shgc, skylight.area]
                                                     for skylight in skylights]))
             if None in areas:
                 raise TranslationError('Every skylight needs an area.')
@@ -1636,7 +2166,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                 # use a construction code
                 skylight_type_areas = {}
                 for skylight in skylights:
-                    area = convert_to_type(float, xpath(skylight, 'h:Area/text()', raise_err=True))
+                    area = convert_to_type(float, skylight.require('area'))
                     skylight_code = self.get_window_code(skylight)
                     try:
                         skylight_type_areas[skylight_code] += area
@@ -1647,7 +2177,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
             skylight_solarscreen_areas = {}
             for skylight in skylights:
                 solar_screen = self.get_solarscreen(skylight)
-                area = convert_to_type(float, xpath(skylight, 'h:Area/text()', raise_err=True))
+                area = convert_to_type(float, skylight.require('area'))
                 try:
                     skylight_solarscreen_areas[solar_screen] += area
                 except KeyError:
@@ -1657,7 +2187,17 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
         return zone_skylight
 
-    def get_building_zone_floor(self, b, bldg_about):
+    def sort_foundations(self, foundations, ctx):
+        '''
+        Sort the foundations from largest area to smallest
+
+        Returns the sorted list of foundations and a list of their areas
+        '''
+        fnd_areas = [(self.get_foundation_area(fnd, ctx), fnd) for fnd in foundations]
+        fnd_areas.sort(key=lambda x: x[0], reverse=True)
+        return [fnd for area, fnd in fnd_areas], [area for area, fnd in fnd_areas]
+
+    def get_building_zone_floor(self, ctx, bldg_about):
 
         def floor_round_to_nearest(floorid, *args):
             try:
@@ -1665,17 +2205,12 @@ class HPXMLtoHEScoreTranslatorBase(object):
             except RoundOutOfBounds:
                 raise TranslationError('Floor R-value outside HEScore bounds, floor id: %s' % floorid)
 
-        ns = self.ns
-        xpath = self.xpath
         smallnum = 0.01
 
         # building.zone.zone_floor-------------------------------------------------
         zone_floors = []
 
-        foundations = b.xpath('descendant::h:Foundations/h:Foundation', namespaces=ns)
-
-        foundations, get_fnd_area = self.sort_foundations(foundations, b)
-        areas = list(map(get_fnd_area, foundations))
+        foundations, areas = self.sort_foundations(ctx.components.foundations, ctx)
         if len(areas) > 1:
             for area in areas:
                 if abs(area) < smallnum:  # area == 0
@@ -1701,16 +2236,16 @@ class HPXMLtoHEScoreTranslatorBase(object):
             zone_floor['floor_area'] = area * area_mult
 
             # Foundation type
-            hpxml_foundation_type = xpath(foundation, 'name(h:FoundationType/*)', raise_err=True)
+            hpxml_foundation_type = foundation.foundation_type
             if hpxml_foundation_type == 'Basement':
-                bsmtcond = xpath(foundation, 'h:FoundationType/h:Basement/h:Conditioned="true"')
+                bsmtcond = foundation.basement_conditioned == 'true'
                 if bsmtcond:
                     zone_floor['foundation_type'] = 'cond_basement'
                 else:
                     # assumed unconditioned basement if h:Conditioned is missing
                     zone_floor['foundation_type'] = 'uncond_basement'
             elif hpxml_foundation_type == 'Crawlspace':
-                crawlvented = xpath(foundation, 'h:FoundationType/h:Crawlspace/h:Vented="true"')
+                crawlvented = foundation.crawlspace_vented == 'true'
                 if crawlvented:
                     zone_floor['foundation_type'] = 'vented_crawl'
                 else:
@@ -1741,16 +2276,16 @@ class HPXMLtoHEScoreTranslatorBase(object):
             # Foundation Wall insulation R-value
             fwua = 0
             fwtotalarea = 0
-            foundationwalls = self.get_foundation_walls(foundation, b)
+            foundationwalls = self.get_foundation_walls(foundation, ctx)
             fw_eff_rvalues = dict(list(zip((0, 5, 11, 19), (4, 7.9, 11.6, 19.6))))
             if len(foundationwalls) > 0:
                 if zone_floor['foundation_type'] == 'slab_on_grade':
                     raise TranslationError('The house is a slab on grade foundation, but has foundation walls.')
                 del fw_eff_rvalues[5]  # remove the value for slab insulation
                 for fwall in foundationwalls:
-                    fwallid = xpath(fwall, 'h:SystemIdentifier/@id', raise_err=True)
+                    fwallid = fwall.get_id()
                     fwarea, fwlength, fwheight = \
-                        [convert_to_type(float, xpath(fwall, 'h:%s/text()' % x)) for x in ('Area', 'Length', 'Height')]
+                        [convert_to_type(float, x) for x in (fwall.area, fwall.length, fwall.height)]
                     if fwarea is None:
                         try:
                             fwarea = fwlength * fwheight
@@ -1764,7 +2299,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                         raise TranslationError(
                             f'Every foundation wall insulation layer needs a NominalRValue, fwall_id = {fwallid}')
                     else:
-                        fwrvalue = xpath(fwall, 'sum(h:Insulation/h:Layer/h:NominalRValue)')
+                        fwrvalue = sum_nominal_rvalues(fwall.layers)
                         fweffrvalue = fw_eff_rvalues[min(list(fw_eff_rvalues.keys()), key=lambda x: abs(fwrvalue - x))]
                         fwua += fwarea / fweffrvalue
                         fwtotalarea += fwarea
@@ -1772,12 +2307,12 @@ class HPXMLtoHEScoreTranslatorBase(object):
             elif zone_floor['foundation_type'] == 'slab_on_grade':
                 del fw_eff_rvalues[11]  # remove unused values
                 del fw_eff_rvalues[19]
-                slabs = self.get_foundation_slabs(foundation, b)
+                slabs = self.get_foundation_slabs(foundation, ctx)
                 slabua = 0
                 slabtotalperimeter = 0
                 for slab in slabs:
-                    slabid = xpath(slab, 'h:SystemIdentifier/@id', raise_err=True)
-                    exp_perimeter = convert_to_type(float, xpath(slab, 'h:ExposedPerimeter/text()'))
+                    slabid = slab.get_id()
+                    exp_perimeter = convert_to_type(float, slab.exposed_perimeter)
                     if exp_perimeter is None:
                         if len(slabs) == 1:
                             exp_perimeter = 1.0
@@ -1788,7 +2323,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
                         raise TranslationError(
                             f"Every slab insulation layer needs a NominalRValue, slab_id = {slabid}")
                     else:
-                        slabrvalue = xpath(slab, 'sum(h:PerimeterInsulation/h:Layer/h:NominalRValue)')
+                        slabrvalue = sum_nominal_rvalues(slab.layers)
                         slabeffrvalue = fw_eff_rvalues[
                             min(list(fw_eff_rvalues.keys()), key=lambda x: abs(slabrvalue - x))]
                         slabua += exp_perimeter / slabeffrvalue
@@ -1806,12 +2341,12 @@ class HPXMLtoHEScoreTranslatorBase(object):
                     zone_floor['foundation_type'] == 'above_other_unit'):
                 ffua = 0
                 fftotalarea = 0
-                framefloors = self.get_foundation_frame_floors(foundation, b)
+                framefloors = self.get_foundation_frame_floors(foundation, ctx)
                 doe2_floor_rvalues = (0, 11, 13, 15, 19, 21, 25, 30, 38)
                 if len(framefloors) > 0:
                     for framefloor in framefloors:
-                        ffid = xpath(framefloor, 'h:SystemIdentifier/@id', raise_err=True)
-                        ffarea = convert_to_type(float, xpath(framefloor, 'h:Area/text()'))
+                        ffid = framefloor.get_id()
+                        ffarea = convert_to_type(float, framefloor.area)
                         if ffarea is None:
                             if len(framefloors) == 1:
                                 ffarea = 1.0
@@ -1822,22 +2357,18 @@ class HPXMLtoHEScoreTranslatorBase(object):
                         if framefloor_assembly_rvalue is not None:
                             ffeffrvalue = framefloor_assembly_rvalue
                         elif self.every_framefloor_layer_has_nominal_rvalue(framefloor, framefloor):
-                            ffrvalue = xpath(framefloor, 'sum(h:Insulation/h:Layer/h:NominalRValue)')
+                            ffrvalue = sum_nominal_rvalues(framefloor.layers)
                             closest_floor_rvalue = floor_round_to_nearest(ffid, ffrvalue, doe2_floor_rvalues)
                             lookup_code = f"efwf{closest_floor_rvalue:02d}ca"
                             ffeffrvalue = self.floor_assembly_eff_rvalues[lookup_code]
                         else:
-                            ffid = xpath(framefloor, 'h:SystemIdentifier/@id', raise_err=True)
                             raise TranslationError(
                                 'Every frame floor insulation layer needs a NominalRValue or AssemblyEffectiveRValue '
                                 f"needs to be defined, framefloor_id = {ffid}")
                         ffua += ffarea / ffeffrvalue
                         fftotalarea += ffarea
                     ffrvalue = fftotalarea / ffua
-                    comb_ff_code, comb_rvalue = \
-                        min([(doe2code, code_rvalue)
-                            for doe2code, code_rvalue in self.floor_assembly_eff_rvalues.items()],
-                            key=lambda x: abs(x[1] - float(ffrvalue)))
+                    comb_ff_code, comb_rvalue = get_assembly_rvalue_table('floor').nearest(float(ffrvalue))
                     zone_floor['floor_assembly_code'] = comb_ff_code
                 else:
                     zone_floor['floor_assembly_code'] = 'efwf00ca'
@@ -1845,32 +2376,53 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
         return zone_floors
 
-    def get_building_zone_wall(self, b, bldg_about):
-        xpath = self.xpath
-        ns = self.ns
-        sidemap = self.sidemap
+    @classmethod
+    def get_sidemap(cls, orientation):
+        '''
+        Map the azimuths of the sides of the house to 'front', 'left', 'back' and 'right'
 
+        orientation - HEScore orientation of the front of the house
+        '''
+        house_azimuth = {v: k for k, v in cls.azimuth_to_hescore_orientation.items()}[orientation]
+        return {house_azimuth: 'front', (house_azimuth + 90) % 360: 'left',
+                (house_azimuth + 180) % 360: 'back', (house_azimuth + 270) % 360: 'right'}
+
+    def get_hescore_walls(self, ctx):
+        '''
+        Get the walls of the building between the living space and outside or another unit, or with no
+        ExteriorAdjacentTo, that aren't attic walls
+        '''
+        hescore_walls = []
+        for wall in ctx.components.walls:
+            if 'attic' in (wall.interior_adjacent_to or ''):
+                continue
+            if wall.exterior_adjacent_to is None or (
+                    wall.exterior_adjacent_to in self.hescore_wall_exterior_adjacent_to and
+                    wall.interior_adjacent_to == 'living space'):
+                hescore_walls.append(wall)
+        return hescore_walls
+
+    def get_building_zone_wall(self, ctx, bldg_about, sidemap):
         # building.zone.zone_wall--------------------------------------------------
         zone_wall = []
 
         hpxmlwalls = dict([(side, []) for side in list(sidemap.values())])
         hpxmlwalls['noside'] = []
-        for wall in self.get_hescore_walls(b):
-            wall_id = xpath(wall, 'h:SystemIdentifier/@id', raise_err=True)
-            wall_adjacent_to = self.get_wall_adjacent_to(xpath(wall, 'h:ExteriorAdjacentTo/text()', raise_err=True))
+        for wall in self.get_hescore_walls(ctx):
+            wall_id = wall.get_id()
+            wall_adjacent_to = self.get_wall_adjacent_to(wall.require('exterior_adjacent_to'))
             is_exterior_wall = wall_adjacent_to == 'outside'
 
             assembly_code, assembly_eff_rvalue = self.get_wall_assembly_code_and_rvalue(wall, is_exterior_wall)
 
             walld = {'assembly_code': assembly_code,
                      'assembly_eff_rvalue': assembly_eff_rvalue,
-                     'area': convert_to_type(float, xpath(wall, 'h:Area/text()')),
+                     'area': convert_to_type(float, wall.area),
                      'id': wall_id,
                      'adjacent_to': wall_adjacent_to}
 
             try:
-                wall_azimuth = self.get_nearest_azimuth(xpath(wall, 'h:Azimuth/text()'),
-                                                        xpath(wall, 'h:Orientation/text()'))
+                wall_azimuth = self.get_nearest_azimuth(wall.azimuth, wall.orientation)
             except TranslationError:
                 # There is no directional information in the HPXML wall
                 wall_side = 'noside'
@@ -1925,18 +2477,10 @@ class HPXMLtoHEScoreTranslatorBase(object):
             rvalueavgeff = walltotalarea / wallua
             is_exterior_wall = adjacent_to == 'outside'
             if is_exterior_wall:
-                comb_wall_code, comb_rvalue = min(
-                    [(doe2code, code_rvalue)
-                        for doe2code, code_rvalue in self.wall_assembly_eff_rvalues.items()
-                        if doe2code[2:4] == const_type and doe2code[6:8] == ext_finish],
-                    key=lambda x: abs(x[1] - rvalueavgeff)
-                )
+                comb_wall_code, comb_rvalue = get_assembly_rvalue_table('wall').nearest(
+                    rvalueavgeff, const_type, ext_finish)
             else:
-                comb_wall_code, comb_rvalue = min(
-                    [(doe2code, code_rvalue)
-                        for doe2code, code_rvalue in self.int_wall_assembly_eff_rvalues.items()],
-                    key=lambda x: abs(x[1] - rvalueavgeff)
-                )
+                comb_wall_code, comb_rvalue = get_assembly_rvalue_table('int_wall').nearest(rvalueavgeff)
             if adjacent_to != 'other_unit':
                 heswall['wall_assembly_code'] = comb_wall_code
             heswall['adjacent_to'] = adjacent_to
@@ -1946,12 +2490,12 @@ class HPXMLtoHEScoreTranslatorBase(object):
         # building.zone.zone_wall.zone_window--------------------------------------
         # Assign each window to a side of the house
         hpxmlwindows = dict([(side, []) for side in list(sidemap.values())])
-        for hpxmlwndw in b.xpath('h:BuildingDetails/h:Enclosure/h:Windows/h:Window', namespaces=ns):
+        for hpxmlwndw in ctx.components.windows:
 
             # Get the area, solar screen, uvalue, SHGC, or window_code
-            windowd = {'area': convert_to_type(float, xpath(hpxmlwndw, 'h:Area/text()', raise_err=True))}
-            windowd['uvalue'] = convert_to_type(float, xpath(hpxmlwndw, 'h:UFactor/text()'))
-            windowd['shgc'] = convert_to_type(float, xpath(hpxmlwndw, 'h:SHGC/text()'))
+            windowd = {'area': convert_to_type(float, hpxmlwndw.require('area'))}
+            windowd['uvalue'] = convert_to_type(float, hpxmlwndw.ufactor)
+            windowd['shgc'] = convert_to_type(float, hpxmlwndw.shgc)
             windowd['solar_screen'] = self.get_solarscreen(hpxmlwndw)
             if windowd['uvalue'] is not None and windowd['shgc'] is not None:
                 windowd['window_code'] = None
@@ -1960,14 +2504,13 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
             # Window side
             window_sides = []
-            window_id = xpath(hpxmlwndw, 'h:SystemIdentifier/@id')
+            window_id = hpxmlwndw.id
             try:
                 # Get the aziumuth or orientation if they exist
-                wndw_azimuth = self.get_nearest_azimuth(xpath(hpxmlwndw, 'h:Azimuth/text()'),
-                                                        xpath(hpxmlwndw, 'h:Orientation/text()'))
+                wndw_azimuth = self.get_nearest_azimuth(hpxmlwndw.azimuth, hpxmlwndw.orientation)
             except TranslationError:
                 # The window doesn't have orientation/azimuth information, get from wall
-                attached_to_wall_id = xpath(hpxmlwndw, 'h:AttachedToWall/@idref')
+                attached_to_wall_id = hpxmlwndw.wall_idref
                 if attached_to_wall_id is not None:
                     for side, walls in list(hpxmlwalls.items()):
                         for wall in walls:
@@ -2063,13 +2606,12 @@ class HPXMLtoHEScoreTranslatorBase(object):
             zone_window['solar_screen'] = max(list(window_solarscreen_areas.items()), key=lambda x: x[1])[0]
         return zone_wall
 
-    def get_hvac(self, b, bldg):
+    def get_hvac(self, ctx, bldg):
 
-        def get_dict_of_hpxml_elements_by_id(xpathexpr):
+        def get_dict_of_hpxml_components_by_id(components):
             return_dict = {}
-            for el in self.xpath(b, xpathexpr, aslist=True):
-                system_id = self.xpath(el, 'h:SystemIdentifier/@id')
-                return_dict[system_id] = el
+            for component in components:
+                return_dict[component.id] = component
             return return_dict
 
         def remove_hp_by_zero_value(test_variable):
@@ -2079,43 +2621,38 @@ class HPXMLtoHEScoreTranslatorBase(object):
                     return True
 
         # Get all heating systems
-        hpxml_heating_systems = get_dict_of_hpxml_elements_by_id(
-            'descendant::h:HVACPlant/h:HeatingSystem|descendant::h:HVACPlant/h:HeatPump')
+        hpxml_heating_systems = get_dict_of_hpxml_components_by_id(ctx.components.heating_systems)
 
         # Remove heating systems that serve 0% of the heating load
-        for key, el in list(hpxml_heating_systems.items()):
-            frac_load_str = self.xpath(el, 'h:FractionHeatLoadServed/text()')
-            htg_capacity_str = self.xpath(el, 'h:HeatingCapacity/text()')
-            htg_capacity_17_str = self.xpath(el, 'h:HeatingCapacity17F/text()')
-            if remove_hp_by_zero_value(frac_load_str) or remove_hp_by_zero_value(htg_capacity_str) or \
-                    remove_hp_by_zero_value(htg_capacity_17_str):
+        for key, htgsys in list(hpxml_heating_systems.items()):
+            if remove_hp_by_zero_value(htgsys.fraction_heat_load_served) or \
+                    remove_hp_by_zero_value(htgsys.heating_capacity) or \
+                    remove_hp_by_zero_value(htgsys.heating_capacity_17f):
                 del hpxml_heating_systems[key]
 
         # Get all cooling systems
-        hpxml_cooling_systems = get_dict_of_hpxml_elements_by_id(
-            'descendant::h:HVACPlant/h:CoolingSystem|descendant::h:HVACPlant/h:HeatPump')
+        hpxml_cooling_systems = get_dict_of_hpxml_components_by_id(ctx.components.cooling_systems)
 
         # Remove cooling systems that serve 0% of the cooling load
-        for key, el in list(hpxml_cooling_systems.items()):
-            frac_load_str = self.xpath(el, 'h:FractionCoolLoadServed/text()')
-            clg_capacity_str = self.xpath(el, 'h:CoolingCapacity/text()')
-            if remove_hp_by_zero_value(frac_load_str) or remove_hp_by_zero_value(clg_capacity_str):
+        for key, clgsys in list(hpxml_cooling_systems.items()):
+            if remove_hp_by_zero_value(clgsys.fraction_cool_load_served) or \
+                    remove_hp_by_zero_value(clgsys.cooling_capacity):
                 del hpxml_cooling_systems[key]
 
         # Get all the duct systems
-        hpxml_distribution_systems = get_dict_of_hpxml_elements_by_id('descendant::h:HVACDistribution')
+        hpxml_distribution_systems = get_dict_of_hpxml_components_by_id(ctx.components.hvac_distributions)
 
         # Connect the heating and cooling systems to their associated distribution systems
-        def get_duct_mapping(element_list):
+        def get_duct_mapping(component_list):
             return_dict = {}
-            for system_id, el in list(element_list.items()):
-                distribution_system_id = self.xpath(el, 'h:DistributionSystem/@idref')
-                if distribution_system_id is None:
+            for system_id, component in list(component_list.items()):
+                if not component.distribution_system_idrefs:
                     continue
-                if isinstance(distribution_system_id, list):
+                if len(component.distribution_system_idrefs) > 1:
                     raise TranslationError(
                         'Each HVAC plant is only allowed to specify one duct system. %s references more than one.' %
                         system_id)
+                distribution_system_id = component.distribution_system_idrefs[0]
                 if distribution_system_id in return_dict:
                     raise TranslationError(
                         'Each duct system is only allowed to serve one heating and one cooling system. ' +
@@ -2132,7 +2669,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
         dist_cooling_map = get_duct_mapping(hpxml_cooling_systems)
 
         # Remove distribution systems that aren't referenced by any equipment.
-        for dist_sys_id, el in list(hpxml_distribution_systems.items()):
+        for dist_sys_id in list(hpxml_distribution_systems.keys()):
             if not (dist_sys_id in dist_heating_map or dist_sys_id in dist_cooling_map):
                 del hpxml_distribution_systems[dist_sys_id]
 
@@ -2157,18 +2694,18 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
         # Translate each heating system into HEScore inputs
         heating_systems = {}
-        for key, el in list(hpxml_heating_systems.items()):
-            heating_systems[key] = self.get_heating_system_type(el)
+        for key, htgsys in list(hpxml_heating_systems.items()):
+            heating_systems[key] = self.get_heating_system_type(htgsys)
 
         # Translate each cooling system into HEScore inputs
         cooling_systems = {}
-        for key, el in list(hpxml_cooling_systems.items()):
-            cooling_systems[key] = self.get_cooling_system_type(el)
+        for key, clgsys in list(hpxml_cooling_systems.items()):
+            cooling_systems[key] = self.get_cooling_system_type(clgsys)
 
         # Translate each duct system into HEScore inputs
         distribution_systems = {}
-        for key, el in list(hpxml_distribution_systems.items()):
-            distribution_systems[key] = self.get_hvac_distribution(el, bldg)
+        for key, hvacd in list(hpxml_distribution_systems.items()):
+            distribution_systems[key] = self.get_hvac_distribution(hvacd, bldg)
 
         # Determine the weighting factors
 
@@ -2399,33 +2936,28 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
         return hvac_systems
 
-    def get_systems_dhw(self, b):
-        xpath = self.xpath
-
+    def get_systems_dhw(self, ctx):
         sys_dhw = OrderedDict()
 
-        water_heating_systems = xpath(b, 'descendant::h:WaterHeatingSystem')
-        if isinstance(water_heating_systems, list):
+        water_heating_systems = ctx.components.water_heating_systems
+        if len(water_heating_systems) > 1:
             dhwfracs = [
-                None if x is None else float(x)
-                for x in [
-                    xpath(water_heating_system, 'h:FractionDHWLoadServed/text()')
-                    for water_heating_system in water_heating_systems
-                ]
+                convert_to_type(float, water_heating_system.fraction_dhw_load_served)
+                for water_heating_system in water_heating_systems
             ]
             if None in dhwfracs:
                 primarydhw = water_heating_systems[0]
             else:
                 primarydhw = max(list(zip(water_heating_systems, dhwfracs)), key=lambda x: x[1])[0]
-        elif water_heating_systems is None:
+        elif not water_heating_systems:
             raise TranslationError('No water heating systems found.')
         else:
-            primarydhw = water_heating_systems
-        water_heater_type = xpath(primarydhw, 'h:WaterHeaterType/text()', raise_err=True)
+            primarydhw = water_heating_systems[0]
+        water_heater_type = primarydhw.require('water_heater_type')
         if water_heater_type in ('storage water heater', 'dedicated boiler with storage tank'):
             sys_dhw['category'] = 'unit'
             sys_dhw['type'] = 'storage'
-            fuel_type = xpath(primarydhw, 'h:FuelType/text()', raise_err=True)
+            fuel_type = primarydhw.require('fuel_type')
             sys_dhw['fuel_primary'] = self.add_fuel_type(fuel_type)
         elif water_heater_type == 'space-heating boiler with storage tank':
             sys_dhw['category'] = 'combined'
@@ -2440,14 +2972,14 @@ class HPXMLtoHEScoreTranslatorBase(object):
         elif water_heater_type == 'instantaneous water heater':
             sys_dhw['category'] = 'unit'
             sys_dhw['type'] = 'tankless'
-            fuel_type = xpath(primarydhw, 'h:FuelType/text()', raise_err=True)
+            fuel_type = primarydhw.require('fuel_type')
             sys_dhw['fuel_primary'] = self.add_fuel_type(fuel_type)
         else:
             raise TranslationError('HEScore cannot model the water heater type: %s' % water_heater_type)
 
         if not sys_dhw['category'] == 'combined':
-            energyfactor = xpath(primarydhw, 'h:EnergyFactor/text()')
-            unified_energy_factor = xpath(primarydhw, 'h:UniformEnergyFactor/text()')
+            energyfactor = primarydhw.energy_factor
+            unified_energy_factor = primarydhw.uniform_energy_factor
             if unified_energy_factor is not None:
                 sys_dhw['efficiency_method'] = 'user'
                 sys_dhw['efficiency_unit'] = 'uef'
@@ -2462,14 +2994,16 @@ class HPXMLtoHEScoreTranslatorBase(object):
                     raise TranslationError(
                         'Tankless water heater efficiency cannot be estimated by shipment weighted method.')
                 else:
-                    dhwyear = int(xpath(primarydhw, '(h:YearInstalled|h:ModelYear)[1]/text()', raise_err=True))
+                    if not primarydhw.years:
+                        raise ElementNotFoundError(primarydhw.element, '(h:YearInstalled|h:ModelYear)[1]/text()', {})
+                    dhwyear = int(primarydhw.years[0])
                     sys_dhw['efficiency_method'] = 'shipment_weighted'
                     sys_dhw['year'] = dhwyear
         return sys_dhw
 
-    def get_generation(self, b):
+    def get_generation(self, ctx):
         generation = OrderedDict()
-        pvsystems = self.xpath(b, 'descendant::h:PVSystem', aslist=True)
+        pvsystems = ctx.components.pv_systems
         if not pvsystems:
             return generation
 
@@ -2484,30 +3018,24 @@ class HPXMLtoHEScoreTranslatorBase(object):
         tilts = []
         for pvsystem in pvsystems:
 
-            capacities.append(convert_to_type(float, self.xpath(pvsystem, 'h:MaxPowerOutput/text()')))
-            collector_areas.append(convert_to_type(float, self.xpath(pvsystem, 'h:CollectorArea/text()')))
-            n_panels_per_system.append(convert_to_type(int, self.xpath(pvsystem, 'h:NumberOfPanels/text()')))
+            capacities.append(convert_to_type(float, pvsystem.max_power_output))
+            collector_areas.append(convert_to_type(float, pvsystem.collector_area))
+            n_panels_per_system.append(convert_to_type(int, pvsystem.number_of_panels))
 
             if not (capacities[-1] or collector_areas[-1] or n_panels_per_system[-1]):
                 raise TranslationError(
                     'MaxPowerOutput, NumberOfPanels, or CollectorArea is required for every PVSystem.'
                 )
 
-            manufacture_years = [
-                int(x) for x in self.xpath(
-                    pvsystem,
-                    'h:YearInverterManufactured/text()|h:YearModulesManufactured/text()',
-                    aslist=True
-                )
-            ]
+            manufacture_years = [int(x) for x in pvsystem.manufacture_years]
             if manufacture_years:
                 years.append(max(manufacture_years))  # Use the latest year of manufacture
             else:
                 raise TranslationError(
                     'Either YearInverterManufactured or YearModulesManufactured is required for every PVSystem.')
 
-            azimuth = self.xpath(pvsystem, 'h:ArrayAzimuth/text()')
-            orientation = self.xpath(pvsystem, 'h:ArrayOrientation/text()')
+            azimuth = pvsystem.array_azimuth
+            orientation = pvsystem.array_orientation
             if azimuth:
                 azimuths.append(int(azimuth))
             elif orientation:
@@ -2515,7 +3043,7 @@ class HPXMLtoHEScoreTranslatorBase(object):
             else:
                 raise TranslationError('ArrayAzimuth or ArrayOrientation is required for every PVSystem.')
 
-            tilt = self.xpath(pvsystem, 'h:ArrayTilt/text()')
+            tilt = pvsystem.array_tilt
             if tilt:
                 tilts.append(int(float(tilt)))
             else:
@@ -2545,16 +3073,13 @@ class HPXMLtoHEScoreTranslatorBase(object):
 
         return generation
 
-    def every_surface_layer_has_nominal_rvalue(self, surf_el):
+    def every_surface_layer_has_nominal_rvalue(self, surf):
         # This variable will be true only if every wall layer has a NominalRValue
-        if surf_el.tag.endswith('Slab'):
-            surf_ins_layers = self.xpath(surf_el, 'h:PerimeterInsulation/h:Layer', aslist=True)
-        elif surf_el.tag.endswith('FoundationWall'):
-            surf_ins_layers = self.xpath(surf_el, 'h:Insulation/h:Layer', aslist=True)
+        # surf.layers are the PerimeterInsulation layers of a Slab and the Insulation layers of a FoundationWall
         every_layer_has_nominal_rvalue = True
-        if surf_ins_layers:
-            for layer in surf_ins_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
+        if surf.layers:
+            for layer in surf.layers:
+                if layer.nominal_rvalue is None:
                     every_layer_has_nominal_rvalue = False
                     break
         else:
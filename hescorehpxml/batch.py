@@ -0,0 +1,393 @@
+import argparse
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import glob
+import json
+import logging
+import os
+import sys
+from jsonschema import ValidationError, SchemaError
+
+from . import HPXMLtoHEScoreTranslator, warm_caches
+from .base import BYTES_TYPES, HPXMLtoHEScoreTranslatorBase
+from .exceptions import HPXMLtoHEScoreError
+from .instrumentation import StageCollector
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def get_exit_code(ex):
+    """Exit code ``hpxml2hescore`` uses for an exception, 0 when there is none"""
+    if ex is None:
+        return 0
+    elif isinstance(ex, (HPXMLtoHEScoreError, ValidationError, SchemaError)):
+        return 1
+    else:
+        return 2
+
+
+def collect_inputs(hpxml_input):
+    """List the HPXML files to translate
+
+    :param hpxml_input: a directory (all ``*.xml`` files in it), a glob pattern, or a text file with one HPXML
+        filename per line. Relative names in a file list are relative to the list's directory. ``-`` reads the
+        file list from stdin.
+    :returns: list of filenames
+    """
+    if hpxml_input == '-':
+        return [line.strip() for line in sys.stdin if line.strip()]
+    elif os.path.isdir(hpxml_input):
+        return sorted(glob.glob(os.path.join(hpxml_input, '*.xml')))
+    elif os.path.isfile(hpxml_input) and not hpxml_input.lower().endswith('.xml'):
+        listdir = os.path.dirname(os.path.abspath(hpxml_input))
+        with open(hpxml_input, 'r') as f:
+            return [os.path.join(listdir, line.strip()) for line in f if line.strip() and not line.startswith('#')]
+    else:
+        return sorted(glob.glob(hpxml_input, recursive=True))
+
+
+def get_output_filenames(hpxml_filenames, output_dir):
+    """Name an output JSON file for each input, numbering inputs that share a basename"""
+    used = set([MANIFEST_FILENAME])
+    output_filenames = []
+    for hpxml_filename in hpxml_filenames:
+        stem = os.path.splitext(os.path.basename(hpxml_filename))[0]
+        name = stem + '.json'
+        i = 1
+        while name in used:
+            name = '{}-{}.json'.format(stem, i)
+            i += 1
+        used.add(name)
+        output_filenames.append(os.path.join(output_dir, name))
+    return output_filenames
+
+
+def get_source_name(hpxml_source):
+    """Name to report for an HPXML filename, file-like object, or document in a buffer"""
+    if isinstance(hpxml_source, (str, os.PathLike)):
+        return os.fsdecode(hpxml_source)
+    elif isinstance(hpxml_source, BYTES_TYPES):
+        return '<{} bytes>'.format(memoryview(hpxml_source).nbytes)
+    return getattr(hpxml_source, 'name', repr(hpxml_source))
+
+
+def set_error(record, ex):
+    """Record an exception's exit code, class and message and log it"""
+    record['exit_code'] = get_exit_code(ex)
+    record['error_class'] = type(ex).__name__
+    if record['exit_code'] == 1:
+        record['error'] = str(ex)
+        logging.error('%s:%s:%s', record['source'], record['error_class'], record['error'])
+    else:
+        record['error'] = 'Unknown HPXML Translation Error: Please contact HEScore support'
+        logging.error('%s:%s', record['source'], record['error'], exc_info=ex)
+
+
+def translate_source(hpxml_source, validate='once', hpxml_bldg_id=None, hpxml_project_id=None,
+                     hpxml_contractor_id=None, stage_stats=False, huge_tree=False, result_cache=None):
+    """Translate one HPXML source to a result record
+
+    Errors are logged and recorded instead of raised so one bad file doesn't stop a batch.
+
+    :param hpxml_source: HPXML filename, file-like object, or bytes of the document
+    :param stage_stats: collect the time, XPath query count and element count of each translation stage
+    :param huge_tree: turn off the limits on the size and depth of the document
+    :param result_cache: ``ResultCache`` to get the result from or save it to
+    :returns: dict with the ``source`` name, ``building_id``, ``exit_code``, ``error_class``, ``error``, and
+        ``hescore`` inputs, which is None if there was an error. With ``stage_stats`` it also has the
+        ``StageCollector.to_dict()`` of the translation as ``stage_stats``.
+    """
+    record = OrderedDict([
+        ('source', get_source_name(hpxml_source)),
+        ('building_id', hpxml_bldg_id),
+        ('exit_code', 0),
+        ('error_class', None),
+        ('error', None),
+        ('hescore', None),
+    ])
+    collector = StageCollector() if stage_stats else None
+    try:
+        if result_cache is not None:
+            result = result_cache.translate_result(
+                hpxml_source, hpxml_bldg_id, hpxml_project_id, hpxml_contractor_id, validate, huge_tree,
+                instrument=collector
+            )
+            record['building_id'] = result.building_id
+            if result.error is not None:
+                raise result.error
+            record['hescore'] = result.hescore
+        else:
+            t = HPXMLtoHEScoreTranslator(hpxml_source, validate=validate, instrument=collector, huge_tree=huge_tree)
+            if hpxml_bldg_id is None:
+                record['building_id'] = t.xpath(t.hpxmldoc, 'h:Building[1]/h:BuildingID/@id')
+            record['hescore'] = t.hpxml_to_hescore(
+                hpxml_bldg_id=hpxml_bldg_id,
+                hpxml_project_id=hpxml_project_id,
+                hpxml_contractor_id=hpxml_contractor_id
+            )
+    except Exception as ex:
+        set_error(record, ex)
+    if stage_stats:
+        record['stage_stats'] = collector.to_dict()
+    return record
+
+
+def translate_file(hpxml_filename, output_filename, validate='once', hpxml_bldg_id=None, hpxml_project_id=None,
+                   hpxml_contractor_id=None, stage_stats=False, huge_tree=False, result_cache=None):
+    """Translate one HPXML file to a HEScore JSON file
+
+    :returns: manifest record for the file
+    """
+    result = translate_source(
+        hpxml_filename, validate, hpxml_bldg_id, hpxml_project_id, hpxml_contractor_id, stage_stats, huge_tree,
+        result_cache
+    )
+    record = OrderedDict([
+        ('input', hpxml_filename),
+        ('output', None),
+        ('exit_code', result['exit_code']),
+        ('error_class', result['error_class']),
+        ('error', result['error']),
+    ])
+    if result['hescore'] is not None:
+        with open(output_filename, 'w') as f:
+            json.dump(result['hescore'], f, indent=2)
+        record['output'] = output_filename
+    if stage_stats:
+        record['stage_stats'] = result['stage_stats']
+    return record
+
+
+def _translate_file_star(args):
+    return translate_file(*args)
+
+
+def batch_translate(hpxml_filenames, output_dir, max_workers=None, chunksize=1, validate='once', hpxml_bldg_id=None,
+                    hpxml_project_id=None, hpxml_contractor_id=None, stage_stats=False, huge_tree=False,
+                    result_cache=None):
+    """Translate many HPXML files in a pool of worker processes
+
+    Each worker loads the schemas and lookup tables once when it starts and reuses them for every file it gets.
+    A manifest of the results is written to ``manifest.json`` in ``output_dir``.
+
+    :param hpxml_filenames: list of HPXML filenames
+    :param output_dir: directory to write a HEScore JSON file per input and the manifest to
+    :param max_workers: number of worker processes, defaults to the number of CPUs. 0 translates in this process.
+    :param chunksize: number of files sent to a worker at a time
+    :param stage_stats: include the stats of each translation stage in the file records
+    :param result_cache: ``ResultCache`` shared by the workers to get results from or save them to
+    :returns: manifest as a dict
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_filenames = get_output_filenames(hpxml_filenames, output_dir)
+    tasks = [
+        (hpxml_filename, output_filename, validate, hpxml_bldg_id, hpxml_project_id, hpxml_contractor_id,
+         stage_stats, huge_tree, result_cache)
+        for hpxml_filename, output_filename in zip(hpxml_filenames, output_filenames)
+    ]
+    if max_workers == 0:
+        records = [translate_file(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=warm_caches) as executor:
+            records = list(executor.map(_translate_file_star, tasks, chunksize=chunksize))
+
+    exit_codes = [record['exit_code'] for record in records]
+    manifest = OrderedDict([
+        ('exit_code', max(exit_codes, default=0)),
+        ('n_files', len(records)),
+        ('n_succeeded', exit_codes.count(0)),
+        ('n_failed', len(records) - exit_codes.count(0)),
+        ('files', records),
+    ])
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def iter_translate(hpxml_sources, max_workers=None, max_in_flight=None, validate='once', hpxml_bldg_id=None,
+                   hpxml_project_id=None, hpxml_contractor_id=None, stage_stats=False, huge_tree=False,
+                   result_cache=None):
+    """Translate HPXML sources and yield a record for each one as it finishes
+
+    Only ``max_in_flight`` sources are submitted to the workers at a time and ``hpxml_sources`` is consumed lazily,
+    so memory use doesn't grow with the number of sources. Records come out in the order they finish, which isn't
+    necessarily the input order.
+
+    :param hpxml_sources: iterable of HPXML filenames, or file-like objects when ``max_workers`` is 0
+    :param max_workers: number of worker processes, defaults to the number of CPUs. 0 translates in this process.
+    :param max_in_flight: maximum number of sources submitted but not yet yielded, defaults to twice the number of
+        workers
+    :returns: generator of records from :func:`translate_source`
+    """
+    translate_args = (
+        validate, hpxml_bldg_id, hpxml_project_id, hpxml_contractor_id, stage_stats, huge_tree, result_cache
+    )
+    if max_workers == 0:
+        for hpxml_source in hpxml_sources:
+            yield translate_source(hpxml_source, *translate_args)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=warm_caches) as executor:
+        if max_in_flight is None:
+            max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+        in_flight = set()
+        for hpxml_source in hpxml_sources:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            in_flight.add(executor.submit(translate_source, hpxml_source, *translate_args))
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def write_jsonl(records, outfile):
+    """Write each record as one line of compact JSON, flushing after each one
+
+    :returns: the worst exit code of the records
+    """
+    exit_code = 0
+    for record in records:
+        json.dump(record, outfile, separators=(',', ':'))
+        outfile.write('\n')
+        outfile.flush()
+        exit_code = max(exit_code, record['exit_code'])
+    return exit_code
+
+
+def translate_to_jsonl(hpxml_sources, outfile, **kwargs):
+    """Translate HPXML sources and stream the results to a JSON Lines file
+
+    :param hpxml_sources: iterable of HPXML filenames
+    :param outfile: text file-like object to write to
+    :param kwargs: passed to :func:`iter_translate`
+    :returns: the worst exit code of the sources
+    """
+    return write_jsonl(iter_translate(hpxml_sources, **kwargs), outfile)
+
+
+def get_result_cache(filename, size_mb):
+    """Open the ``ResultCache`` from the command line options, None without a filename"""
+    if filename is None:
+        return None
+    from .resultcache import ResultCache
+    return ResultCache(filename, max_bytes=size_mb << 20)
+
+
+def batch_main(argv=sys.argv[2:]):
+    parser = argparse.ArgumentParser(
+        prog='hpxml2hescore batch',
+        description='Convert many HPXML v2.x or v3.x files to HEScore inputs'
+    )
+    parser.add_argument(
+        'hpxml_input',
+        help='Directory of .xml files, glob pattern, or text file listing one HPXML file per line'
+    )
+    output_group = parser.add_mutually_exclusive_group(required=True)
+    output_group.add_argument(
+        '-o', '--output-dir',
+        help='Directory to write a json file per input and manifest.json to'
+    )
+    output_group.add_argument(
+        '--jsonl',
+        type=argparse.FileType('w'),
+        help='File to stream one line of json per input to as each one finishes, "-" for stdout'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Number of worker processes. 0 translates in this process. Default: number of CPUs.'
+    )
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=1,
+        help='Number of files to send to a worker process at a time. Default: 1.'
+    )
+    parser.add_argument(
+        '--bldgid',
+        help='HPXML building id to score in every file. Default: first one.'
+    )
+    parser.add_argument(
+        '--projectid',
+        help='HPXML project id to use in every file. Default: first one.'
+    )
+    parser.add_argument(
+        '--contractorid',
+        help='HPXML contractor id to use in every file. Default: first one.'
+    )
+    parser.add_argument(
+        '--validate',
+        choices=HPXMLtoHEScoreTranslatorBase.VALIDATE_MODES,
+        default='once',
+        help='When to validate the HPXML files against the schema. Default: once.'
+    )
+    parser.add_argument(
+        '--stage-stats',
+        type=argparse.FileType('w'),
+        help='Filename to write histograms of the time each translation stage took across all the files to in json format. Stats for each file are added to its record.'  # noqa 501
+    )
+    parser.add_argument(
+        '--huge-tree',
+        action='store_true',
+        help='Turn off the limits on the size and depth of the HPXML files. Only use this for very large files from trusted sources.'  # noqa 501
+    )
+    parser.add_argument(
+        '--result-cache',
+        help='Filename of a SQLite database to save results in and reuse them from when the same file is translated again.'  # noqa 501
+    )
+    parser.add_argument(
+        '--result-cache-size',
+        type=int,
+        default=1024,
+        help='Megabytes of results to keep in the result cache, the least recently used are dropped. Default: 1024.'
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR, format='%(levelname)s:%(message)s')
+
+    translate_kwargs = dict(
+        validate=args.validate,
+        hpxml_bldg_id=args.bldgid,
+        hpxml_project_id=args.projectid,
+        hpxml_contractor_id=args.contractorid,
+        stage_stats=bool(args.stage_stats),
+        huge_tree=args.huge_tree,
+        result_cache=get_result_cache(args.result_cache, args.result_cache_size)
+    )
+    collector = StageCollector()
+    if args.jsonl:
+
+        def collect_stage_stats(records):
+            for record in records:
+                if args.stage_stats:
+                    collector.update(record['stage_stats'], record['source'])
+                yield record
+
+        exit_code = write_jsonl(
+            collect_stage_stats(iter_translate(
+                collect_inputs(args.hpxml_input),
+                max_workers=args.jobs,
+                **translate_kwargs
+            )),
+            args.jsonl
+        )
+    else:
+        manifest = batch_translate(
+            collect_inputs(args.hpxml_input),
+            args.output_dir,
+            max_workers=args.jobs,
+            chunksize=args.chunksize,
+            **translate_kwargs
+        )
+        if args.stage_stats:
+            for record in manifest['files']:
+                collector.update(record['stage_stats'], record['input'])
+        exit_code = manifest['exit_code']
+    if args.stage_stats:
+        json.dump(collector.to_dict(), args.stage_stats, indent=2)
+        args.stage_stats.close()
+    if exit_code:
+        sys.exit(exit_code)
@@ -0,0 +1,269 @@
+import argparse
+from collections import defaultdict, OrderedDict
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+from xml.parsers import expat
+
+from . import HPXMLtoHEScoreTranslator
+from .exceptions import HPXMLtoHEScoreError, TranslationError
+
+INDEX_FORMAT = 1
+
+# Top level sections that go in every building's document
+HEADER_SECTIONS = ('XMLTransactionHeaderInformation', 'SoftwareInfo', 'Contractor')
+
+START_TAG_RE = re.compile(rb'<([^\s/>]+)(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*\s*/?>')
+END_TAG_RE = re.compile(rb'</[^\s>]+\s*>')
+
+
+def get_index_filename(hpxmlfilename):
+    return hpxmlfilename + '.index.json'
+
+
+def get_file_stamp(hpxmlfilename):
+    st = os.stat(hpxmlfilename)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+class _SectionScanner(object):
+    """expat handlers that find the byte range of each top level element of an HPXML document
+
+    Along with its range each section records the ids it's known by and the ids of the other sections it refers to:
+
+    - <Building>: its <BuildingID> and the <CustomerID> and <ContractorID> it refers to
+    - <Project>: its <ProjectID> and the buildings it refers to, i.e. <PreBuildingID> and <PostBuildingID>
+    - <Customer>: every SystemIdentifier id in it
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.depth = 0
+        self.root = None
+        self.sections = []
+        self.section = None
+
+    def start_element(self, name, attrs):
+        self.depth += 1
+        localname = name.rpartition(' ')[2]
+        if self.depth == 1:
+            self.root = self.parser.CurrentByteIndex
+        elif self.depth == 2:
+            self.section = {'name': localname, 'start': self.parser.CurrentByteIndex, 'end': None, 'ids': [],
+                            'refs': []}
+            self.sections.append(self.section)
+        elif self.section['name'] == 'Building':
+            if self.depth == 3 and attrs.get('id'):
+                if localname == 'BuildingID':
+                    self.section['ids'].append(attrs['id'])
+                elif localname in ('CustomerID', 'ContractorID'):
+                    self.section['refs'].append(attrs['id'])
+        elif self.section['name'] == 'Project':
+            if self.depth == 3 and attrs.get('id'):
+                if localname == 'ProjectID':
+                    self.section['ids'].append(attrs['id'])
+                elif localname.endswith('BuildingID'):
+                    self.section['refs'].append(attrs['id'])
+        elif self.section['name'] == 'Customer':
+            if localname == 'SystemIdentifier' and attrs.get('id'):
+                self.section['ids'].append(attrs['id'])
+
+    def end_element(self, name):
+        if self.depth == 2:
+            # Where the end tag starts, it's sorted out once the whole file has been read
+            self.section['end'] = self.parser.CurrentByteIndex
+        self.depth -= 1
+
+
+class BuildingIndex(object):
+    """Where each <Building> and the sections it needs are in an HPXML file
+
+    Make one with ``BuildingIndex.build()``, which reads the whole file once, and save it next to the file. After that
+    any one building can be translated by reading only its own bytes and those of the header, <Contractor>, and the
+    <Project> and <Customer> elements that go with it.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.buildings = OrderedDict()
+        self.projects = {}
+        self.first_project = None
+        self.projects_by_building = defaultdict(list)
+        self.customers = {}
+        self.header = []
+        for section in index['sections']:
+            if section['name'] == 'Building':
+                for building_id in section['ids']:
+                    self.buildings.setdefault(building_id, section)
+            elif section['name'] == 'Project':
+                if self.first_project is None:
+                    self.first_project = section
+                for project_id in section['ids']:
+                    self.projects.setdefault(project_id, section)
+                for building_id in section['refs']:
+                    self.projects_by_building[building_id].append(section)
+            elif section['name'] == 'Customer':
+                for customer_id in section['ids']:
+                    self.customers.setdefault(customer_id, section)
+            elif section['name'] in HEADER_SECTIONS:
+                self.header.append(section)
+
+    @classmethod
+    def build(cls, hpxmlfilename):
+        """Read an HPXML file and find where its sections are
+
+        :param hpxmlfilename: filename of the HPXML document
+        :raises HPXMLtoHEScoreError: if it isn't an HPXML document this can index
+        """
+        stamp = get_file_stamp(hpxmlfilename)
+        parser = expat.ParserCreate(namespace_separator=' ')
+        parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_NEVER)
+        scanner = _SectionScanner(parser)
+        parser.StartElementHandler = scanner.start_element
+        parser.EndElementHandler = scanner.end_element
+        with open(hpxmlfilename, 'rb') as f:
+            try:
+                parser.ParseFile(f)
+            except expat.ExpatError as ex:
+                raise HPXMLtoHEScoreError('Failed to index {}: {}'.format(hpxmlfilename, ex)) from ex
+            if scanner.root is None:
+                raise HPXMLtoHEScoreError('Failed to index {}: no root element'.format(hpxmlfilename))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                # The byte offsets are only right for documents in an ASCII compatible encoding
+                m = START_TAG_RE.match(buf, scanner.root)
+                if m is None:
+                    raise HPXMLtoHEScoreError('Failed to index {}: unsupported encoding'.format(hpxmlfilename))
+                prolog_end = m.end()
+                root_tag = m.group(1).decode('utf-8')
+                for section in scanner.sections:
+                    m = END_TAG_RE.match(buf, section['end'])
+                    if m is None:
+                        # An empty element, <Customer/>
+                        m = START_TAG_RE.match(buf, section['start'])
+                    section['end'] = m.end()
+
+        return cls({
+            'format': INDEX_FORMAT,
+            'file': stamp,
+            'prolog': [0, prolog_end],
+            'root_tag': root_tag,
+            'sections': scanner.sections,
+        })
+
+    @classmethod
+    def load(cls, indexfilename):
+        with open(indexfilename, 'r') as f:
+            index = json.load(f)
+        if index.get('format') != INDEX_FORMAT:
+            raise HPXMLtoHEScoreError('{} is not an HPXML building index this version can read'.format(indexfilename))
+        return cls(index)
+
+    def save(self, indexfilename):
+        with open(indexfilename, 'w') as f:
+            json.dump(self.index, f)
+
+    @property
+    def building_ids(self):
+        return list(self.buildings.keys())
+
+    def check_file(self, hpxmlfilename):
+        """Make sure the file hasn't changed since it was indexed
+
+        :raises TranslationError: if it has
+        """
+        if get_file_stamp(hpxmlfilename) != self.index['file']:
+            raise TranslationError('{} has changed since it was indexed, index it again'.format(hpxmlfilename))
+
+    def get_sections(self, hpxml_bldg_id=None, hpxml_project_id=None):
+        """Get the sections a building needs, in the order they're in the file
+
+        Those are the header, <SoftwareInfo> and <Contractor> elements, the building, the <Project> elements that refer
+        to it, ``hpxml_project_id`` or else the first <Project> in the file like a translation of the whole file uses,
+        any other buildings those projects refer to, and the <Customer> elements the buildings refer to.
+
+        :raises TranslationError: if the building isn't in the file
+        """
+        if hpxml_bldg_id is None:
+            building = next(iter(self.buildings.values()), None)
+        else:
+            building = self.buildings.get(hpxml_bldg_id)
+        if building is None:
+            raise TranslationError('Building {} is not in the index'.format(hpxml_bldg_id))
+        projects = [x for building_id in building['ids'] for x in self.projects_by_building[building_id]]
+        if hpxml_project_id is None:
+            if self.first_project is not None:
+                projects.append(self.first_project)
+        elif hpxml_project_id in self.projects:
+            projects.append(self.projects[hpxml_project_id])
+        buildings = [building]
+        buildings.extend(self.buildings[x] for project in projects for x in project['refs'] if x in self.buildings)
+        customers = [self.customers[x] for b in buildings for x in b['refs'] if x in self.customers]
+        selected = self.header + buildings + projects + customers
+        return sorted({x['start']: x for x in selected}.values(), key=lambda x: x['start'])
+
+    def read_building(self, hpxmlfilename, hpxml_bldg_id=None, hpxml_project_id=None):
+        """Read an HPXML document with one building and the sections it needs from an indexed file
+
+        Only the parts of the file in the document are read from disk.
+
+        :param hpxmlfilename: filename of the HPXML document that was indexed
+        :param hpxml_bldg_id: id of the <Building>, defaults to the first one
+        :param hpxml_project_id: id of a <Project> to include, in addition to those that refer to the building,
+            defaults to the first one
+        :returns: bytes of the document
+        :raises TranslationError: if the file has changed or the building isn't in it
+        """
+        sections = self.get_sections(hpxml_bldg_id, hpxml_project_id)
+        with open(hpxmlfilename, 'rb') as f:
+            self.check_file(hpxmlfilename)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                prolog_start, prolog_end = self.index['prolog']
+                parts = [buf[prolog_start:prolog_end]]
+                for section in sections:
+                    parts.append(buf[section['start']:section['end']])
+        parts.append('</{}>\n'.format(self.index['root_tag']).encode('utf-8'))
+        return b''.join(parts)
+
+
+def translate_indexed_building(hpxmlfilename, index, hpxml_bldg_id=None, hpxml_project_id=None,
+                               hpxml_contractor_id=None, **kwargs):
+    """Translate one building of an indexed HPXML file
+
+    Only the building and the sections it needs are parsed and validated, see ``BuildingIndex.read_building()``.
+
+    :param hpxmlfilename: filename of the HPXML document
+    :param index: its ``BuildingIndex``, or the filename of one
+    :param kwargs: passed to ``HPXMLtoHEScoreTranslator()``
+    :returns: dict of HEScore inputs like ``hpxml_to_hescore()``
+    """
+    if not isinstance(index, BuildingIndex):
+        index = BuildingIndex.load(index)
+    hpxml = index.read_building(hpxmlfilename, hpxml_bldg_id, hpxml_project_id)
+    tr = HPXMLtoHEScoreTranslator(hpxml, **kwargs)
+    return tr.hpxml_to_hescore(hpxml_bldg_id, hpxml_project_id, hpxml_contractor_id)
+
+
+def index_main(argv=sys.argv[2:]):
+    parser = argparse.ArgumentParser(
+        prog='hpxml2hescore index',
+        description='Index where each building is in a very large HPXML file so one building can be translated quickly with "hpxml2hescore --index"'  # noqa 501
+    )
+    parser.add_argument(
+        'hpxml_input',
+        help='Filename of hpxml file'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help='Filename to save the index to. Default: the hpxml filename with .index.json added.'
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR, format='%(levelname)s:%(message)s')
+    try:
+        index = BuildingIndex.build(args.hpxml_input)
+    except (HPXMLtoHEScoreError, OSError) as ex:
+        logging.error('%s:%s', type(ex).__name__, str(ex))
+        sys.exit(1)
+    index.save(args.output or get_index_filename(args.hpxml_input))
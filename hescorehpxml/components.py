@@ -0,0 +1,457 @@
+"""Records of the components of a building, read in the one walk of its tree that indexes it
+
+``BuildingContext`` finds the elements of each kind in ``COMPONENT_KINDS`` while it indexes the SystemIdentifier ids
+of a building, and reads the child elements the translator uses from each one into a record. The section builders
+use the records instead of querying the elements.
+"""
+from collections import OrderedDict
+import math
+
+from lxml import etree
+
+from .exceptions import ElementNotFoundError
+
+
+def read_text(el):
+    return el.text
+
+
+def read_id(el):
+    return el.get('id')
+
+
+def read_idref(el):
+    return el.get('idref')
+
+
+def read_element(el):
+    return el
+
+
+def read_present(el):
+    return True
+
+
+def read_type(el):
+    """Name of the first child element, or '' if there isn't one or ``el`` is missing, like ``name(el/*)`` in XPath"""
+    for child in el.iterchildren(etree.Element):
+        return etree.QName(child).localname
+    return ''
+
+
+def read_child_names(el):
+    return tuple(etree.QName(child).localname for child in el.iterchildren(etree.Element))
+
+
+# What a field read with each reader would be selected by in XPath, for error messages
+READER_XPATHS = {
+    read_text: '/text()',
+    read_id: '/@id',
+    read_idref: '/@idref',
+}
+
+
+def to_number(text):
+    """Convert text to a float like XPath's number(), NaN if it isn't a number"""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def iter_path(el, tags):
+    """Iterate over the elements at a path of child tags below ``el``, ``'*'`` matches any element"""
+    if not tags:
+        yield el
+        return
+    for child in el.iterchildren(etree.Element if tags[0] == '*' else tags[0]):
+        yield from iter_path(child, tags[1:])
+
+
+def field_slots(fields):
+    return tuple(OrderedDict.fromkeys(slot for path, slot, reader, repeats in fields))
+
+
+_record_readers = {}
+
+
+class Record(object):
+    """Values read from the child elements of an element
+
+    ``FIELDS`` of each subclass lists what it reads as ``(path, slot, reader, repeats)``. ``path`` is the names of
+    the child element and the elements below it to read, separated by slashes. ``reader`` gets the value from each
+    element at the path, it's one of the ``read_*`` functions or a ``Record`` subclass for elements that have fields
+    of their own. When ``repeats`` is true the slot is a list of the values in document order, otherwise it's the
+    first value that isn't None, or None if there isn't one ('' for ``read_type``). Each child element is only
+    visited once however many fields are read from it.
+    """
+
+    __slots__ = ('element',)
+    FIELDS = ()
+
+    def __init__(self, element):
+        self.element = element
+        fields, readers = self.get_readers(etree.QName(element).namespace)
+        for path, slot, reader, repeats in fields:
+            setattr(self, slot, [] if repeats else None)
+        for child in element.iterchildren(etree.Element):
+            for tags, slot, reader, repeats in readers.get(child.tag, ()):
+                for el in iter_path(child, tags):
+                    value = reader(el)
+                    if value is None:
+                        continue
+                    if repeats:
+                        getattr(self, slot).append(value)
+                    elif getattr(self, slot) is None:
+                        setattr(self, slot, value)
+        for path, slot, reader, repeats in fields:
+            if reader is read_type and not repeats and getattr(self, slot) is None:
+                setattr(self, slot, '')
+
+    @classmethod
+    def get_readers(cls, namespace):
+        """Get the fields of the class and its bases and the fields to read from each child tag in a namespace"""
+        try:
+            return _record_readers[cls, namespace]
+        except KeyError:
+            pass
+        fields = []
+        for klass in reversed(cls.__mro__):
+            fields.extend(klass.__dict__.get('FIELDS', ()))
+        readers = {}
+        for path, slot, reader, repeats in fields:
+            tags = [name if name == '*' else etree.QName(namespace, name).text for name in path.split('/')]
+            readers.setdefault(tags[0], []).append((tags[1:], slot, reader, repeats))
+        return _record_readers.setdefault((cls, namespace), (fields, readers))
+
+    def require(self, slot):
+        """Get a field that has to be there, raises ElementNotFoundError if the element didn't have it"""
+        value = getattr(self, slot)
+        if value is None or value == []:
+            fields, readers = self.get_readers(etree.QName(self.element).namespace)
+            path, reader = next((path, reader) for path, field_slot, reader, repeats in fields if field_slot == slot)
+            xpath = '/'.join(name if name == '*' else 'h:' + name for name in path.split('/'))
+            raise ElementNotFoundError(self.element, xpath + READER_XPATHS.get(reader, ''), {})
+        return value
+
+
+class Layer(Record):
+    FIELDS = (
+        ('NominalRValue', 'nominal_rvalue', read_text, False),
+        ('InstallationType', 'installation_type', read_text, False),
+        ('InsulationMaterial/Rigid', 'rigid', read_present, False),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+def sum_nominal_rvalues(layers):
+    """Sum of the NominalRValues of insulation layers, 0 if there aren't any"""
+    return sum((to_number(layer.nominal_rvalue) for layer in layers if layer.nominal_rvalue is not None), 0.0)
+
+
+def every_layer_has_nominal_rvalue(layers, assembly_rvalue):
+    """Whether every insulation layer has a NominalRValue, or there are no layers and no AssemblyEffectiveRValue"""
+    if layers:
+        return all(layer.nominal_rvalue is not None for layer in layers)
+    return assembly_rvalue is None
+
+
+def has_rigid_sheathing(layers):
+    """Whether one of the insulation layers is continuous rigid insulation with an R-value"""
+    return any(
+        to_number(layer.nominal_rvalue) > 0 and layer.installation_type == 'continuous' and layer.rigid
+        for layer in layers
+    )
+
+
+class Component(Record):
+    """An enclosure or system element of a building"""
+
+    FIELDS = (
+        ('SystemIdentifier', 'id', read_id, False),
+    )
+    __slots__ = field_slots(FIELDS)
+
+    def get_id(self):
+        """SystemIdentifier id of the element, raises ElementNotFoundError if it doesn't have one"""
+        return self.require('id')
+
+
+class Attic(Component):
+    FIELDS = (
+        ('AttachedToRoof', 'roof_idrefs', read_idref, True),
+        ('AttachedToFrameFloor', 'frame_floor_idrefs', read_idref, True),
+        ('AttachedToWall', 'wall_idrefs', read_idref, True),
+        ('AtticKneeWall', 'knee_wall_idrefs', read_idref, True),
+        ('AtticType', 'attic_type', read_text, False),
+        ('AtticType', 'attic_type_names', read_child_names, False),
+        ('AtticType/Attic', 'attic_names', read_child_names, False),
+        ('Area', 'area', read_text, False),
+        ('AtticRoofInsulation/AssemblyEffectiveRValue', 'roof_assembly_rvalue', read_text, False),
+        ('AtticRoofInsulation/Layer', 'roof_layers', Layer, True),
+        ('AtticFloorInsulation/AssemblyEffectiveRValue', 'floor_assembly_rvalue', read_text, False),
+        ('AtticFloorInsulation/Layer', 'floor_layers', Layer, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class Roof(Component):
+    FIELDS = (
+        ('Area', 'area', read_text, False),
+        ('RoofArea', 'roof_area', read_text, False),
+        ('SolarAbsorptance', 'solar_absorptance', read_text, False),
+        ('RoofColor', 'roof_color', read_text, False),
+        ('RoofType', 'roof_type', read_text, False),
+        ('RadiantBarrier', 'radiant_barrier', read_text, False),
+        ('Insulation/AssemblyEffectiveRValue', 'assembly_rvalue', read_text, False),
+        ('Insulation/Layer', 'layers', Layer, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class Wall(Component):
+    FIELDS = (
+        ('ExteriorAdjacentTo', 'exterior_adjacent_to', read_text, False),
+        ('InteriorAdjacentTo', 'interior_adjacent_to', read_text, False),
+        ('AtticWallType', 'attic_wall_type', read_text, False),
+        ('WallType', 'wall_type', read_type, False),
+        ('WallType/WoodStud/ExpandedPolystyreneSheathing', 'expanded_polystyrene_sheathing', read_text, False),
+        ('WallType/WoodStud/OptimumValueEngineering', 'optimum_value_engineering', read_text, False),
+        ('Area', 'area', read_text, False),
+        ('Azimuth', 'azimuth', read_text, False),
+        ('Orientation', 'orientation', read_text, False),
+        ('Siding', 'siding', read_text, False),
+        ('Insulation/AssemblyEffectiveRValue', 'assembly_rvalue', read_text, False),
+        ('Insulation/Layer', 'layers', Layer, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class FrameFloor(Component):
+    FIELDS = (
+        ('Area', 'area', read_text, False),
+        ('Insulation/AssemblyEffectiveRValue', 'assembly_rvalue', read_text, False),
+        ('Insulation/Layer', 'layers', Layer, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class Foundation(Component):
+    FIELDS = (
+        ('FoundationType', 'foundation_type', read_type, False),
+        ('FoundationType/Basement/Conditioned', 'basement_conditioned', read_text, False),
+        ('FoundationType/Crawlspace/Vented', 'crawlspace_vented', read_text, False),
+        ('AttachedToFrameFloor', 'frame_floor_idrefs', read_idref, True),
+        ('AttachedToFoundationWall', 'foundation_wall_idrefs', read_idref, True),
+        ('AttachedToSlab', 'slab_idrefs', read_idref, True),
+        ('FrameFloor', 'frame_floor_elements', read_element, True),
+        ('FoundationWall', 'foundation_wall_elements', read_element, True),
+        ('Slab', 'slab_elements', read_element, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class FoundationWall(Component):
+    FIELDS = (
+        ('Area', 'area', read_text, False),
+        ('Length', 'length', read_text, False),
+        ('Height', 'height', read_text, False),
+        ('Insulation/AssemblyEffectiveRValue', 'assembly_rvalue', read_text, False),
+        ('Insulation/Layer', 'layers', Layer, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class Slab(Component):
+    FIELDS = (
+        ('Area', 'area', read_text, False),
+        ('ExposedPerimeter', 'exposed_perimeter', read_text, False),
+        ('PerimeterInsulation/AssemblyEffectiveRValue', 'assembly_rvalue', read_text, False),
+        ('PerimeterInsulation/Layer', 'layers', Layer, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class Window(Component):
+    """A Window or Skylight"""
+
+    FIELDS = (
+        ('AttachedToRoof', 'roof_idrefs', read_idref, True),
+        ('AttachedToWall', 'wall_idref', read_idref, False),
+        ('Area', 'area', read_text, False),
+        ('Azimuth', 'azimuth', read_text, False),
+        ('Orientation', 'orientation', read_text, False),
+        ('UFactor', 'ufactor', read_text, False),
+        ('SHGC', 'shgc', read_text, False),
+        ('FrameType', 'frame_type', read_type, False),
+        ('FrameType/*/ThermalBreak', 'thermal_break', read_text, False),
+        ('GlassLayers', 'glass_layers', read_text, False),
+        ('GlassType', 'glass_type', read_text, False),
+        ('GasFill', 'gas_fill', read_text, False),
+        ('StormWindow', 'storm_window', read_present, False),
+        ('StormWindow/GlassType', 'storm_glass_type', read_text, False),
+        ('Treatments', 'treatments', read_text, False),
+        ('ExteriorShading', 'exterior_shading', read_text, False),
+        ('ExteriorShading/Type', 'exterior_shading_types', read_text, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class Efficiency(Record):
+    FIELDS = (
+        ('Units', 'units', read_text, False),
+        ('Value', 'value', read_text, False),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class HVACSystem(Component):
+    """A HeatingSystem, CoolingSystem or HeatPump"""
+
+    FIELDS = (
+        ('HeatPumpType', 'heat_pump_type', read_text, False),
+        ('HeatingSystemFuel', 'heating_system_fuel', read_text, False),
+        ('HeatingSystemType', 'heating_system_type', read_type, False),
+        ('CoolingSystemType', 'cooling_system_type', read_text, False),
+        ('AnnualHeatingEfficiency', 'heating_efficiencies', Efficiency, True),
+        ('AnnualHeatEfficiency', 'heating_efficiencies', Efficiency, True),
+        ('AnnualCoolingEfficiency', 'cooling_efficiencies', Efficiency, True),
+        ('AnnualCoolEfficiency', 'cooling_efficiencies', Efficiency, True),
+        ('YearInstalled', 'years', read_text, True),
+        ('ModelYear', 'years', read_text, True),
+        ('HeatingCapacity', 'heating_capacity', read_text, False),
+        ('HeatingCapacity17F', 'heating_capacity_17f', read_text, False),
+        ('CoolingCapacity', 'cooling_capacity', read_text, False),
+        ('FractionHeatLoadServed', 'fraction_heat_load_served', read_text, False),
+        ('FractionCoolLoadServed', 'fraction_cool_load_served', read_text, False),
+        ('FloorAreaServed', 'floor_area_served', read_text, False),
+        ('DistributionSystem', 'distribution_system_idrefs', read_idref, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+    @property
+    def is_heat_pump(self):
+        return self.element.tag.endswith('HeatPump')
+
+
+class DuctLeakage(Record):
+    FIELDS = (
+        ('TotalOrToOutside', 'total_or_to_outside', read_text, False),
+        ('Units', 'units', read_text, False),
+        ('Value', 'value', read_text, False),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class DuctLeakageMeasurement(Record):
+    FIELDS = (
+        ('DuctType', 'duct_type', read_text, False),
+        ('LeakinessObservedVisualInspection', 'leakiness_observed_visual_inspection', read_text, False),
+        ('DuctLeakage', 'leakages', DuctLeakage, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class Duct(Record):
+    FIELDS = (
+        ('DuctLocation', 'location', read_text, False),
+        ('FractionDuctArea', 'fraction_duct_area', read_text, False),
+        ('DuctInsulationRValue', 'insulation_rvalue', read_text, False),
+        ('DuctInsulationThickness', 'insulation_thickness', read_text, False),
+        ('DuctInsulationMaterial', 'insulation_materials', read_type, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+    @property
+    def is_insulated(self):
+        return (
+            to_number(self.insulation_rvalue) > 0
+            or to_number(self.insulation_thickness) > 0
+            or any(material != 'None' for material in self.insulation_materials)
+        )
+
+
+class AirDistribution(Record):
+    FIELDS = (
+        ('DuctLeakageMeasurement', 'leakage_measurements', DuctLeakageMeasurement, True),
+        ('Ducts', 'ducts', Duct, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+    def get_leakage_to_outside(self, duct_type):
+        """CFM25 duct leakage to outside measured for a DuctType, or with no DuctType for None, None if not measured"""
+        for measurement in self.leakage_measurements:
+            if measurement.duct_type != duct_type:
+                continue
+            for leakage in measurement.leakages:
+                if leakage.total_or_to_outside == 'to outside' and leakage.units == 'CFM25' and \
+                        leakage.value is not None:
+                    return leakage.value
+
+
+class HVACDistribution(Component):
+    FIELDS = (
+        ('DistributionSystemType/AirDistribution', 'air_distributions', AirDistribution, True),
+        ('HVACDistributionImprovement/DuctSystemSealed', 'duct_system_sealed', read_text, False),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class WaterHeatingSystem(Component):
+    FIELDS = (
+        ('WaterHeaterType', 'water_heater_type', read_text, False),
+        ('FuelType', 'fuel_type', read_text, False),
+        ('FractionDHWLoadServed', 'fraction_dhw_load_served', read_text, False),
+        ('EnergyFactor', 'energy_factor', read_text, False),
+        ('UniformEnergyFactor', 'uniform_energy_factor', read_text, False),
+        ('YearInstalled', 'years', read_text, True),
+        ('ModelYear', 'years', read_text, True),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+class PVSystem(Component):
+    FIELDS = (
+        ('MaxPowerOutput', 'max_power_output', read_text, False),
+        ('CollectorArea', 'collector_area', read_text, False),
+        ('NumberOfPanels', 'number_of_panels', read_text, False),
+        ('YearInverterManufactured', 'manufacture_years', read_text, True),
+        ('YearModulesManufactured', 'manufacture_years', read_text, True),
+        ('ArrayAzimuth', 'array_azimuth', read_text, False),
+        ('ArrayOrientation', 'array_orientation', read_text, False),
+        ('ArrayTilt', 'array_tilt', read_text, False),
+    )
+    __slots__ = field_slots(FIELDS)
+
+
+# Where each kind of component of a building is, as element name -> (record class, [(kind, name of its parent, or
+# None for anywhere)]). Heat pumps are both heating and cooling systems.
+COMPONENT_KINDS = OrderedDict([
+    ('Attic', (Attic, [('attics', 'Attics')])),
+    ('Roof', (Roof, [('roofs', None)])),
+    ('Wall', (Wall, [('walls', None)])),
+    ('FrameFloor', (FrameFloor, [('frame_floors', None)])),
+    ('Foundation', (Foundation, [('foundations', 'Foundations')])),
+    ('FoundationWall', (FoundationWall, [('foundation_walls', None)])),
+    ('Slab', (Slab, [('slabs', None)])),
+    ('Skylight', (Window, [('skylights', None)])),
+    ('Window', (Window, [('windows', 'Windows')])),
+    ('HeatingSystem', (HVACSystem, [('heating_systems', 'HVACPlant')])),
+    ('CoolingSystem', (HVACSystem, [('cooling_systems', 'HVACPlant')])),
+    ('HeatPump', (HVACSystem, [('heating_systems', 'HVACPlant'), ('cooling_systems', 'HVACPlant')])),
+    ('HVACDistribution', (HVACDistribution, [('hvac_distributions', None)])),
+    ('WaterHeatingSystem', (WaterHeatingSystem, [('water_heating_systems', None)])),
+    ('PVSystem', (PVSystem, [('pv_systems', None)])),
+])
+
+
+class BuildingComponents(object):
+    """Lists of the records of each kind of component in ``COMPONENT_KINDS`` in a building, in document order"""
+
+    __slots__ = tuple(OrderedDict.fromkeys(
+        kind for record_class, kinds in COMPONENT_KINDS.values() for kind, parent in kinds
+    ))
+
+    def __init__(self):
+        for kind in self.__slots__:
+            setattr(self, kind, [])
@@ -1,4 +1,6 @@
 import re
+from jsonschema.exceptions import SchemaError, ValidationError
+from lxml import etree
 
 
 # Base class for errors in this package
@@ -17,8 +19,14 @@ class ElementNotFoundError(TranslationError):
         self.xpath = xpath
         self.kwargs = kwargs
 
+    def __reduce__(self):
+        # The parent element can't be pickled, so send the message instead
+        return _unpickle_element_not_found, (self.message, self.xpath, self.kwargs)
+
     @property
     def message(self):
+        if self.parent is None:
+            return self._message
         tree = self.parent.getroottree()
         el_path = re.sub(r'{.*?}', '', tree.getelementpath(self.parent))
         xpath = self.xpath.replace('h:', '')
@@ -32,8 +40,15 @@ class ElementNotFoundError(TranslationError):
         return self.message
 
 
+def _unpickle_element_not_found(message, xpath, kwargs):
+    ex = ElementNotFoundError(None, xpath, kwargs)
+    ex._message = message
+    return ex
+
+
 class InputOutOfBounds(HPXMLtoHEScoreError):
     def __init__(self, inpname, value):
+        super().__init__(inpname, value)
         self.inpname = inpname
         self.value = value
 
@@ -47,3 +62,89 @@ class InputOutOfBounds(HPXMLtoHEScoreError):
 
 class RoundOutOfBounds(TranslationError):
     pass
+
+
+class WorkerRequestError(HPXMLtoHEScoreError):
+    pass
+
+
+# Translation errors have to be pickled to get back from a process pool or to be saved. Some of the lxml and jsonschema
+# ones hold things that can't be, like error logs and type checkers, so they're copied to these subclasses first with
+# picklable_error(). The subclasses only change how they pickle.
+
+class PicklableXMLSyntaxError(etree.XMLSyntaxError):
+
+    @classmethod
+    def copy_of(cls, ex):
+        return cls(ex.msg, ex.code, ex.position[0], ex.position[1], ex.filename)
+
+    def __reduce__(self):
+        return type(self), (self.msg, self.code, self.position[0], self.position[1], self.filename)
+
+
+class PicklableDocumentInvalid(etree.DocumentInvalid):
+
+    @classmethod
+    def copy_of(cls, ex):
+        return cls(*ex.args)
+
+    def __reduce__(self):
+        return type(self), self.args
+
+
+# What jsonschema errors have for the attributes that weren't given
+_JSONSCHEMA_UNSET = ValidationError('').validator
+
+
+def _make_jsonschema_error(cls, message, kwargs):
+    return cls(message, **kwargs)
+
+
+class _PicklableJsonschemaError(object):
+
+    @staticmethod
+    def _get_kwargs(ex):
+        kwargs = {}
+        for name in ('validator', 'validator_value', 'instance', 'schema'):
+            value = getattr(ex, name)
+            if value is not _JSONSCHEMA_UNSET:
+                kwargs[name] = value
+        kwargs['path'] = list(ex.path)
+        kwargs['schema_path'] = list(ex.schema_path)
+        return kwargs
+
+    @classmethod
+    def copy_of(cls, ex):
+        return cls(ex.message, **cls._get_kwargs(ex))
+
+    def __reduce__(self):
+        return _make_jsonschema_error, (type(self), self.message, self._get_kwargs(self))
+
+
+class PicklableValidationError(_PicklableJsonschemaError, ValidationError):
+    pass
+
+
+class PicklableSchemaError(_PicklableJsonschemaError, SchemaError):
+    pass
+
+
+_PICKLABLE_ERRORS = (
+    (etree.XMLSyntaxError, PicklableXMLSyntaxError),
+    (etree.DocumentInvalid, PicklableDocumentInvalid),
+    (ValidationError, PicklableValidationError),
+    (SchemaError, PicklableSchemaError),
+)
+
+
+def picklable_error(ex):
+    """Copy an lxml or jsonschema error to a subclass of its class that can be pickled
+
+    The copy has the same message. Other errors, which already can be pickled, are returned as is.
+    """
+    for error_class, picklable_class in _PICKLABLE_ERRORS:
+        if isinstance(ex, picklable_class):
+            return ex
+        elif isinstance(ex, error_class):
+            return picklable_class.copy_of(ex)
+    return ex
@@ -1,5 +1,6 @@
 from .base import HPXMLtoHEScoreTranslatorBase
-from .exceptions import TranslationError
+from .components import every_layer_has_nominal_rvalue, has_rigid_sheathing, sum_nominal_rvalues, to_number
+from .exceptions import TranslationError, ElementNotFoundError
 
 
 def convert_to_type(type_, value):
@@ -16,83 +17,58 @@ class HPXML2toHEScoreTranslator(HPXMLtoHEScoreTranslatorBase):
         if p is not None:
             return self.xpath(p, 'h:ProjectDetails/h:ProgramCertificate="Home Performance with Energy Star"')
 
-    def sort_foundations(self, fnd, v3_b):
-        # Sort the foundations from largest area to smallest
-        def get_fnd_area(fnd):
-            return max([self.xpath(fnd, 'sum(h:%s/h:Area)' % x) for x in ('Slab', 'FrameFloor')])
+    def get_foundation_area(self, fnd, ctx):
+        return max(
+            sum((to_number(x.area) for x in map(ctx.get_component, elements) if x.area is not None), 0.0)
+            for elements in (fnd.slab_elements, fnd.frame_floor_elements)
+        )
 
-        fnd.sort(key=get_fnd_area, reverse=True)
-        return fnd, get_fnd_area
+    def get_foundation_walls(self, fnd, ctx):
+        return [ctx.get_component(el) for el in fnd.foundation_wall_elements]
 
-    def get_foundation_walls(self, fnd, v3_b):
-        foundationwalls = self.xpath(fnd, 'h:FoundationWall', aslist=True)
-        return foundationwalls
+    def get_foundation_slabs(self, fnd, ctx):
+        if not fnd.slab_elements:
+            raise ElementNotFoundError(fnd.element, 'h:Slab', {})
+        return [ctx.get_component(el) for el in fnd.slab_elements]
 
-    def get_foundation_slabs(self, fnd, v3_b):
-        slabs = self.xpath(fnd, 'h:Slab', raise_err=True, aslist=True)
-        return slabs
-
-    def get_foundation_frame_floors(self, fnd, v3_b):
-        frame_floors = self.xpath(fnd, 'h:FrameFloor', aslist=True)
-        return frame_floors
+    def get_foundation_frame_floors(self, fnd, ctx):
+        return [ctx.get_component(el) for el in fnd.frame_floor_elements]
 
     def attic_has_rigid_sheathing(self, attic, v3_roof):
-        return self.xpath(attic,
-                          'boolean(h:AtticRoofInsulation/h:Layer[h:NominalRValue > 0][h:InstallationType="continuous"][boolean(h:InsulationMaterial/h:Rigid)])'  # noqa: E501
-                          )
+        return has_rigid_sheathing(attic.roof_layers)
 
     def every_wall_layer_has_nominal_rvalue(self, wall):
-        # This variable will be true if every wall layer has a NominalRValue *or*
+        # This will be true if every wall layer has a NominalRValue *or*
         # if there are no insulation layers
-        wall_layers = self.xpath(wall, 'h:Insulation/h:Layer', aslist=True)
-        every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
-        if wall_layers:
-            for layer in wall_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-        elif self.xpath(wall, 'h:Insulation/h:AssemblyEffectiveRValue/text()') is not None:
-            every_layer_has_nominal_rvalue = False
-
-        return every_layer_has_nominal_rvalue
+        return every_layer_has_nominal_rvalue(wall.layers, wall.assembly_rvalue)
 
     def get_attic_roof_rvalue(self, attic, v3_roof):
         # if there is no nominal R-value, it will return 0
-        return self.xpath(attic, 'sum(h:AtticRoofInsulation/h:Layer/h:NominalRValue)')
+        return sum_nominal_rvalues(attic.roof_layers)
 
     def get_attic_roof_assembly_rvalue(self, attic, v3_roof):
         # if there is no assembly effective R-value, it will return None
-        return convert_to_type(float, self.xpath(attic, 'h:AtticRoofInsulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, attic.roof_assembly_rvalue)
 
     def every_attic_roof_layer_has_nominal_rvalue(self, attic, v3_roof):
-        roof_layers = self.xpath(attic, 'h:AtticRoofInsulation/h:Layer', aslist=True)
-        every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
-        if roof_layers:
-            for layer in roof_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-        elif self.xpath(attic, 'h:AtticRoofInsulation/h:AssemblyEffectiveRValue/text()') is not None:
-            every_layer_has_nominal_rvalue = False
-
-        return every_layer_has_nominal_rvalue
-
-    def get_attic_knee_walls(self, attic):
+        return every_layer_has_nominal_rvalue(attic.roof_layers, attic.roof_assembly_rvalue)
+
+    def get_attic_knee_walls(self, attic, ctx):
         knee_walls = []
-        b = self.xpath(attic, 'ancestor::h:Building')
-        for kneewall_idref in self.xpath(attic, 'h:AtticKneeWall/@idref', aslist=True):
-            wall = self.xpath(
-                b,
-                'descendant::h:Wall[h:SystemIdentifier/@id=$kneewallid]',
-                raise_err=True,
-                kneewallid=kneewall_idref
-            )
-            knee_walls.append(wall)
+        for kneewall_idref in attic.knee_wall_idrefs:
+            walls = ctx.get_components_by_id([kneewall_idref], self.addns('h:Wall'))
+            if not walls:
+                raise ElementNotFoundError(
+                    ctx.building,
+                    'descendant::h:Wall[h:SystemIdentifier/@id=$kneewallid]',
+                    {'kneewallid': kneewall_idref}
+                )
+            knee_walls.extend(walls)
 
         return knee_walls
 
     def get_attic_type(self, attic, atticid):
-        hpxml_attic_type = self.xpath(attic, 'h:AtticType/text()')
+        hpxml_attic_type = attic.attic_type
         rooftypemap = {'cape cod': 'cath_ceiling',
                        'cathedral ceiling': 'cath_ceiling',
                        'flat roof': 'flat_roof',
@@ -107,63 +83,37 @@ class HPXML2toHEScoreTranslator(HPXMLtoHEScoreTranslatorBase):
                                                                                             hpxml_attic_type))
         return rooftypemap[hpxml_attic_type]
 
-    def get_attic_floor_rvalue(self, attic, v3_b):
-        return self.xpath(attic, 'sum(h:AtticFloorInsulation/h:Layer/h:NominalRValue)')
+    def get_attic_floor_rvalue(self, attic, v3_ctx):
+        return sum_nominal_rvalues(attic.floor_layers)
 
-    def get_attic_floor_assembly_rvalue(self, attic, v3_b):
-        return convert_to_type(float, self.xpath(attic, 'h:AtticFloorInsulation/h:AssemblyEffectiveRValue/text()'))
+    def get_attic_floor_assembly_rvalue(self, attic, v3_ctx):
+        return convert_to_type(float, attic.floor_assembly_rvalue)
 
-    def every_attic_floor_layer_has_nominal_rvalue(self, attic, v3_b):
-        frame_floor_layers = self.xpath(attic, 'h:AtticFloorInsulation/h:Layer', aslist=True)
-        every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
-        if frame_floor_layers:
-            for layer in frame_floor_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-        elif self.xpath(attic, 'h:AtticFloorInsulation/h:AssemblyEffectiveRValue/text()') is not None:
-            every_layer_has_nominal_rvalue = False
+    def every_attic_floor_layer_has_nominal_rvalue(self, attic, v3_ctx):
+        return every_layer_has_nominal_rvalue(attic.floor_layers, attic.floor_assembly_rvalue)
 
-        return every_layer_has_nominal_rvalue
-
-    def get_ceiling_area(self, attic):
-        return float(self.xpath(attic, 'h:Area/text()', raise_err=True))
+    def get_ceiling_area(self, attic, v3_ctx):
+        return float(attic.require('area'))
 
     def get_attic_roof_area(self, roof):
-        return float(self.xpath(roof, 'h:RoofArea/text()', raise_err=True))
+        return float(roof.require('roof_area'))
 
     def get_framefloor_assembly_rvalue(self, framefloor, v3_framefloor):
-        return convert_to_type(float, self.xpath(framefloor, 'h:Insulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, framefloor.assembly_rvalue)
 
     def get_foundation_wall_assembly_rvalue(self, fwall, v3_fwall):
-        return convert_to_type(float, self.xpath(fwall, 'h:Insulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, fwall.assembly_rvalue)
 
     def get_slab_assembly_rvalue(self, slab, v3_slab):
-        return convert_to_type(float, self.xpath(slab, 'h:PerimeterInsulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, slab.assembly_rvalue)
 
     def every_framefloor_layer_has_nominal_rvalue(self, framefloor, v3_framefloor):
-        framefloor_layers = self.xpath(framefloor, 'h:Insulation/h:Layer', aslist=True)
-        every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
-        if framefloor_layers:
-            for layer in framefloor_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-        elif self.xpath(framefloor, 'h:Insulation/h:AssemblyEffectiveRValue/text()') is not None:
-            every_layer_has_nominal_rvalue = False
-
-        return every_layer_has_nominal_rvalue
+        return every_layer_has_nominal_rvalue(framefloor.layers, framefloor.assembly_rvalue)
 
     def get_solarscreen(self, wndw_skylight):
-        return bool(self.xpath(wndw_skylight, 'h:Treatments/text()') == 'solar screen'
-                    or self.xpath(wndw_skylight, 'h:ExteriorShading/text()') == 'solar screens')
-
-    def get_hescore_walls(self, b):
-        return self.xpath(
-            b, 'h:BuildingDetails/h:Enclosure/h:Walls/h:Wall\
-                [((h:ExteriorAdjacentTo[text()="ambient" or text()="other housing unit"] and h:InteriorAdjacentTo[text()="living space"] and not(contains(h:ExteriorAdjacentTo, "garage"))) or\
-                    not(h:ExteriorAdjacentTo)) and not(contains(h:InteriorAdjacentTo, "attic"))]',  # noqa: E501
-            aslist=True)
+        return wndw_skylight.treatments == 'solar screen' or wndw_skylight.exterior_shading == 'solar screens'
+
+    hescore_wall_exterior_adjacent_to = ('ambient', 'other housing unit')
 
     def check_is_doublepane(self, v3_window, glass_layers):
         return glass_layers in ('double-pane', 'single-paned with storms', 'single-paned with low-e storms')
@@ -1,6 +1,6 @@
 from .base import HPXMLtoHEScoreTranslatorBase
-from collections import OrderedDict
-from .exceptions import TranslationError
+from .components import every_layer_has_nominal_rvalue, has_rigid_sheathing, sum_nominal_rvalues, to_number
+from .exceptions import TranslationError, ElementNotFoundError
 
 
 def convert_to_type(type_, value):
@@ -18,122 +18,93 @@ class HPXML3toHEScoreTranslator(HPXMLtoHEScoreTranslatorBase):
         return self.xpath(b, 'h:BuildingDetails/h:GreenBuildingVerifications/h:GreenBuildingVerification/h:Type="Home '
                              'Performance with ENERGY STAR"')
 
-    def sort_foundations(self, fnd, b):
-        # Sort the foundations from largest area to smallest
-        def get_fnd_area(fnd):
-            attached_ids = OrderedDict()
-            attached_ids['Slab'] = self.xpath(fnd, 'h:AttachedToSlab/@idref')
-            attached_ids['FrameFloor'] = self.xpath(fnd, 'h:AttachedToFrameFloor/@idref')
-            return max(
-                [self.xpath(b, 'sum(//h:{}[contains("{}", h:SystemIdentifier/@id)]/h:Area)'.format(key, value)) for
-                 key, value in attached_ids.items()])
-
-        fnd.sort(key=get_fnd_area, reverse=True)
-        return fnd, get_fnd_area
-
-    def get_foundation_walls(self, fnd, b):
-        attached_ids = self.xpath(fnd, 'h:AttachedToFoundationWall/@idref')
-        foundationwalls = self.xpath(b, '//h:FoundationWall[contains("{}", h:SystemIdentifier/@id)]'.
-                                     format(attached_ids), aslist=True)
-        return foundationwalls
-
-    def get_foundation_slabs(self, fnd, b):
-        attached_ids = self.xpath(fnd, 'h:AttachedToSlab/@idref')
-        slabs = self.xpath(b, '//h:Slab[contains("{}", h:SystemIdentifier/@id)]'.format(attached_ids), raise_err=True,
-                           aslist=True)
-        return slabs
-
-    def get_foundation_frame_floors(self, fnd, b):
-        attached_ids = self.xpath(fnd, 'h:AttachedToFrameFloor/@idref')
-        frame_floors = self.xpath(b, '//h:FrameFloor[contains("{}",h:SystemIdentifier/@id)]'.format(attached_ids),
-                                  aslist=True)
-        return frame_floors
+    def get_attached_components(self, idrefs, ctx, element_name, raise_err=False):
+        """Get the components in the building referenced by ``h:AttachedTo<X>/@idref``s
+
+        :param idrefs: ids of the references, i.e. the ``slab_idrefs`` of a Foundation
+        :param ctx: BuildingContext of the building to look in
+        :param element_name: name of the elements to return, references to other elements are ignored
+        :param raise_err: raise an ElementNotFoundError if none of the elements are found
+        :returns: list of component records in document order
+        """
+        attached = ctx.get_components_by_id(idrefs, self.addns('h:' + element_name))
+        if raise_err and not attached:
+            raise ElementNotFoundError(
+                ctx.building,
+                'descendant::h:{}[h:SystemIdentifier/@id=$idrefs]'.format(element_name),
+                {'idrefs': idrefs}
+            )
+        return attached
+
+    def get_foundation_area(self, fnd, ctx):
+        return max(
+            sum(to_number(x.area) if x.area is not None else 0.0
+                for x in self.get_attached_components(idrefs, ctx, key))
+            for idrefs, key in ((fnd.slab_idrefs, 'Slab'), (fnd.frame_floor_idrefs, 'FrameFloor'))
+        )
+
+    def get_foundation_walls(self, fnd, ctx):
+        return self.get_attached_components(fnd.foundation_wall_idrefs, ctx, 'FoundationWall')
+
+    def get_foundation_slabs(self, fnd, ctx):
+        return self.get_attached_components(fnd.slab_idrefs, ctx, 'Slab', raise_err=True)
+
+    def get_foundation_frame_floors(self, fnd, ctx):
+        return self.get_attached_components(fnd.frame_floor_idrefs, ctx, 'FrameFloor')
 
     def attic_has_rigid_sheathing(self, v2_attic, roof):
-        return self.xpath(roof,
-                          'boolean(h:Insulation/h:Layer[h:NominalRValue > 0][h:InstallationType="continuous"]['
-                          'boolean(h:InsulationMaterial/h:Rigid)])'
-                          # noqa: E501
-                          )
+        return has_rigid_sheathing(roof.layers)
 
     def every_wall_layer_has_nominal_rvalue(self, wall):
-        # This variable will be true if every wall layer has a NominalRValue *or*
+        # This will be true if every wall layer has a NominalRValue *or*
         # if there are no insulation layers
-        wall_layers = self.xpath(wall, 'h:Insulation/h:Layer', aslist=True)
-        every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
-        if wall_layers:
-            for layer in wall_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-        elif self.xpath(wall, 'h:Insulation/h:AssemblyEffectiveRValue/text()') is not None:
-            every_layer_has_nominal_rvalue = False
-
-        return every_layer_has_nominal_rvalue
+        return every_layer_has_nominal_rvalue(wall.layers, wall.assembly_rvalue)
 
     def get_attic_roof_rvalue(self, v2_attic, roof):
         # if there is no nominal R-value, it will return 0
-        return self.xpath(roof, 'sum(h:Insulation/h:Layer/h:NominalRValue)')
+        return sum_nominal_rvalues(roof.layers)
 
     def get_attic_roof_assembly_rvalue(self, v2_attic, roof):
         # if there is no assembly effective R-value, it will return None
-        return convert_to_type(float, self.xpath(roof, 'h:Insulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, roof.assembly_rvalue)
 
     def every_attic_roof_layer_has_nominal_rvalue(self, v2_attic, roof):
-        roof_layers = self.xpath(roof, 'h:Insulation/h:Layer', aslist=True)
-        every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
-        if roof_layers:
-            for layer in roof_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-        elif self.xpath(roof, 'h:Insulation/h:AssemblyEffectiveRValue/text()') is not None:
-            every_layer_has_nominal_rvalue = False
+        return every_layer_has_nominal_rvalue(roof.layers, roof.assembly_rvalue)
 
-        return every_layer_has_nominal_rvalue
-
-    def get_attic_knee_walls(self, attic):
-        knee_walls = []
-        b = self.xpath(attic, 'ancestor::h:Building')
-        for kneewall_idref in self.xpath(attic, 'h:AttachedToWall/@idref', aslist=True):
-            wall = self.xpath(
-                b,
-                '//h:Wall[h:SystemIdentifier/@id=$kneewallid][h:AtticWallType="knee wall"]',
-                raise_err=False,
-                kneewallid=kneewall_idref
-            )
-            if wall is not None:
-                knee_walls.append(wall)
-
-        return knee_walls
+    def get_attic_knee_walls(self, attic, ctx):
+        return [
+            wall for wall in self.get_attached_components(attic.wall_idrefs, ctx, 'Wall')
+            if wall.attic_wall_type == 'knee wall'
+        ]
 
     def get_attic_type(self, attic, atticid):
-        if self.xpath(attic,
-                      'h:AtticType/h:Attic/h:CapeCod or '
-                      'boolean(h:AtticType/h:CathedralCeiling) or boolean(h:AtticType/h:Attic/h:Conditioned)'):
+        attic_type_names = attic.attic_type_names or ()
+        attic_names = attic.attic_names
+        if (attic_names is not None and ('CapeCod' in attic_names or 'Conditioned' in attic_names)) or \
+                'CathedralCeiling' in attic_type_names:
             return 'cath_ceiling'
-        elif self.xpath(attic, 'boolean(h:AtticType/h:Attic)'):
+        elif attic_names is not None:
             return 'vented_attic'
-        elif self.xpath(attic, 'boolean(h:AtticType/h:FlatRoof)'):
+        elif 'FlatRoof' in attic_type_names:
             return 'flat_roof'
-        elif self.xpath(attic, 'boolean(h:AtticType/h:Attic/h:BelowApartment)'):
+        elif attic_names is not None and 'BelowApartment' in attic_names:
             return 'below_other_unit'  # FIXME: Not available in HPXML v3 but in HPXML v3.1
         else:
             raise TranslationError(
                 'Attic {}: Cannot translate HPXML AtticType to HEScore rooftype.'.format(atticid))
 
-    def get_attic_floor_rvalue(self, attic, b):
-        frame_floors = self.get_attic_floors(attic)
+    def get_attic_floor_rvalue(self, attic, ctx):
+        frame_floors = self.get_attic_floors(attic, ctx)
         if len(frame_floors) == 0:
             return 0
         if len(frame_floors) == 1:
-            return convert_to_type(float, self.xpath(frame_floors[0], 'sum(h:Insulation/h:Layer/h:NominalRValue)'))
+            return sum_nominal_rvalues(frame_floors[0].layers)
 
         frame_floor_dict_ls = []
         for frame_floor in frame_floors:
             # already confirmed in get_attic_floors that floors are all good with area information
-            floor_area = convert_to_type(float, self.xpath(frame_floor, 'h:Area/text()'))
-            rvalue = self.xpath(frame_floor, 'sum(h:Insulation/h:Layer/h:NominalRValue)')
+            floor_area = convert_to_type(float, frame_floor.area)
+            rvalue = sum_nominal_rvalues(frame_floor.layers)
             frame_floor_dict_ls.append({'area': floor_area, 'rvalue': rvalue})
         # Average
         try:
@@ -144,16 +115,15 @@ class HPXML3toHEScoreTranslator(HPXMLtoHEScoreTranslatorBase):
 
         return floor_r
 
-    def get_attic_floor_assembly_rvalue(self, attic, b):
-        frame_floors = self.get_attic_floors(attic)
+    def get_attic_floor_assembly_rvalue(self, attic, ctx):
+        frame_floors = self.get_attic_floors(attic, ctx)
         if len(frame_floors) == 0:
             return None
 
         frame_floor_dict_ls = []
         for frame_floor in frame_floors:
-            floor_area = convert_to_type(float, self.xpath(frame_floor, 'h:Area/text()'))
-            assembly_rvalue = convert_to_type(
-                float, self.xpath(frame_floor, 'h:Insulation/h:AssemblyEffectiveRValue/text()'))
+            floor_area = convert_to_type(float, frame_floor.area)
+            assembly_rvalue = convert_to_type(float, frame_floor.assembly_rvalue)
             if assembly_rvalue is None:
                 return
             frame_floor_dict_ls.append({'area': floor_area, 'rvalue': assembly_rvalue})
@@ -166,79 +136,58 @@ class HPXML3toHEScoreTranslator(HPXMLtoHEScoreTranslatorBase):
 
         return convert_to_type(float, floor_r)
 
-    def every_attic_floor_layer_has_nominal_rvalue(self, attic, b):
-        frame_floors = self.get_attic_floors(attic)
+    def every_attic_floor_layer_has_nominal_rvalue(self, attic, ctx):
+        frame_floors = self.get_attic_floors(attic, ctx)
         every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
         for frame_floor in frame_floors:
-            for layer in self.xpath(frame_floor, 'h:Insulation/h:Layer', aslist=True):
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-            if self.xpath(frame_floor, 'h:Insulation/h:AssemblyEffectiveRValue/text()') is not None:
+            if any(layer.nominal_rvalue is None for layer in frame_floor.layers):
+                every_layer_has_nominal_rvalue = False
+            if frame_floor.assembly_rvalue is not None:
                 every_layer_has_nominal_rvalue = False
                 break
 
         return every_layer_has_nominal_rvalue
 
-    def get_attic_floors(self, attic):
-        floor_idref = self.xpath(attic, 'h:AttachedToFrameFloor/@idref', aslist=True)
+    def get_attic_floors(self, attic, ctx):
         # No frame floor attached
-        if not floor_idref:
+        if not attic.frame_floor_idrefs:
             return []
-        b = self.xpath(attic, 'ancestor::h:Building')
-        frame_floors = self.xpath(b, '//h:FrameFloor[contains("{}",h:SystemIdentifier/@id)]'.format(floor_idref),
-                                  aslist=True, raise_err=True)
+        return self.get_attached_components(attic.frame_floor_idrefs, ctx, 'FrameFloor', raise_err=True)
 
-        return frame_floors
-
-    def get_ceiling_area(self, attic):
-        frame_floors = self.get_attic_floors(attic)
+    def get_ceiling_area(self, attic, ctx):
+        frame_floors = self.get_attic_floors(attic, ctx)
         if len(frame_floors) >= 1:
-            return sum(float(self.xpath(x, 'h:Area/text()', raise_err=True)) for x in frame_floors)
+            return sum(float(x.require('area')) for x in frame_floors)
         else:
             raise TranslationError('For vented attics, a FrameFloor needs to be referenced to determine ceiling_area.')
 
     def get_attic_roof_area(self, roof):
-        return float(self.xpath(roof, 'h:Area/text()', raise_err=True))
+        return float(roof.require('area'))
 
     def get_framefloor_assembly_rvalue(self, v2_framefloor, framefloor):
-        return convert_to_type(float, self.xpath(framefloor, 'h:Insulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, framefloor.assembly_rvalue)
 
     def get_foundation_wall_assembly_rvalue(self, v2_fwall, fwall):
-        return convert_to_type(float, self.xpath(fwall, 'h:Insulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, fwall.assembly_rvalue)
 
     def get_slab_assembly_rvalue(self, v2_slab, slab):
-        return convert_to_type(float, self.xpath(slab, 'h:PerimeterInsulation/h:AssemblyEffectiveRValue/text()'))
+        return convert_to_type(float, slab.assembly_rvalue)
 
     def every_framefloor_layer_has_nominal_rvalue(self, v2_framefloor, framefloor):
-        framefloor_layers = self.xpath(framefloor, 'h:Insulation/h:Layer', aslist=True)
-        every_layer_has_nominal_rvalue = True  # Considered to have nominal R-value unless assembly R-value is used
-        if framefloor_layers:
-            for layer in framefloor_layers:
-                if self.xpath(layer, 'h:NominalRValue') is None:
-                    every_layer_has_nominal_rvalue = False
-                    break
-        elif self.xpath(framefloor, 'h:Insulation/h:AssemblyEffectiveRValue/text()') is not None:
-            every_layer_has_nominal_rvalue = False
-
-        return every_layer_has_nominal_rvalue
+        return every_layer_has_nominal_rvalue(framefloor.layers, framefloor.assembly_rvalue)
 
     def get_solarscreen(self, wndw_skylight):
-        return bool(self.xpath(wndw_skylight, 'h:ExteriorShading/h:Type/text()') == 'solar screens')
+        # A window with more than one exterior shading type isn't considered to have a solar screen
+        return wndw_skylight.exterior_shading_types == ['solar screens']
 
-    def get_hescore_walls(self, b):
-        return self.xpath(
-            b, 'h:BuildingDetails/h:Enclosure/h:Walls/h:Wall\
-                [((h:ExteriorAdjacentTo[text()="outside" or text()="other housing unit" or text()="unconditioned space"] and h:InteriorAdjacentTo[text()="living space"] and not(contains(h:ExteriorAdjacentTo, "garage"))) or\
-                    not(h:ExteriorAdjacentTo)) and not(contains(h:InteriorAdjacentTo, "attic"))]',  # noqa: E501
-            aslist=True)
+    hescore_wall_exterior_adjacent_to = ('outside', 'other housing unit', 'unconditioned space')
 
     def check_is_doublepane(self, window, glass_layers):
-        return (self.xpath(window, 'h:StormWindow') is not None and glass_layers == 'single-pane') or \
+        return (window.storm_window is not None and glass_layers == 'single-pane') or \
             glass_layers == 'double-pane'
 
     def check_is_storm_lowe(self, window, glass_layers):
-        storm_type = self.xpath(window, 'h:StormWindow/h:GlassType/text()')
+        storm_type = window.storm_glass_type
         if storm_type is not None:
             return storm_type == 'low-e' and glass_layers == 'single-pane'
         return False
@@ -0,0 +1,116 @@
+from collections import OrderedDict, namedtuple
+import threading
+
+StageStats = namedtuple('StageStats', ['stage', 'building_id', 'seconds', 'xpath_calls', 'elements'])
+
+# Upper bounds in seconds of the stage time histogram bins, the last bin is everything slower
+HISTOGRAM_BINS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
+
+class Instrument(object):
+    """Receives an event when each stage of a translation starts and stops
+
+    Pass one to a translator as ``instrument`` to turn instrumentation on. Subclass it and override the methods
+    you need. The stages are ``hpxml_validate``, ``translate`` for the whole building, and within that ``address``,
+    ``hpwes``, ``about``, ``zone_floor``, ``zone_roof``, ``skylights``, ``zone_wall``, ``hvac``, ``dhw``,
+    ``generation``, ``json_validate``, and ``bounds_check``.
+
+    A translator can be used from several threads at once, so these can be called from several threads at once.
+    """
+
+    def stage_started(self, stage, building_id):
+        """Called before a stage runs
+
+        :param stage: name of the stage
+        :param building_id: HPXML BuildingID of the building being translated, None for document validation
+        """
+        pass
+
+    def stage_finished(self, stats):
+        """Called after a stage runs, even if it raised an exception
+
+        :param stats: ``StageStats`` with the time the stage took, the number of XPath queries it made, and the
+            number of elements, attributes or text values those queries returned
+        """
+        pass
+
+
+class StageCollector(Instrument):
+    """Aggregates stage stats from many translations
+
+    For each stage this keeps the number of times it ran, the total, mean and maximum times, the building that
+    took the longest, the XPath query and result counts, and a histogram of the times. Collectors from different
+    processes can be combined by passing one's ``to_dict()`` to another's ``update()``.
+    """
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_stage():
+        return OrderedDict([
+            ('count', 0),
+            ('total_s', 0.),
+            ('max_s', 0.),
+            ('max_building_id', None),
+            ('max_source', None),
+            ('xpath_calls', 0),
+            ('elements', 0),
+            ('histogram', [0] * (len(HISTOGRAM_BINS) + 1)),
+        ])
+
+    @staticmethod
+    def get_bin(seconds):
+        for i, upper in enumerate(HISTOGRAM_BINS):
+            if seconds <= upper:
+                return i
+        return len(HISTOGRAM_BINS)
+
+    def stage_finished(self, stats):
+        with self._lock:
+            stage = self.stages.get(stats.stage)
+            if stage is None:
+                stage = self.stages[stats.stage] = self._new_stage()
+            stage['count'] += 1
+            stage['total_s'] += stats.seconds
+            if stats.seconds >= stage['max_s']:
+                stage['max_s'] = stats.seconds
+                stage['max_building_id'] = stats.building_id
+            stage['xpath_calls'] += stats.xpath_calls
+            stage['elements'] += stats.elements
+            stage['histogram'][self.get_bin(stats.seconds)] += 1
+
+    def update(self, collected, source=None):
+        """Add the stats from another collector
+
+        :param collected: ``to_dict()`` of the other collector
+        :param source: name of where they came from, e.g. the HPXML file, to report with the slowest building
+        """
+        with self._lock:
+            for name, other in collected['stages'].items():
+                stage = self.stages.get(name)
+                if stage is None:
+                    stage = self.stages[name] = self._new_stage()
+                stage['count'] += other['count']
+                stage['total_s'] += other['total_s']
+                if other['max_s'] >= stage['max_s']:
+                    stage['max_s'] = other['max_s']
+                    stage['max_building_id'] = other['max_building_id']
+                    stage['max_source'] = other['max_source'] if source is None else source
+                stage['xpath_calls'] += other['xpath_calls']
+                stage['elements'] += other['elements']
+                stage['histogram'] = [x + y for x, y in zip(stage['histogram'], other['histogram'])]
+
+    def to_dict(self):
+        """The aggregated stats as a JSON serializable dict"""
+        with self._lock:
+            stages = OrderedDict()
+            for name, stage in self.stages.items():
+                stages[name] = OrderedDict(stage)
+                stages[name]['mean_s'] = stage['total_s'] / stage['count']
+                stages[name]['histogram'] = list(stage['histogram'])
+            return OrderedDict([
+                ('histogram_bins_s', list(HISTOGRAM_BINS)),
+                ('stages', stages),
+            ])
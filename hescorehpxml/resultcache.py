@@ -0,0 +1,224 @@
+from contextlib import closing
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+from jsonschema.exceptions import SchemaError, ValidationError
+from lxml import etree
+
+from . import HPXMLtoHEScoreTranslator
+from .base import BYTES_TYPES, BuildingResult
+from .exceptions import HPXMLtoHEScoreError, InputOutOfBounds, picklable_error
+
+CACHE_FORMAT = 1
+
+# Errors that translating the same document always gives again. Anything else, like running out of memory, isn't
+# cached.
+CACHED_ERRORS = (HPXMLtoHEScoreError, ValidationError, SchemaError, etree.XMLSyntaxError)
+
+# Inputs whose bounds depend on today's date, a document out of bounds today might not be tomorrow
+DATED_INPUTS = ('assessment_date',)
+
+# Files whose contents go in the translator version: the code, schemas and lookup tables
+TRANSLATOR_FILE_TYPES = ('.py', '.xsd', '.json', '.csv')
+
+_translator_version = None
+
+
+def get_package_version():
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        # Python 3.7
+        import pkg_resources
+        try:
+            return pkg_resources.get_distribution('hescore-hpxml').version
+        except pkg_resources.DistributionNotFound:
+            return None
+    try:
+        return version('hescore-hpxml')
+    except PackageNotFoundError:
+        # Run from a source checkout without installing it
+        return None
+
+
+def get_translator_version():
+    """Version of the package plus a hash of its code, schemas and lookup tables
+
+    The files are hashed too so that changing one in a source checkout or editable install starts the cache over.
+    """
+    global _translator_version
+    if _translator_version is None:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(package_dir):
+            dirnames[:] = sorted(x for x in dirnames if x != '__pycache__')
+            paths.extend(os.path.join(dirpath, x) for x in sorted(filenames) if x.endswith(TRANSLATOR_FILE_TYPES))
+        h = hashlib.sha256()
+        for path in paths:
+            h.update(os.path.relpath(path, package_dir).replace(os.sep, '/').encode('utf-8'))
+            h.update(b'\0')
+            with open(path, 'rb') as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        _translator_version = '{}+{}'.format(get_package_version(), h.hexdigest()[:16])
+    return _translator_version
+
+
+def read_hpxml_bytes(hpxml_input):
+    """Read the bytes of an HPXML document from a filename, file-like object, or buffer"""
+    if isinstance(hpxml_input, BYTES_TYPES):
+        return hpxml_input
+    elif isinstance(hpxml_input, (str, os.PathLike)):
+        with open(hpxml_input, 'rb') as f:
+            return f.read()
+    elif hasattr(hpxml_input, 'read'):
+        return hpxml_input.read()
+    raise TypeError('A result cache needs the bytes of the HPXML document, not {}'.format(type(hpxml_input).__name__))
+
+
+class ResultCache(object):
+    """Translations of whole HPXML documents saved in a SQLite database, keyed by a hash of the document
+
+    The key is a hash of the bytes of the document, the building, project and contractor ids, the ``validate`` and
+    ``huge_tree`` options, and the version of this package. Errors that the document will always give, like failing
+    validation, are saved too so a known bad document fails right away. Buildings without a
+    ``<ProjectStatus><Date>`` are assessed on the day they're translated, so their results aren't saved, and neither
+    are assessment dates out of bounds, which are checked against today's date. The least recently used results are
+    dropped once they add up to more than ``max_bytes``.
+
+    The database can be shared between threads and processes. Results are saved with pickle, so keep the database
+    somewhere only trusted users can write to.
+
+    :param filename: filename of the SQLite database, it's made if it doesn't exist
+    :param max_bytes: size the saved results are kept under
+    """
+
+    def __init__(self, filename, max_bytes=1 << 30):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(key TEXT PRIMARY KEY, result BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+
+    def _connect(self):
+        return sqlite3.connect(self.filename, timeout=30)
+
+    def __getstate__(self):
+        # Each process opens its own connections
+        return {'filename': self.filename, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @staticmethod
+    def get_key(hpxml_bytes, hpxml_bldg_id=None, hpxml_project_id=None, hpxml_contractor_id=None, validate='once',
+                huge_tree=False):
+        h = hashlib.sha256()
+        h.update(json.dumps([
+            CACHE_FORMAT,
+            get_translator_version(),
+            hpxml_bldg_id,
+            hpxml_project_id,
+            hpxml_contractor_id,
+            validate,
+            huge_tree,
+        ]).encode())
+        h.update(b'\0')
+        h.update(hpxml_bytes)
+        return h.hexdigest()
+
+    def get(self, key):
+        """Get a saved ``BuildingResult``
+
+        :raises KeyError: if there isn't one
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                raise KeyError(key)
+            conn.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key, result):
+        """Save a ``BuildingResult`` and drop the least recently used ones over ``max_bytes``"""
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO results (key, result, size, used) VALUES (?, ?, ?, ?)',
+                (key, blob, len(blob), time.time())
+            )
+            conn.execute(
+                'DELETE FROM results WHERE key IN ('
+                'SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY used DESC, rowid DESC) AS total FROM results) '
+                'WHERE total > ?)',
+                (self.max_bytes,)
+            )
+
+    def translate_result(self, hpxml_input, hpxml_bldg_id=None, hpxml_project_id=None, hpxml_contractor_id=None,
+                         validate='once', huge_tree=False, **kwargs):
+        """Get the saved result for a document or translate it and save that
+
+        A saved result is returned without parsing or validating the document.
+
+        :param hpxml_input: filename, file-like object, or bytes of the HPXML document
+        :param kwargs: passed to ``HPXMLtoHEScoreTranslator()``
+        :returns: ``BuildingResult`` with the id of the building and either the HEScore inputs or the error
+        :raises: any error translating the document that isn't in ``CACHED_ERRORS``
+        """
+        hpxml_bytes = read_hpxml_bytes(hpxml_input)
+        key = self.get_key(hpxml_bytes, hpxml_bldg_id, hpxml_project_id, hpxml_contractor_id, validate, huge_tree)
+        try:
+            return self.get(key)
+        except KeyError:
+            pass
+        building_id = hpxml_bldg_id
+        try:
+            t = HPXMLtoHEScoreTranslator(hpxml_bytes, validate=validate, huge_tree=huge_tree, **kwargs)
+            if building_id is None:
+                building_id = t.xpath(t.hpxmldoc, 'h:Building[1]/h:BuildingID/@id')
+                # Not the lxml string that holds on to the document
+                building_id = None if building_id is None else str(building_id)
+            result = BuildingResult(building_id, t.hpxml_to_hescore(
+                hpxml_bldg_id=hpxml_bldg_id,
+                hpxml_project_id=hpxml_project_id,
+                hpxml_contractor_id=hpxml_contractor_id
+            ), None)
+        except CACHED_ERRORS as ex:
+            result = BuildingResult(building_id, None, picklable_error(ex))
+            if isinstance(ex, InputOutOfBounds) and ex.inpname in DATED_INPUTS:
+                return result
+        else:
+            # Its assessment date is today's, which would be wrong tomorrow
+            date_el = t.xpath(t.hpxmldoc, 'h:Building[h:BuildingID/@id=$bldgid]/h:ProjectStatus/h:Date',
+                              bldgid=building_id)
+            if date_el is None:
+                return result
+        self.put(key, result)
+        return result
+
+    def translate(self, hpxml_input, *args, **kwargs):
+        """Like ``translate_result()``, but returns the HEScore inputs and raises the error"""
+        result = self.translate_result(hpxml_input, *args, **kwargs)
+        if result.error is not None:
+            raise result.error
+        return result.hescore
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM results')
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
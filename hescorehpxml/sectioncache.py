@@ -0,0 +1,57 @@
+from collections import Counter, OrderedDict
+from copy import deepcopy
+import threading
+
+
+class SectionCache(object):
+    """Translated sections of buildings, keyed by a hash of the HPXML and earlier sections each one reads
+
+    Pass one to several translators as ``section_cache`` so that translating a building again after only part of it
+    changed, like a new water heater, only redoes the sections that read the changed part and reuses the rest. The
+    sections are ``address``, ``about``, ``zone_floor``, ``zone_roof``, ``skylights``, ``zone_wall``, ``hvac``,
+    ``dhw`` and ``generation``. The least recently used entries are dropped once there are more than ``maxsize``.
+
+    Entries are copied going in and out so translations can't change each other's results. It can be shared
+    between threads.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, section, key):
+        """Get a copy of a cached section
+
+        :param section: name of the section
+        :param key: hash of the section's inputs
+        :raises KeyError: if it isn't cached
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses[section] += 1
+                raise
+            self._entries.move_to_end(key)
+            self.hits[section] += 1
+        return deepcopy(value)
+
+    def put(self, key, value):
+        value = deepcopy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits.clear()
+            self.misses.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,195 @@
+import argparse
+from collections import OrderedDict
+import logging
+import sys
+from lxml import etree
+
+from . import get_translator_class
+from .base import HPXML_PARSER_OPTIONS, HPXMLtoHEScoreTranslatorBase
+from .batch import get_source_name, set_error, write_jsonl
+from .exceptions import TranslationError
+
+# Top level sections of a document that any building can refer to. They are kept while the buildings are translated,
+# everything else is dropped as soon as it has been parsed.
+SHARED_SECTIONS = ('XMLTransactionHeaderInformation', 'SoftwareInfo', 'Contractor', 'Customer', 'Project')
+DROPPED_SECTIONS = ('Building', 'Utility', 'Consumption')
+
+
+def is_schema_error(ex):
+    """Whether an XMLSyntaxError from parsing with a schema is the document not being valid rather than well-formed"""
+    return etree.ErrorTypes.SCHEMAV_NOROOT <= ex.code <= etree.ErrorTypes.SCHEMAV_MISC
+
+
+def iterparse_sections(hpxmlfilename, huge_tree=False, schema=None):
+    """Parse a document, with an event at the end of each element named in ``SHARED_SECTIONS`` or ``DROPPED_SECTIONS``
+
+    :param hpxmlfilename: filename or file-like object
+    :param schema: ``etree.XMLSchema`` to validate the document against as it's parsed
+    :returns: ``etree.iterparse``
+    """
+    return etree.iterparse(
+        hpxmlfilename,
+        events=('end',),
+        tag=['{*}' + section for section in DROPPED_SECTIONS + SHARED_SECTIONS],
+        schema=schema,
+        remove_blank_text=True,
+        huge_tree=huge_tree,
+        **HPXML_PARSER_OPTIONS
+    )
+
+
+def is_top_level(el):
+    parent = el.getparent()
+    return parent is not None and parent.getparent() is None
+
+
+def read_shared_sections(hpxmlfilename, translator_class, validate='once', huge_tree=False):
+    """Parse a document keeping only the sections in ``SHARED_SECTIONS``
+
+    :returns: root element of the document with only those sections in it
+    :raises TranslationError: if it's validated and isn't valid
+    """
+    schema = None if validate == 'never' else translator_class.load_schema().schema
+    events = iterparse_sections(hpxmlfilename, huge_tree, schema)
+    try:
+        for _, el in events:
+            if is_top_level(el) and etree.QName(el).localname in DROPPED_SECTIONS:
+                el.getparent().remove(el)
+    except etree.XMLSyntaxError as ex:
+        if schema is not None and is_schema_error(ex):
+            raise TranslationError(
+                'Failed to validate against the following HPXML schema: {}'.format(translator_class.SCHEMA_DIR)
+            ) from ex
+        raise
+    return events.root
+
+
+def iter_translate_buildings(hpxmlfilename, validate='once', hpxml_project_id=None, hpxml_contractor_id=None,
+                             huge_tree=False, dedupe=False, **kwargs):
+    """Translate every <Building> in an HPXML file without loading the whole file
+
+    The file is read twice. The first time it's validated and the header, <Contractor>, <Customer>, and <Project>
+    elements are kept. The second time each <Building> is translated with those as soon as it has been parsed and is
+    then thrown away, so memory use depends on the size of the largest building rather than the file.
+
+    :param hpxmlfilename: filename or seekable binary file-like object
+    :param validate: 'never' to skip validating the file, otherwise it is validated once while it's read the first
+        time
+    :param hpxml_project_id: <Project> to use for every building, defaults to the first one
+    :param hpxml_contractor_id: <Contractor> to use for every building, defaults to the one each building references
+        or the first one
+    :param huge_tree: turn off the limits on the size and depth of the file
+    :param dedupe: translate buildings that are the same apart from their ids, address and comments once, see
+        ``translate_all_buildings()``
+    :param kwargs: passed to the translator, i.e. ``instrument`` and ``section_cache``
+    :returns: generator of ``BuildingResult`` namedtuples like ``translate_all_buildings()``
+    :raises TranslationError: if the file isn't valid, before any building is translated
+    """
+    try:
+        start = hpxmlfilename.tell()
+    except AttributeError:
+        start = None
+    translator_class = get_translator_class(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmlfilename))
+    shared_root = read_shared_sections(hpxmlfilename, translator_class, validate, huge_tree)
+    translator = translator_class(shared_root.getroottree(), validate='never', **kwargs)
+    # Buildings go before the projects
+    building_pos = sum(1 for el in shared_root if etree.QName(el).localname != 'Project')
+    translations = {}
+
+    if start is not None:
+        hpxmlfilename.seek(start)
+    for _, el in iterparse_sections(hpxmlfilename, huge_tree):
+        if not is_top_level(el):
+            continue
+        if etree.QName(el).localname != 'Building':
+            el.getparent().remove(el)
+            continue
+        # Moves it out of the document being parsed
+        shared_root.insert(building_pos, el)
+        try:
+            for result in translator.translate_all_buildings(
+                    hpxml_project_id, hpxml_contractor_id, dedupe=dedupe, translations=translations):
+                yield result
+        finally:
+            shared_root.remove(el)
+            el.clear()
+
+
+def stream_main(argv=sys.argv[2:]):
+    parser = argparse.ArgumentParser(
+        prog='hpxml2hescore stream',
+        description='Convert every building in a very large HPXML v2.x or v3.x file to HEScore inputs, reading one building at a time'  # noqa 501
+    )
+    parser.add_argument(
+        'hpxml_input',
+        help='Filename of hpxml file'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=argparse.FileType('w'),
+        default=sys.stdout,
+        help='File to write one line of json per building to as each one finishes. Default: stdout.'
+    )
+    parser.add_argument(
+        '--projectid',
+        help='HPXML project id to use for every building. Default: first one.'
+    )
+    parser.add_argument(
+        '--contractorid',
+        help='HPXML contractor id to use for every building. Default: the one the building references or the first one.'  # noqa 501
+    )
+    parser.add_argument(
+        '--validate',
+        choices=HPXMLtoHEScoreTranslatorBase.VALIDATE_MODES,
+        default='once',
+        help='Use "never" to skip validating the HPXML file against the schema. Default: once.'
+    )
+    parser.add_argument(
+        '--huge-tree',
+        action='store_true',
+        help='Turn off the limits on the size and depth of the HPXML file. Only use this for very large files from trusted sources.'  # noqa 501
+    )
+    parser.add_argument(
+        '--dedupe',
+        action='store_true',
+        help='Translate buildings that are the same apart from their ids, address and comments once and copy the result to the rest.'  # noqa 501
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR, format='%(levelname)s:%(message)s')
+    source = get_source_name(args.hpxml_input)
+
+    def new_record(building_id):
+        return OrderedDict([
+            ('source', source),
+            ('building_id', building_id),
+            ('exit_code', 0),
+            ('error_class', None),
+            ('error', None),
+            ('hescore', None),
+        ])
+
+    def iter_records():
+        try:
+            for result in iter_translate_buildings(
+                    args.hpxml_input,
+                    validate=args.validate,
+                    hpxml_project_id=args.projectid,
+                    hpxml_contractor_id=args.contractorid,
+                    huge_tree=args.huge_tree,
+                    dedupe=args.dedupe):
+                record = new_record(result.building_id)
+                if result.error is None:
+                    record['hescore'] = result.hescore
+                else:
+                    set_error(record, result.error)
+                yield record
+        except Exception as ex:
+            # The file couldn't be read, record that without a building
+            record = new_record(None)
+            set_error(record, ex)
+            yield record
+
+    exit_code = write_jsonl(iter_records(), args.output)
+    if exit_code:
+        sys.exit(exit_code)
@@ -0,0 +1,153 @@
+import argparse
+from collections import OrderedDict
+import json
+import logging
+import os
+import socketserver
+import stat
+import sys
+
+from . import warm_caches
+from .base import HPXMLtoHEScoreTranslatorBase
+from .batch import set_error, translate_source
+from .exceptions import WorkerRequestError
+
+# Keys a request can have besides ``id`` and the document, and the translate_source() arguments they map to
+REQUEST_OPTIONS = OrderedDict([
+    ('bldgid', 'hpxml_bldg_id'),
+    ('projectid', 'hpxml_project_id'),
+    ('contractorid', 'hpxml_contractor_id'),
+    ('validate', 'validate'),
+])
+
+
+def parse_request(line):
+    """Read a request line
+
+    A request is a JSON object with the HPXML document as a string in ``hpxml`` or the filename of one in ``path``.
+    It can also have an ``id`` that is returned with the response and the ``bldgid``, ``projectid``,
+    ``contractorid``, and ``validate`` options of ``hpxml2hescore``.
+
+    :returns: request dict
+    :raises WorkerRequestError: if the line isn't a JSON object
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as ex:
+        raise WorkerRequestError('Request is not valid JSON: {}'.format(ex))
+    if not isinstance(request, dict):
+        raise WorkerRequestError('Request must be a JSON object')
+    return request
+
+
+def get_translate_args(request):
+    """Check a request and get what to translate from it
+
+    :returns: (HPXML source, dict of translate_source() keyword arguments)
+    :raises WorkerRequestError: if the request isn't valid
+    """
+    unknown_keys = set(request.keys()) - set(REQUEST_OPTIONS.keys()) - {'id', 'hpxml', 'path'}
+    if unknown_keys:
+        raise WorkerRequestError('Unknown request keys: {}'.format(', '.join(sorted(unknown_keys))))
+    if ('hpxml' in request) == ('path' in request):
+        raise WorkerRequestError('Request must have one of "hpxml" or "path"')
+    for key in ('hpxml', 'path', 'bldgid', 'projectid', 'contractorid'):
+        if request.get(key) is not None and not isinstance(request[key], str):
+            raise WorkerRequestError('"{}" must be a string'.format(key))
+    if request.get('validate', 'once') not in HPXMLtoHEScoreTranslatorBase.VALIDATE_MODES:
+        raise WorkerRequestError(
+            '"validate" must be one of {}'.format(', '.join(HPXMLtoHEScoreTranslatorBase.VALIDATE_MODES))
+        )
+    if 'hpxml' in request:
+        hpxml_source = request['hpxml'].encode('utf-8')
+    else:
+        hpxml_source = request['path']
+    kwargs = {REQUEST_OPTIONS[k]: v for k, v in request.items() if k in REQUEST_OPTIONS}
+    return hpxml_source, kwargs
+
+
+def handle_request(line):
+    """Translate the document in a request line
+
+    :returns: response record with the request ``id`` followed by the fields of :func:`batch.translate_source`.
+        Invalid requests get a ``WorkerRequestError`` with exit code 1.
+    """
+    response = OrderedDict([('id', None)])
+    try:
+        request = parse_request(line)
+        response['id'] = request.get('id')
+        hpxml_source, kwargs = get_translate_args(request)
+    except WorkerRequestError as ex:
+        response.update([('source', None), ('building_id', None)])
+        set_error(response, ex)
+        response['hescore'] = None
+        return response
+    response.update(translate_source(hpxml_source, **kwargs))
+    return response
+
+
+def serve_stream(infile, outfile):
+    """Answer requests from a text stream, one JSON object per line, until it ends
+
+    Each response is written as one line of JSON and flushed right away.
+    """
+    for line in infile:
+        if not line.strip():
+            continue
+        json.dump(handle_request(line), outfile, separators=(',', ':'))
+        outfile.write('\n')
+        outfile.flush()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = json.dumps(handle_request(line.decode('utf-8')), separators=(',', ':'))
+            self.wfile.write(response.encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class UnixSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_socket_server(socket_path):
+    """Make a server that answers requests on a Unix domain socket, one thread per connection
+
+    A socket file left behind by a server that has stopped is replaced.
+    """
+    try:
+        if stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.remove(socket_path)
+    except FileNotFoundError:
+        pass
+    return UnixSocketServer(socket_path, RequestHandler)
+
+
+def worker_main(argv=sys.argv[2:]):
+    parser = argparse.ArgumentParser(
+        prog='hpxml2hescore worker',
+        description='Keep a translator loaded and translate HPXML documents as requests come in',
+        epilog='Each request is one line of JSON with the HPXML document as a string in "hpxml" or the filename of one in "path", and optionally an "id" and the "bldgid", "projectid", "contractorid" and "validate" options. Each response is one line of JSON with the "id", "exit_code", "error_class", "error", and "hescore" inputs.'  # noqa 501
+    )
+    parser.add_argument(
+        '--socket',
+        help='Path of a Unix domain socket to listen on. Default: read requests from stdin and write responses to stdout.'  # noqa 501
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR, format='%(levelname)s:%(message)s')
+
+    warm_caches()
+    if args.socket is None:
+        serve_stream(sys.stdin, sys.stdout)
+        return
+    with make_socket_server(args.socket) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(args.socket)
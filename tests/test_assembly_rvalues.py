@@ -0,0 +1,57 @@
+import unittest
+
+from hescorehpxml.assembly_rvalues import (
+    AssemblyRValueTable,
+    CONSTRUCTIONS,
+    get_assembly_rvalue_table,
+)
+
+
+def linear_nearest(table, rvalue, construction_type=None, exterior_finish=None):
+    return min(
+        [(doe2code, code_rvalue) for doe2code, code_rvalue in table.rvalues.items()
+         if construction_type is None or (doe2code[2:4] == construction_type and doe2code[6:8] == exterior_finish)],
+        key=lambda x: abs(x[1] - rvalue)
+    )
+
+
+class TestAssemblyRValueTable(unittest.TestCase):
+
+    def test_nearest_matches_linear_search(self):
+        for construction in CONSTRUCTIONS:
+            with self.subTest(construction=construction):
+                table = get_assembly_rvalue_table(construction)
+                self.assertIs(table, get_assembly_rvalue_table(construction))
+                groups = set((doe2code[2:4], doe2code[6:8]) for doe2code in table.rvalues)
+                rvalues = sorted(set(table.rvalues.values()))
+                midpoints = [(x + y) / 2 for x, y in zip(rvalues, rvalues[1:])]
+                for rvalue in [-1, 0, 100] + rvalues + midpoints:
+                    self.assertEqual(table.nearest(rvalue), linear_nearest(table, rvalue))
+                    for construction_type, exterior_finish in groups:
+                        if exterior_finish:
+                            self.assertEqual(
+                                table.nearest(rvalue, construction_type, exterior_finish),
+                                linear_nearest(table, rvalue, construction_type, exterior_finish)
+                            )
+
+    def test_ties_use_table_order(self):
+        table = AssemblyRValueTable('wall', [('ewwf03wo', 6.0), ('ewwf00wo', 4.0), ('ewwf07wo', 4.0)])
+        self.assertEqual(table.nearest(5.0), ('ewwf03wo', 6.0))
+        self.assertEqual(table.nearest(4.0), ('ewwf00wo', 4.0))
+        self.assertEqual(table.nearest_nominal(5), ('ewwf03wo', 6.0))
+
+    def test_immutable_and_missing_group(self):
+        table = get_assembly_rvalue_table('wall')
+        with self.assertRaises(TypeError):
+            table.rvalues['ewwf00wo'] = 1.0
+        self.assertRaises(ValueError, table.nearest, 11, 'xx', 'wo')
+        self.assertEqual(table['ewwf13wo'], table.rvalues['ewwf13wo'])
+
+    def test_knee_wall_nominal(self):
+        table = get_assembly_rvalue_table('knee_wall')
+        self.assertEqual(table.nearest_nominal(12)[0], 'kwwf11')
+        self.assertEqual(table.nearest_nominal(0)[0], 'kwwf00')
+
+
+if __name__ == "__main__":
+    unittest.main()
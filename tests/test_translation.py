@@ -3,11 +3,31 @@ from builtins import str
 from builtins import object
 import datetime as dt
 import os
+import types
 import unittest
+from unittest import mock
 from lxml import etree, objectify
 from lxml.builder import ElementMaker
-from hescorehpxml import HPXMLtoHEScoreTranslator, main
-from hescorehpxml.exceptions import TranslationError, ElementNotFoundError, InputOutOfBounds
+from hescorehpxml import (
+    HPXMLtoHEScoreTranslator, HPXML3toHEScoreTranslator, get_translator_class, main, warm_caches
+)
+from hescorehpxml.base import (
+    BuildingContext,
+    HPXMLtoHEScoreTranslatorBase,
+    get_hescore_json_validator,
+    get_hpxml_parser,
+    parse_hpxml,
+)
+from hescorehpxml.batch import batch_translate, collect_inputs, get_output_filenames, translate_to_jsonl
+from benchmarks.synthetic import generate_house, iter_houses
+from hescorehpxml.exceptions import TranslationError, ElementNotFoundError, InputOutOfBounds, picklable_error
+from hescorehpxml.instrumentation import Instrument, StageCollector
+from hescorehpxml.worker import make_socket_server, serve_stream
+from hescorehpxml.aio import AsyncTranslator
+from hescorehpxml.sectioncache import SectionCache
+from hescorehpxml.resultcache import ResultCache, get_translator_version
+from hescorehpxml.streaming import iter_translate_buildings
+from hescorehpxml.buildingindex import BuildingIndex, translate_indexed_building
 import io
 import json
 from copy import deepcopy
@@ -16,6 +36,14 @@ import sys
 import tempfile
 import jsonschema
 import re
+import asyncio
+import pickle
+import copyreg
+import socket
+import sqlite3
+from contextlib import closing
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
 thisdir = os.path.dirname(os.path.abspath(__file__))
@@ -123,6 +151,1082 @@ class TestCLI(unittest.TestCase, ComparatorBase):
                 d2 = json.load(f)
             self._compare_item(d1, d2)
 
+    def test_cli_batch(self):
+        examples_dir = os.path.abspath(os.path.join(thisdir, '..', 'examples'))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filelist = os.path.join(tmpdir, 'files.txt')
+            with open(filelist, 'w') as f:
+                f.write(os.path.join(examples_dir, 'hescore_min.xml') + '\n')
+                f.write(os.path.join(examples_dir, 'house1.xml') + '\n\n')
+                f.write(os.path.join(thisdir, 'test_translation.py') + '\n')
+            outdir = os.path.join(tmpdir, 'out')
+            with self.assertRaises(SystemExit) as cm:
+                main(['batch', filelist, '-o', outdir, '-j', '2'])
+            self.assertEqual(cm.exception.code, 2)
+            with open(os.path.join(outdir, 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+            self.assertEqual(manifest['n_files'], 3)
+            self.assertEqual(manifest['n_succeeded'], 2)
+            self.assertEqual([x['exit_code'] for x in manifest['files']], [0, 0, 2])
+            self.assertEqual(manifest['files'][2]['error_class'], 'XMLSyntaxError')
+            self.assertIsNone(manifest['files'][2]['output'])
+            for record in manifest['files'][:2]:
+                with open(record['output'], 'r') as f:
+                    d1 = json.load(f)
+                with open(record['input'].replace('.xml', '.json'), 'r') as f:
+                    d2 = json.load(f)
+                self._compare_item(d1, d2)
+
+    def test_batch_inputs(self):
+        examples_dir = os.path.abspath(os.path.join(thisdir, '..', 'examples'))
+        xml_files = collect_inputs(examples_dir)
+        self.assertIn(os.path.join(examples_dir, 'hescore_min.xml'), xml_files)
+        self.assertEqual(xml_files, collect_inputs(os.path.join(examples_dir, '*.xml')))
+        self.assertEqual(
+            get_output_filenames(['a/house1.xml', 'b/house1.xml', 'manifest.xml'], 'out'),
+            [os.path.join('out', x) for x in ('house1.json', 'house1-1.json', 'manifest-1.json')]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = batch_translate([], tmpdir)
+            self.assertEqual(manifest['exit_code'], 0)
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, 'manifest.json')))
+
+    def test_cli_jsonl(self):
+        examples_dir = os.path.abspath(os.path.join(thisdir, '..', 'examples'))
+        xml_files = [os.path.join(examples_dir, x) for x in ('hescore_min.xml', 'house1.xml', 'house2.xml')]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filelist = os.path.join(tmpdir, 'files.txt')
+            with open(filelist, 'w') as f:
+                f.write('\n'.join(xml_files + [os.path.join(thisdir, 'test_translation.py')]))
+            outfile = os.path.join(tmpdir, 'out.jsonl')
+            with self.assertRaises(SystemExit) as cm:
+                main(['batch', filelist, '--jsonl', outfile, '-j', '2'])
+            self.assertEqual(cm.exception.code, 2)
+            with open(outfile, 'r') as f:
+                lines = f.read().splitlines()
+        self.assertEqual(len(lines), 4)
+        records = {}
+        for line in lines:
+            self.assertNotIn('\n  ', line)
+            record = json.loads(line)
+            records[record['source']] = record
+        self.assertEqual(records[os.path.join(thisdir, 'test_translation.py')]['error_class'], 'XMLSyntaxError')
+        for xml_file in xml_files:
+            record = records[xml_file]
+            self.assertEqual(record['exit_code'], 0)
+            self.assertEqual(record['building_id'], 'bldg1')
+            with open(xml_file.replace('.xml', '.json'), 'r') as f:
+                self._compare_item(record['hescore'], json.load(f))
+
+    def test_jsonl_in_process(self):
+        out = io.StringIO()
+        with open(os.path.join(exampledir, 'hescore_min.xml'), 'rb') as f:
+            exit_code = translate_to_jsonl([f, io.BytesIO(b'<HPXML schemaVersion="4.0"/>')], out, max_workers=0)
+        self.assertEqual(exit_code, 1)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records[0]['source'], os.path.join(exampledir, 'hescore_min.xml'))
+        self.assertEqual(records[0]['exit_code'], 0)
+        self.assertEqual(records[1]['error_class'], 'HPXMLtoHEScoreError')
+        self.assertIsNone(records[1]['hescore'])
+
+
+class TestSchemaCache(unittest.TestCase, ComparatorBase):
+
+    def test_schema_shared_between_translators(self):
+        tr1 = self._load_xmlfile('hescore_min')
+        tr2 = self._load_xmlfile('house1')
+        self.assertIs(tr1.schema, tr2.schema)
+        tr3 = self._load_xmlfile('hescore_min_v3')
+        tr4 = self._load_xmlfile('house1_v3')
+        self.assertIs(tr3.schema, tr4.schema)
+        self.assertIsNot(tr1.schema, tr3.schema)
+        self.assertEqual(tr3.ns['h'], 'http://hpxmlonline.com/2019/10')
+
+    def test_warm_caches_threadsafe(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            schemas = list(executor.map(lambda x: HPXML3toHEScoreTranslator.load_schema(), range(8)))
+        for hpxml_schema in schemas:
+            self.assertIs(hpxml_schema, schemas[0])
+        warm_caches()
+        self.assertIs(HPXML3toHEScoreTranslator.load_schema(), schemas[0])
+
+    def test_json_validator_shared(self):
+        json_validator = get_hescore_json_validator()
+        self.assertIs(json_validator, get_hescore_json_validator())
+        self.assertIsInstance(json_validator.format_checker, jsonschema.FormatChecker)
+        hesd = self._load_xmlfile('hescore_min').hpxml_to_hescore()
+        self.assertEqual(hesd['version'], json_validator.schema['properties']['version']['const'])
+        self.assertIs(json_validator, get_hescore_json_validator())
+
+    def test_xpath_registry_shared(self):
+        tr1 = self._load_xmlfile('hescore_min')
+        tr2 = self._load_xmlfile('house1')
+        self.assertIs(tr1.xpaths, tr2.xpaths)
+        self.assertIsNot(tr1.xpaths, self._load_xmlfile('hescore_min_v3').xpaths)
+        b = tr1.xpath(tr1.hpxmldoc, 'h:Building', raise_err=True)
+        self.assertIs(tr1.xpaths['h:BuildingID/@id'], tr1.xpaths['h:BuildingID/@id'])
+        self.assertEqual(tr1.xpath(b, 'h:BuildingID/@id'), b.xpath('h:BuildingID/@id', namespaces=tr1.ns)[0])
+        bldg_id = tr1.xpath(b, 'h:BuildingID/@id')
+        self.assertIs(tr1.xpath(tr1.hpxmldoc, '//h:Building[h:BuildingID/@id=$bldgid]', bldgid=bldg_id), b)
+        self.assertIsNone(tr1.xpath(tr1.hpxmldoc, '//h:Building[h:BuildingID/@id=$bldgid]', bldgid='nope'))
+        self.assertEqual(tr1.xpath(b, 'count(descendant::h:Wall)'), len(b.findall('.//h:Wall', tr1.ns)))
+
+
+class TestVersionDetection(unittest.TestCase, ComparatorBase):
+
+    def test_detect_from_root_start_tag(self):
+        xmlfilepath = os.path.join(exampledir, 'hescore_min_v3.xml')
+        with open(xmlfilepath, 'rb') as f:
+            start_tag = re.search(rb'<HPXML[^>]*>', f.read()).group(0)
+        # Only the root element's start tag is read, so the rest of the document isn't needed.
+        f = io.BytesIO(start_tag + b'<Truncated')
+        self.assertEqual(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(f), [3, 0, 0])
+        self.assertEqual(f.tell(), 0)
+        self.assertEqual(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(xmlfilepath), [3, 0, 0])
+        doc = etree.parse(os.path.join(exampledir, 'hescore_min.xml'))
+        self.assertEqual(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(doc), [2, 3, 0])
+
+    def test_factory_reads_input_once(self):
+
+        class OneShotReader(object):
+            def __init__(self, filename):
+                with open(filename, 'rb') as f:
+                    self._f = io.BytesIO(f.read())
+
+            def read(self, n=-1):
+                return self._f.read(n)
+
+        for filebase in ('hescore_min', 'hescore_min_v3'):
+            tr = HPXMLtoHEScoreTranslator(OneShotReader(os.path.join(exampledir, filebase + '.xml')))
+            self.translator = tr
+            self._do_compare(filebase, 'hescore_min')
+
+    def test_translator_accepts_parsed_tree(self):
+        doc = etree.parse(os.path.join(exampledir, 'hescore_min_v3.xml'))
+        self.translator = HPXML3toHEScoreTranslator(doc)
+        self.assertIs(self.translator.hpxmldoc, doc)
+        self._do_compare('hescore_min_v3', 'hescore_min')
+
+    def test_factory_accepts_parsed_tree(self):
+        for filebase in ('hescore_min', 'hescore_min_v3'):
+            doc = etree.parse(os.path.join(exampledir, filebase + '.xml'))
+            self.translator = HPXMLtoHEScoreTranslator(doc)
+            self.assertIs(self.translator.hpxmldoc, doc)
+            self._do_compare(filebase, 'hescore_min')
+
+    def test_accepts_buffers(self):
+        for filebase, major_version in (('hescore_min', 2), ('hescore_min_v3', 3)):
+            with open(os.path.join(exampledir, filebase + '.xml'), 'rb') as f:
+                hpxml_bytes = f.read()
+            for buf in (hpxml_bytes, bytearray(hpxml_bytes), memoryview(hpxml_bytes)):
+                self.assertEqual(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(buf)[0], major_version)
+                self.translator = HPXMLtoHEScoreTranslator(buf)
+                self._do_compare(filebase, 'hescore_min')
+        self.translator = HPXML3toHEScoreTranslator(memoryview(hpxml_bytes))
+        self._do_compare('hescore_min_v3', 'hescore_min')
+        self.assertRaises(etree.XMLSyntaxError, HPXMLtoHEScoreTranslatorBase.detect_hpxml_version, b'  ')
+
+    def test_detect_from_root_start_tag_in_buffer(self):
+        with open(os.path.join(exampledir, 'hescore_min_v3.xml'), 'rb') as f:
+            start_tag = re.search(rb'<HPXML[^>]*>', f.read()).group(0)
+        buf = memoryview(b' ' * 10000 + start_tag + b'<Truncated')
+        self.assertEqual(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(buf), [3, 0, 0])
+
+
+class TestHPXMLParser(unittest.TestCase, ComparatorBase):
+
+    def test_parser_per_thread(self):
+        parser = get_hpxml_parser()
+        self.assertIs(parser, get_hpxml_parser())
+        self.assertIsNot(parser, get_hpxml_parser(huge_tree=True))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other_thread_parser = executor.submit(get_hpxml_parser).result()
+        self.assertIsNot(parser, other_thread_parser)
+
+    def test_no_entities(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            secret_filename = os.path.join(tmpdir, 'secret.txt')
+            with open(secret_filename, 'w') as f:
+                f.write('do not read')
+            hpxml_bytes = '''<?xml version="1.0"?>
+                <!DOCTYPE HPXML [<!ENTITY xxe SYSTEM "file://{}">]>
+                <HPXML schemaVersion="3.0"><SoftwareInfo>&xxe;</SoftwareInfo></HPXML>
+                '''.format(secret_filename).encode('utf-8')
+            for hpxml_input in (hpxml_bytes, io.BytesIO(hpxml_bytes)):
+                doc = parse_hpxml(hpxml_input)
+                self.assertNotIn(b'do not read', etree.tostring(doc))
+
+    def test_remove_blank_text(self):
+        tr = self._load_xmlfile('hescore_min_v3')
+        for el in tr.hpxmldoc.iter():
+            if len(el):
+                self.assertIsNone(el.text)
+                self.assertTrue(all(child.tail is None for child in el))
+
+    def test_huge_tree(self):
+        deep_doc = b'<HPXML schemaVersion="3.0">' + b'<a>' * 300 + b'</a>' * 300 + b'</HPXML>'
+        self.assertRaises(etree.XMLSyntaxError, parse_hpxml, deep_doc)
+        self.assertRaises(etree.XMLSyntaxError, HPXMLtoHEScoreTranslator, deep_doc)
+        self.assertEqual(parse_hpxml(deep_doc, huge_tree=True).getroot().tag, 'HPXML')
+
+
+class TestValidateMode(unittest.TestCase, ComparatorBase):
+
+    def _make_invalid(self, tr):
+        el = self.xpath('//h:Building[1]/h:ProjectStatus/h:EventType')
+        el.addnext(etree.Element(tr.addns('h:NotAnHPXMLElement')))
+
+    def test_validate_once(self):
+        tr = self._load_xmlfile('hescore_min')
+        self.assertEqual(tr.validate_mode, 'once')
+        tr.hpxml_to_hescore()
+        self._make_invalid(tr)
+        tr.hpxml_to_hescore()
+        tr.invalidate()
+        self.assertRaises(etree.DocumentInvalid, tr.hpxml_to_hescore)
+
+    def test_validate_always(self):
+        xmlfilepath = os.path.join(exampledir, 'hescore_min_v3.xml')
+        self.translator = HPXMLtoHEScoreTranslator(xmlfilepath, validate='always')
+        self._make_invalid(self.translator)
+        self.assertRaises(etree.DocumentInvalid, self.translator.hpxml_to_hescore)
+
+    def test_validate_never(self):
+        tr = self._load_xmlfile('hescore_min')
+        self._make_invalid(tr)
+        f = io.BytesIO()
+        tr.hpxmldoc.write(f)
+        f.seek(0)
+        self.assertRaises(TranslationError, HPXMLtoHEScoreTranslator, f)
+        f.seek(0)
+        tr = HPXMLtoHEScoreTranslator(f, validate='never')
+        self.assertEqual(tr.hpxml_to_hescore()['address']['zip_code'], '80401')
+
+    def test_validate_bad_mode(self):
+        xmlfilepath = os.path.join(exampledir, 'hescore_min.xml')
+        self.assertRaises(ValueError, HPXMLtoHEScoreTranslator, xmlfilepath, validate='sometimes')
+
+
+class TestTranslateAllBuildings(unittest.TestCase, ComparatorBase):
+
+    def _add_building_copy(self, tr, suffix):
+        b = deepcopy(self.xpath('h:Building[1]'))
+        new_ids = {}
+        for el in b.iter():
+            if el.get('id'):
+                new_ids[el.get('id')] = '{}{:04d}'.format(suffix, len(new_ids))
+                el.set('id', new_ids[el.get('id')])
+        for el in b.iter():
+            if el.get('idref'):
+                el.set('idref', new_ids.get(el.get('idref'), el.get('idref')))
+        b.find(tr.addns('h:BuildingID')).set('id', 'bldg1' + suffix)
+        self.xpath('h:Building[last()]').addnext(b)
+        tr.invalidate()
+        return b
+
+    def _test_all_buildings(self, filebase):
+        tr = self._load_xmlfile(filebase)
+        self._add_building_copy(tr, '_2')
+        self._add_building_copy(tr, '_3')
+        year_built = self.xpath('h:Building[3]//h:BuildingConstruction/h:YearBuilt')
+        year_built.getparent().remove(year_built)
+        expected = tr.hpxml_to_hescore()
+        results = tr.translate_all_buildings()
+        self.assertIsInstance(results, types.GeneratorType)
+        results = list(results)
+        self.assertEqual([x.building_id for x in results], ['bldg1', 'bldg1_2', 'bldg1_3'])
+        for result in results[:2]:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.hescore, expected)
+            self.assertEqual(result.hescore, tr.hpxml_to_hescore(hpxml_bldg_id=result.building_id))
+        self.assertIsNone(results[2].hescore)
+        self.assertIsInstance(results[2].error, ElementNotFoundError)
+
+    def test_all_buildings_v2(self):
+        self._test_all_buildings('house1')
+
+    def test_all_buildings_v3(self):
+        self._test_all_buildings('house1_v3')
+
+    def test_all_buildings_validates_once(self):
+        tr = self._load_xmlfile('hescore_min')
+        self._add_building_copy(tr, '_2')
+        with mock.patch.object(tr, 'schema', mock.NonCallableMock(spec=['assertValid'])) as mock_schema:
+            self.assertEqual(len([x for x in tr.translate_all_buildings() if x.error is None]), 2)
+        self.assertEqual(mock_schema.assertValid.call_count, 1)
+
+    def test_buildings_in_threads(self):
+        tr = self._load_xmlfile('house3_v3')
+        for i, orientation in enumerate(('north', 'east', 'south', 'west', 'northeast', 'southwest', 'west', 'south')):
+            b = self._add_building_copy(tr, '_{}_'.format(i))
+            b.find('.//h:Site/h:OrientationOfFrontOfHome', tr.ns).text = orientation
+        contexts = list(tr.get_building_contexts())
+        self.assertEqual(len(contexts), 9)
+        serial = [tr.hpxml_to_hescore(hpxml_bldg_id=ctx.building_id) for ctx in contexts]
+        self.assertEqual(len(set(x['about']['orientation'] for x in serial)), 6)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            concurrent = list(executor.map(tr.translate_building, contexts + [
+                ctx for _ in range(3) for ctx in tr.get_building_contexts()
+            ]))
+            by_id = list(executor.map(lambda ctx: tr.hpxml_to_hescore(hpxml_bldg_id=ctx.building_id), contexts * 4))
+        self.assertEqual(concurrent, serial * 4)
+        self.assertEqual(by_id, serial * 4)
+        self.assertEqual(contexts[1].sidemap, {0: 'front', 90: 'left', 180: 'back', 270: 'right'})
+        self.assertFalse(hasattr(tr, 'sidemap'))
+
+    def test_all_buildings_invalid(self):
+        tr = self._load_xmlfile('hescore_min')
+        self.xpath('h:Building[1]/h:ProjectStatus/h:EventType').addnext(etree.Element(tr.addns('h:NotAnHPXMLElement')))
+        tr.invalidate()
+        self.assertRaises(etree.DocumentInvalid, next, tr.translate_all_buildings())
+
+    def _stream_buildings(self, filebase):
+        tr = self._load_xmlfile(filebase)
+        self._add_building_copy(tr, '_2')
+        self._add_building_copy(tr, '_3')
+        year_built = self.xpath('h:Building[3]//h:BuildingConstruction/h:YearBuilt')
+        year_built.getparent().remove(year_built)
+        hpxml = etree.tostring(tr.hpxmldoc)
+        expected = list(tr.translate_all_buildings())
+
+        translator_class = type(tr)
+        original = translator_class.translate_all_buildings
+        n_buildings = []
+
+        def translate_all_buildings(translator, *args, **kwargs):
+            n_buildings.append(len(translator.xpath(translator.hpxmldoc, 'h:Building', aslist=True)))
+            return original(translator, *args, **kwargs)
+
+        with mock.patch.object(translator_class, 'translate_all_buildings', translate_all_buildings):
+            results = iter_translate_buildings(io.BytesIO(hpxml))
+            self.assertIsInstance(results, types.GeneratorType)
+            results = list(results)
+        self.assertEqual(n_buildings, [1, 1, 1])
+        self.assertEqual([x.building_id for x in results], ['bldg1', 'bldg1_2', 'bldg1_3'])
+        for result, expected_result in zip(results[:2], expected[:2]):
+            self.assertIsNone(result.error)
+            self.assertEqual(result.hescore, expected_result.hescore)
+        self.assertIsNone(results[2].hescore)
+        self.assertIsInstance(results[2].error, ElementNotFoundError)
+        return hpxml
+
+    def test_stream_buildings_v2(self):
+        self._stream_buildings('house1')
+
+    def test_stream_buildings_v3(self):
+        hpxml = self._stream_buildings('house1_v3')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'buildings.xml')
+            with open(filename, 'wb') as f:
+                f.write(hpxml)
+            outfile = os.path.join(tmpdir, 'out.jsonl')
+            with self.assertRaises(SystemExit) as cm:
+                main(['stream', filename, '-o', outfile])
+            self.assertEqual(cm.exception.code, 1)
+            with open(outfile, 'r') as f:
+                records = [json.loads(line) for line in f]
+            with self.assertRaises(SystemExit):
+                main(['stream', filename, '-o', outfile, '--dedupe'])
+            with open(outfile, 'r') as f:
+                self.assertEqual([json.loads(line) for line in f], records)
+        self.assertEqual([x['building_id'] for x in records], ['bldg1', 'bldg1_2', 'bldg1_3'])
+        self.assertEqual([x['exit_code'] for x in records], [0, 0, 1])
+        self.assertEqual(records[0]['source'], filename)
+        self.assertEqual(records[0]['hescore'], records[1]['hescore'])
+        self.assertEqual(records[2]['error_class'], 'ElementNotFoundError')
+
+    def test_stream_buildings_invalid(self):
+        tr = self._load_xmlfile('hescore_min')
+        self._add_building_copy(tr, '_2')
+        self.xpath('h:Building[2]/h:ProjectStatus/h:EventType').addnext(etree.Element(tr.addns('h:NotAnHPXMLElement')))
+        hpxml = etree.tostring(tr.hpxmldoc)
+        self.assertRaises(TranslationError, next, iter_translate_buildings(io.BytesIO(hpxml)))
+        self.assertEqual(len(list(iter_translate_buildings(io.BytesIO(hpxml), validate='never'))), 2)
+        self.assertRaises(
+            etree.XMLSyntaxError, next, iter_translate_buildings(io.BytesIO(hpxml[:-100]), validate='never')
+        )
+        out = io.StringIO()
+        with mock.patch('sys.stdout', out), tempfile.NamedTemporaryFile(suffix='.xml') as f:
+            f.write(hpxml)
+            f.flush()
+            with self.assertRaises(SystemExit) as cm:
+                main(['stream', f.name])
+        self.assertEqual(cm.exception.code, 1)
+        record = json.loads(out.getvalue())
+        self.assertIsNone(record['building_id'])
+        self.assertEqual(record['error_class'], 'TranslationError')
+
+    def _dedupe_buildings(self, filebase):
+        tr = self._load_xmlfile(filebase)
+        E = self.element_maker()
+        for suffix in ('_2', '_3', '_4', '_5'):
+            self._add_building_copy(tr, suffix)
+        # A different address and comments, which are translated for each building
+        self.xpath('h:Building[2]/h:Site/h:Address/h:Address1').text = '2 Other Street'
+        self.xpath('h:Building[2]/h:Site/h:Address/h:ZipCode').text = '80401'
+        self.xpath('h:Building[2]/h:BuildingDetails').addnext(E.extension(E.Comments('Unit 2')))
+        # A different window, so a different translation
+        self.xpath('h:Building[3]//h:Windows/h:Window[1]/h:Area').text = '99'
+        # No address, the error is the same as translating it
+        city = self.xpath('h:Building[4]/h:Site/h:Address/h:CityMunicipality')
+        city.getparent().remove(city)
+        tr.invalidate()
+        expected = list(tr.translate_all_buildings())
+
+        translator_class = type(tr)
+        with mock.patch.object(
+                translator_class, 'translate_building', autospec=True, side_effect=translator_class.translate_building
+        ) as translate_building:
+            results = list(tr.translate_all_buildings(dedupe=True))
+        self.assertEqual(
+            [call.args[1].building_id for call in translate_building.call_args_list], ['bldg1', 'bldg1_3']
+        )
+        self.assertEqual(len(results), len(expected))
+        for result, expected_result in zip(results, expected):
+            self.assertEqual(result.building_id, expected_result.building_id)
+            self.assertEqual(result.hescore, expected_result.hescore)
+            self.assertEqual(type(result.error), type(expected_result.error))
+            self.assertEqual(str(result.error), str(expected_result.error))
+        self.assertEqual(results[1].hescore['address']['address'], '2 Other Street')
+        self.assertEqual(results[1].hescore['about']['comments'], 'Unit 2')
+        self.assertIsInstance(results[3].error, ElementNotFoundError)
+
+        # Translations passed in are shared between calls
+        translations = {}
+        list(tr.translate_all_buildings(dedupe=True, translations=translations))
+        self.assertEqual(len(translations), 2)
+        with mock.patch.object(translator_class, 'translate_building', autospec=True) as translate_building:
+            results = list(tr.translate_all_buildings(dedupe=True, translations=translations))
+        translate_building.assert_not_called()
+        self.assertEqual([x.hescore for x in results], [x.hescore for x in expected])
+
+        # The translations carry over between buildings while streaming
+        streamed = list(iter_translate_buildings(io.BytesIO(etree.tostring(tr.hpxmldoc)), dedupe=True))
+        self.assertEqual([x.hescore for x in streamed], [x.hescore for x in expected])
+        return tr
+
+    def test_dedupe_buildings_v2(self):
+        self._dedupe_buildings('house1')
+
+    def test_dedupe_buildings_v3(self):
+        tr = self._dedupe_buildings('house3_v3')
+        # The ids are renamed, but what refers to what still counts
+        ctx1, ctx2 = list(tr.get_building_contexts())[:2]
+        self.assertEqual(tr.get_building_fingerprint(ctx1), tr.get_building_fingerprint(ctx2))
+        ctx1.building.find('.//' + tr.addns('h:AttachedToRoof')).set('idref', 'unknown')
+        self.assertNotEqual(tr.get_building_fingerprint(ctx1), tr.get_building_fingerprint(ctx2))
+
+    def test_dedupe_between_documents(self):
+        with open(os.path.join(exampledir, 'hescore_min_v3.xml'), 'rb') as f:
+            hpxml = f.read()
+        translations = {}
+        results = []
+        for transaction in (b'create', b'update', b'create'):
+            doc = hpxml.replace(b'>create</Transaction>', b'>' + transaction + b'</Transaction>')
+            expected = HPXML3toHEScoreTranslator(doc).hpxml_to_hescore()
+            result, = HPXML3toHEScoreTranslator(doc).translate_all_buildings(dedupe=True, translations=translations)
+            self.assertEqual(result.hescore, expected)
+            results.append(result.hescore['about']['assessment_type'])
+        self.assertEqual(results, ['initial', 'corrected', 'initial'])
+        self.assertEqual(len(translations), 2)
+
+    def test_indexed_building(self):
+        tr = self._load_xmlfile('house1_v3')
+        E = self.element_maker()
+        self._add_building_copy(tr, '_2')
+        self._add_building_copy(tr, '_3')
+        self.xpath('h:Building[3]//h:Windows/h:Window[1]/h:Area').text = '99'
+        building_el = self.xpath('h:Building[1]')
+        building_el.addprevious(E.Customer(
+            E.CustomerDetails(E.Person(E.SystemIdentifier(id='cust2'), E.Name(E.FirstName('A'), E.LastName('B'))))
+        ))
+        self.xpath('h:Building[2]/h:BuildingID').addnext(E.CustomerID(id='cust2'))
+        self.xpath('h:Building[last()]').addnext(E.Project(
+            E.ProjectID(id='p3'),
+            E.PreBuildingID(id='bldg1_2'),
+            E.PostBuildingID(id='bldg1_3'),
+            E.ProjectDetails(E.StartDate('2017-08-20'))
+        ))
+        tr.invalidate()
+        expected = dict((x, tr.hpxml_to_hescore(hpxml_bldg_id=x)) for x in ['bldg1', 'bldg1_2', 'bldg1_3'])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'buildings.xml')
+            tr.hpxmldoc.write(filename, xml_declaration=True, encoding='UTF-8')
+            index = BuildingIndex.build(filename)
+            self.assertEqual(index.building_ids, list(expected.keys()))
+            # Without a project id the first project goes with every building, like translating the whole file
+            self.assertEqual(
+                [x['name'] for x in index.get_sections('bldg1')],
+                ['XMLTransactionHeaderInformation', 'SoftwareInfo', 'Customer', 'Building', 'Building', 'Building',
+                 'Project']
+            )
+            self.assertEqual(
+                [x['name'] for x in index.get_sections('bldg1_3')],
+                ['XMLTransactionHeaderInformation', 'SoftwareInfo', 'Customer', 'Building', 'Building', 'Project']
+            )
+            for building_id, hescore in expected.items():
+                self.assertEqual(translate_indexed_building(filename, index, building_id), hescore)
+            self.assertEqual(translate_indexed_building(filename, index), expected['bldg1'])
+            self.assertEqual(
+                translate_indexed_building(filename, index, 'bldg1', 'p3'),
+                tr.hpxml_to_hescore(hpxml_bldg_id='bldg1', hpxml_project_id='p3')
+            )
+            self.assertRaises(TranslationError, translate_indexed_building, filename, index, 'bldg4')
+
+            # From the command line
+            with self.assertRaises(SystemExit) as cm:
+                main(['index', os.path.join(tmpdir, 'notthere.xml')])
+            self.assertEqual(cm.exception.code, 1)
+            main(['index', filename])
+            outfile = os.path.join(tmpdir, 'out.json')
+            main([filename, '--index', filename + '.index.json', '--bldgid', 'bldg1_3', '-o', outfile])
+            with open(outfile, 'r') as f:
+                self.assertEqual(json.load(f), expected['bldg1_3'])
+
+            # The index can't be used once the file changes
+            with open(filename, 'ab') as f:
+                f.write(b'\n')
+            self.assertRaises(TranslationError, translate_indexed_building, filename, filename + '.index.json')
+
+
+class TestInstrumentation(unittest.TestCase, ComparatorBase):
+
+    BUILDING_STAGES = [
+        'address', 'hpwes', 'about', 'zone_floor', 'zone_roof', 'skylights', 'zone_wall', 'hvac', 'dhw',
+        'generation', 'json_validate', 'bounds_check'
+    ]
+
+    def test_stage_events(self):
+
+        class EventRecorder(Instrument):
+            def __init__(self):
+                self.events = []
+
+            def stage_started(self, stage, building_id):
+                self.events.append(('start', stage, building_id))
+
+            def stage_finished(self, stats):
+                self.events.append(('stop', stats.stage, stats.building_id))
+
+        recorder = EventRecorder()
+        tr = HPXMLtoHEScoreTranslator(os.path.join(exampledir, 'house1.xml'), instrument=recorder)
+        self.assertEqual(recorder.events, [('start', 'hpxml_validate', None), ('stop', 'hpxml_validate', None)])
+        del recorder.events[:]
+        tr.hpxml_to_hescore()
+        expected = [('start', 'translate', 'bldg1')]
+        for stage in self.BUILDING_STAGES:
+            expected.extend([('start', stage, 'bldg1'), ('stop', stage, 'bldg1')])
+        expected.append(('stop', 'translate', 'bldg1'))
+        self.assertEqual(recorder.events, expected)
+
+    def test_collector(self):
+        collector = StageCollector()
+        tr = self._load_xmlfile('house1')
+        tr.instrument = collector
+        tr.hpxml_to_hescore()
+        tr.hpxml_to_hescore()
+        stats = collector.to_dict()
+        self.assertEqual(list(stats['stages'].keys()), self.BUILDING_STAGES + ['translate'])
+        for stage in stats['stages'].values():
+            self.assertEqual(stage['count'], 2)
+            self.assertEqual(sum(stage['histogram']), 2)
+            self.assertEqual(stage['max_building_id'], 'bldg1')
+        translate = stats['stages']['translate']
+        self.assertEqual(
+            translate['xpath_calls'],
+            sum(stats['stages'][stage]['xpath_calls'] for stage in self.BUILDING_STAGES)
+        )
+        self.assertGreater(stats['stages']['about']['xpath_calls'], 0)
+        self.assertGreater(stats['stages']['about']['elements'], 0)
+        self.assertEqual(stats['stages']['zone_wall']['xpath_calls'], 0)
+        json.dumps(stats)
+
+        combined = StageCollector()
+        combined.update(stats, 'house1.xml')
+        combined.update(stats, 'house1_again.xml')
+        combined_stats = combined.to_dict()
+        self.assertEqual(combined_stats['stages']['hvac']['count'], 4)
+        self.assertEqual(combined_stats['stages']['hvac']['max_source'], 'house1_again.xml')
+        self.assertEqual(
+            combined_stats['stages']['hvac']['xpath_calls'],
+            2 * stats['stages']['hvac']['xpath_calls']
+        )
+
+    def test_failed_stage_reported(self):
+        collector = StageCollector()
+        tr = self._load_xmlfile('house1')
+        tr.instrument = collector
+        el = self.xpath('//h:HeatingSystem[1]/h:HeatingSystemFuel')
+        el.text = 'wood'
+        tr.invalidate()
+        self.assertRaises(TranslationError, tr.hpxml_to_hescore)
+        stats = collector.to_dict()
+        self.assertEqual(stats['stages']['hvac']['count'], 1)
+        self.assertEqual(stats['stages']['translate']['count'], 1)
+        self.assertNotIn('dhw', stats['stages'])
+
+    def test_cli_stage_stats(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stats_filename = os.path.join(tmpdir, 'stats.json')
+            main([
+                os.path.join(exampledir, 'house1.xml'),
+                '-o', os.path.join(tmpdir, 'house1.json'),
+                '--stage-stats', stats_filename
+            ])
+            with open(stats_filename, 'r') as f:
+                stats = json.load(f)
+            self.assertEqual(stats['stages']['translate']['count'], 1)
+
+            batch_stats_filename = os.path.join(tmpdir, 'batch_stats.json')
+            main([
+                'batch', os.path.join(exampledir, 'house[12].xml'),
+                '-o', os.path.join(tmpdir, 'out'),
+                '-j', '0',
+                '--stage-stats', batch_stats_filename
+            ])
+            with open(batch_stats_filename, 'r') as f:
+                stats = json.load(f)
+            self.assertEqual(stats['stages']['translate']['count'], 2)
+            with open(os.path.join(tmpdir, 'out', 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+            for record in manifest['files']:
+                self.assertEqual(record['stage_stats']['stages']['translate']['count'], 1)
+
+
+class TestWorker(unittest.TestCase, ComparatorBase):
+
+    def _requests(self):
+        with open(os.path.join(exampledir, 'hescore_min_v3.xml'), 'r') as f:
+            hpxml = f.read()
+        return [
+            {'id': 1, 'path': os.path.join(exampledir, 'hescore_min.xml')},
+            {'id': 'two', 'hpxml': hpxml, 'validate': 'never'},
+            {'id': 3, 'path': os.path.join(exampledir, 'hescore_min.xml'), 'bldgid': 'nope'},
+            {'id': 4, 'hpxml': hpxml, 'path': 'also.xml'},
+            {'id': 5, 'hpxml': hpxml, 'validate': 'sometimes'},
+        ]
+
+    def _check_responses(self, responses):
+        self.assertEqual([x['id'] for x in responses], [1, 'two', 3, 4, 5, None])
+        self.assertEqual([x['exit_code'] for x in responses], [0, 0, 1, 1, 1, 1])
+        with open(os.path.join(exampledir, 'hescore_min.json'), 'r') as f:
+            expected = json.load(f)
+        for response in responses[:2]:
+            self._compare_item(response['hescore'], expected)
+        self.assertEqual(responses[2]['error_class'], 'ElementNotFoundError')
+        self.assertIsNone(responses[2]['hescore'])
+        for response in responses[3:]:
+            self.assertEqual(response['error_class'], 'WorkerRequestError')
+        self.assertIn('valid JSON', responses[5]['error'])
+
+    def test_stream(self):
+        infile = io.StringIO(
+            ''.join(json.dumps(request) + '\n' for request in self._requests()) + '\n{"id": 6\n'
+        )
+        outfile = io.StringIO()
+        serve_stream(infile, outfile)
+        self._check_responses([json.loads(line) for line in outfile.getvalue().splitlines()])
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix domain sockets are not available')
+    def test_socket(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            socket_path = os.path.join(tmpdir, 'worker.sock')
+            with make_socket_server(socket_path) as server:
+                server_thread = threading.Thread(target=server.serve_forever)
+                server_thread.start()
+                try:
+                    # Two connections at once
+                    clients = [socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) for _ in range(2)]
+                    for client in clients:
+                        client.connect(socket_path)
+                    for client in clients:
+                        for request in self._requests():
+                            client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+                        client.sendall(b'{"id": 6\n')
+                        client.shutdown(socket.SHUT_WR)
+                    for client in clients:
+                        with client, client.makefile('rb') as f:
+                            self._check_responses([json.loads(line) for line in f])
+                finally:
+                    server.shutdown()
+                    server_thread.join()
+
+
+class TestAsyncTranslator(unittest.TestCase, ComparatorBase):
+
+    class BlockingReader(object):
+        """File-like object that doesn't return anything until it's released"""
+
+        def __init__(self, filename):
+            with open(filename, 'rb') as f:
+                self._f = io.BytesIO(f.read())
+            self.started = threading.Event()
+            self.release = threading.Event()
+
+        def read(self, n=-1):
+            self.started.set()
+            self.release.wait()
+            return self._f.read(n)
+
+    def _expected(self, filebase):
+        with open(os.path.join(exampledir, filebase + '.json'), 'r') as f:
+            return json.load(f)
+
+    def test_same_results_and_errors(self):
+        with open(os.path.join(exampledir, 'house1.xml'), 'rb') as f:
+            house1 = f.read()
+
+        async def translate_all(translator):
+            async with translator:
+                return await asyncio.gather(
+                    translator.translate(house1),
+                    translator.translate(os.path.join(exampledir, 'house2.xml')),
+                    translator.translate(house1, hpxml_bldg_id='nope'),
+                    translator.translate(b'<HPXML'),
+                    return_exceptions=True
+                )
+
+        for processes in (False, True):
+            results = asyncio.run(translate_all(AsyncTranslator(max_workers=2, processes=processes)))
+            self._compare_item(results[0], self._expected('house1'))
+            self._compare_item(results[1], self._expected('house2'))
+            self.assertIsInstance(results[2], ElementNotFoundError)
+            self.assertIn('nope', str(results[2]))
+            self.assertIsInstance(results[3], etree.XMLSyntaxError)
+
+    def test_errors_pickle(self):
+        tr = self._load_xmlfile('house1')
+        with self.assertRaises(ElementNotFoundError) as cm:
+            tr.hpxml_to_hescore(hpxml_bldg_id='nope')
+        ex = pickle.loads(pickle.dumps(cm.exception))
+        self.assertEqual(str(ex), str(cm.exception))
+        ex = pickle.loads(pickle.dumps(InputOutOfBounds('year_built', 1000)))
+        self.assertEqual((ex.inpname, ex.value), ('year_built', 1000))
+        with self.assertRaises(jsonschema.ValidationError) as cm:
+            jsonschema.validate(1, {'type': 'string'})
+        ex = pickle.loads(pickle.dumps(picklable_error(cm.exception)))
+        self.assertIsInstance(ex, jsonschema.ValidationError)
+        self.assertEqual(str(ex), str(cm.exception))
+        self.assertEqual(list(ex.schema_path), ['type'])
+        with self.assertRaises(etree.XMLSyntaxError) as cm:
+            etree.fromstring(b'<HPXML')
+        ex = pickle.loads(pickle.dumps(picklable_error(cm.exception)))
+        self.assertIsInstance(ex, etree.XMLSyntaxError)
+        self.assertEqual(str(ex), str(cm.exception))
+        # Only copies are changed, not how lxml and jsonschema errors pickle everywhere else
+        self.assertIsNot(picklable_error(cm.exception), cm.exception)
+        for error_class in (etree.XMLSyntaxError, etree.DocumentInvalid, jsonschema.ValidationError):
+            self.assertNotIn(error_class, copyreg.dispatch_table)
+
+    def test_backpressure_and_timeout(self):
+        readers = [self.BlockingReader(os.path.join(exampledir, 'house{}.xml'.format(i))) for i in (1, 2)]
+
+        async def translate_blocked(translator):
+            first = asyncio.ensure_future(translator.translate(readers[0]))
+            second = asyncio.ensure_future(translator.translate(readers[1]))
+            await asyncio.get_running_loop().run_in_executor(None, readers[0].started.wait, 5)
+            # Only one translation at a time is handed to the pool
+            with self.assertRaises(asyncio.TimeoutError):
+                await translator.translate(readers[1], timeout=0.1)
+            self.assertFalse(readers[1].started.is_set())
+            readers[0].release.set()
+            readers[1].release.set()
+            return await asyncio.gather(first, second)
+
+        translator = AsyncTranslator(max_workers=2, max_in_flight=1)
+        try:
+            results = asyncio.run(translate_blocked(translator))
+        finally:
+            translator.close()
+        self._compare_item(results[0], self._expected('house1'))
+        self._compare_item(results[1], self._expected('house2'))
+
+    def test_cancel_running(self):
+        reader = self.BlockingReader(os.path.join(exampledir, 'house1.xml'))
+
+        async def cancel_running(translator):
+            task = asyncio.ensure_future(translator.translate(reader))
+            await asyncio.get_running_loop().run_in_executor(None, reader.started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The running translation keeps its slot until it finishes
+            next_translation = asyncio.ensure_future(
+                translator.translate(os.path.join(exampledir, 'house2.xml'))
+            )
+            await asyncio.sleep(0.1)
+            self.assertFalse(next_translation.done())
+            reader.release.set()
+            return await next_translation
+
+        translator = AsyncTranslator(max_workers=2, max_in_flight=1, timeout=10)
+        try:
+            result = asyncio.run(cancel_running(translator))
+        finally:
+            translator.close()
+        self._compare_item(result, self._expected('house2'))
+
+
+class TestSectionCache(unittest.TestCase, ComparatorBase):
+
+    def _translate(self, hpxmldoc, cache):
+        return HPXMLtoHEScoreTranslator(deepcopy(hpxmldoc), section_cache=cache).hpxml_to_hescore()
+
+    def _misses(self, cache, hpxmldoc):
+        cache.misses.clear()
+        res = self._translate(hpxmldoc, cache)
+        return res, set(section for section, n in cache.misses.items() if n)
+
+    def test_same_results(self):
+        cache = SectionCache()
+        for filebase in ('house1', 'house4', 'house3_v3', 'hescore_min_v3'):
+            hpxmldoc = etree.parse(os.path.join(exampledir, filebase + '.xml'))
+            expected = self._translate(hpxmldoc, None)
+            for i in range(2):
+                self._compare_item(self._translate(hpxmldoc, cache), expected)
+        self.assertEqual(set(cache.hits), set(HPXMLtoHEScoreTranslatorBase.SECTION_INPUTS.keys()))
+
+    def test_undated_assessment(self):
+        # The assessment date is today's when the building doesn't have one, so it isn't reused the next day
+        cache = SectionCache()
+        hpxmldoc = etree.parse(os.path.join(exampledir, 'hescore_min_v3.xml'))
+        ns = {'h': etree.QName(hpxmldoc.getroot()).namespace}
+        date_el = hpxmldoc.xpath('//h:ProjectStatus/h:Date', namespaces=ns)[0]
+        date_el.getparent().remove(date_el)
+        all_sections = set(HPXMLtoHEScoreTranslatorBase.SECTION_INPUTS.keys())
+        # The sections that read about are redone the next day too
+        next_day_misses = {'about', 'zone_floor', 'zone_roof', 'zone_wall', 'hvac'}
+        for day, expected_misses in ((2, all_sections), (2, set()), (3, next_day_misses)):
+
+            class FakeDate(dt.date):
+
+                @classmethod
+                def today(cls):
+                    return cls(2023, 1, day)
+
+            with mock.patch('hescorehpxml.base.dt', types.SimpleNamespace(date=FakeDate, datetime=dt.datetime)):
+                res, misses = self._misses(cache, hpxmldoc)
+            self.assertEqual(res['about']['assessment_date'], '2023-01-0{}'.format(day))
+            self.assertEqual(misses, expected_misses)
+
+    def test_only_changed_sections_redone(self):
+        cache = SectionCache()
+        hpxmldoc = etree.parse(os.path.join(exampledir, 'hescore_min_v3.xml'))
+        ns = {'h': etree.QName(hpxmldoc.getroot()).namespace}
+        self._translate(hpxmldoc, cache)
+        res, misses = self._misses(cache, hpxmldoc)
+        self.assertEqual(misses, set())
+
+        hpxmldoc.xpath('//h:WaterHeatingSystem/h:FuelType', namespaces=ns)[0].text = 'electricity'
+        res, misses = self._misses(cache, hpxmldoc)
+        self.assertEqual(misses, {'dhw'})
+        self.assertEqual(res['systems']['domestic_hot_water']['fuel_primary'], 'electric')
+
+        # The window areas change the walls, which the HVAC doesn't depend on, but the building's floor area changes
+        # everything after it.
+        hpxmldoc.xpath('//h:Window/h:Area', namespaces=ns)[0].text = '200'
+        res, misses = self._misses(cache, hpxmldoc)
+        self.assertEqual(misses, {'zone_wall'})
+        hpxmldoc.xpath('//h:ConditionedFloorArea', namespaces=ns)[0].text = '2000'
+        res, misses = self._misses(cache, hpxmldoc)
+        self.assertEqual(misses, {'about', 'zone_floor', 'zone_roof', 'skylights', 'zone_wall', 'hvac'})
+        self.assertEqual(res['about']['conditioned_floor_area'], 2000)
+
+    def test_results_not_shared(self):
+        cache = SectionCache()
+        hpxmldoc = etree.parse(os.path.join(exampledir, 'house1.xml'))
+        res1 = self._translate(hpxmldoc, cache)
+        res1['systems']['domestic_hot_water']['efficiency'] = 0.1
+        res2 = self._translate(hpxmldoc, cache)
+        self.assertEqual(res2['systems']['domestic_hot_water']['efficiency'], 0.8)
+
+    def test_errors_not_cached(self):
+        cache = SectionCache()
+        hpxmldoc = etree.parse(os.path.join(exampledir, 'house1.xml'))
+        ns = {'h': etree.QName(hpxmldoc.getroot()).namespace}
+        el = hpxmldoc.xpath('//h:WaterHeatingSystem/h:FuelType', namespaces=ns)[0]
+        el.getparent().remove(el)
+        for i in range(2):
+            with self.assertRaises(TranslationError):
+                self._translate(hpxmldoc, cache)
+        self.assertEqual(cache.hits['dhw'], 0)
+        self.assertEqual(cache.misses['dhw'], 2)
+
+    def test_maxsize(self):
+        cache = SectionCache(maxsize=12)
+        hpxmldoc = generate_house(2)
+        self._translate(hpxmldoc, cache)
+        self.assertEqual(len(cache), 9)
+        self._translate(generate_house(2, seed=1), cache)
+        self.assertEqual(len(cache), 12)
+        # The first house's earliest sections were dropped
+        res, misses = self._misses(cache, hpxmldoc)
+        self.assertIn('address', misses)
+        self.assertNotIn('generation', misses)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cache = ResultCache(os.path.join(self.tmpdir.name, 'results.sqlite'))
+
+    def _read(self, filebase):
+        with open(os.path.join(exampledir, filebase + '.xml'), 'rb') as f:
+            return f.read()
+
+    def test_hits_skip_translation(self):
+        filename = os.path.join(exampledir, 'house1_v3.xml')
+        expected = HPXMLtoHEScoreTranslator(filename).hpxml_to_hescore()
+        self.assertEqual(self.cache.translate(filename), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        with mock.patch('hescorehpxml.resultcache.HPXMLtoHEScoreTranslator') as translator:
+            self.assertEqual(self.cache.translate(self._read('house1_v3')), expected)
+            result = self.cache.translate_result(io.BytesIO(self._read('house1_v3')))
+            translator.assert_not_called()
+        self.assertEqual(result.building_id, 'bldg1')
+        self.assertEqual(result.hescore, expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+        # Another building id, option, or document is another translation
+        self.assertRaises(ElementNotFoundError, self.cache.translate, filename, hpxml_bldg_id='bldg2')
+        self.cache.translate(filename, validate='never')
+        self.cache.translate(self._read('house1_v3') + b'\n')
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 4))
+        self.assertEqual(len(self.cache), 4)
+        self.assertRaises(TypeError, self.cache.translate, etree.parse(filename))
+
+    def test_errors_are_cached(self):
+        hpxml = self._read('hescore_min').replace(b'</EventType>', b'</EventType><NotAnHPXMLElement/>')
+        for i in range(2):
+            with mock.patch('hescorehpxml.resultcache.HPXMLtoHEScoreTranslator', wraps=HPXMLtoHEScoreTranslator) as tr:
+                with self.assertRaises(TranslationError) as cm:
+                    self.cache.translate(hpxml)
+                self.assertEqual(tr.call_count, 1 - i)
+            self.assertIn('Failed to validate', str(cm.exception))
+        with self.assertRaises(etree.XMLSyntaxError):
+            self.cache.translate(hpxml[:-100])
+        result = self.cache.translate_result(hpxml[:-100])
+        self.assertIsInstance(result.error, etree.XMLSyntaxError)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+        # Errors that might not happen again aren't
+        with mock.patch('hescorehpxml.resultcache.HPXMLtoHEScoreTranslator', side_effect=MemoryError):
+            self.assertRaises(MemoryError, self.cache.translate, self._read('house1'))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_undated_not_cached(self):
+        hpxml = self._read('hescore_min_v3').replace(b'<Date>2014-12-02</Date>', b'')
+        for i in range(2):
+            res = self.cache.translate(hpxml)
+            self.assertEqual(res['about']['assessment_date'], dt.date.today().isoformat())
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_future_assessment_date_not_cached(self):
+        tomorrow = dt.date.today() + dt.timedelta(days=1)
+        hpxml = self._read('hescore_min_v3').replace(b'2014-12-02', tomorrow.isoformat().encode())
+        for i in range(2):
+            with self.assertRaises(InputOutOfBounds) as cm:
+                self.cache.translate(hpxml)
+            self.assertEqual(cm.exception.inpname, 'assessment_date')
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        self.assertEqual(len(self.cache), 0)
+
+        # It's fine once that day comes
+        class FakeDatetime(dt.datetime):
+
+            @classmethod
+            def today(cls):
+                return cls.combine(tomorrow, dt.time())
+
+        with mock.patch('hescorehpxml.base.dt', types.SimpleNamespace(date=dt.date, datetime=FakeDatetime)):
+            res = self.cache.translate(hpxml)
+        self.assertEqual(res['about']['assessment_date'], tomorrow.isoformat())
+        self.assertEqual(len(self.cache), 1)
+
+    def test_translator_version(self):
+        version = get_translator_version()
+        self.assertEqual(version, get_translator_version())
+        self.assertRegex(version, r'\+[0-9a-f]{16}$')
+        # The code is part of it, not just the schemas and lookup tables
+        with mock.patch('hescorehpxml.resultcache._translator_version', None), \
+                mock.patch('hescorehpxml.resultcache.TRANSLATOR_FILE_TYPES', ('.xsd', '.json', '.csv')):
+            self.assertNotEqual(get_translator_version(), version)
+
+    def test_least_recently_used_dropped(self):
+        hpxmls = [self._read(filebase) for filebase in ('house1', 'house2', 'house3')]
+        self.cache.translate(hpxmls[0])
+        with closing(sqlite3.connect(self.cache.filename)) as conn:
+            size = conn.execute('SELECT size FROM results').fetchone()[0]
+        self.cache.max_bytes = int(size * 2.5)
+        self.cache.translate(hpxmls[1])
+        self.cache.translate(hpxmls[0])
+        self.cache.translate(hpxmls[2])
+        self.assertEqual(len(self.cache), 2)
+        self.cache.misses = 0
+        self.cache.translate(hpxmls[0])
+        self.cache.translate(hpxmls[2])
+        self.assertEqual(self.cache.misses, 0)
+        self.cache.translate(hpxmls[1])
+        self.assertEqual(self.cache.misses, 1)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_batch(self):
+        hpxml_filenames = [os.path.join(exampledir, x) for x in ('house1.xml', 'house2.xml', 'house1_v3.xml')]
+        outdir = os.path.join(self.tmpdir.name, 'out')
+        manifest = batch_translate(hpxml_filenames, outdir, max_workers=0, result_cache=self.cache)
+        self.assertEqual(self.cache.misses, 3)
+        self.assertEqual(batch_translate(hpxml_filenames, outdir, max_workers=0, result_cache=self.cache), manifest)
+        self.assertEqual(self.cache.hits, 3)
+
+        # The workers in a pool each open the database
+        cache = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual((cache.filename, len(cache)), (self.cache.filename, 3))
+        outfile = io.StringIO()
+        translate_to_jsonl(hpxml_filenames, outfile, max_workers=1, result_cache=self.cache)
+        records = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual(sorted(x['building_id'] for x in records), ['bldg1', 'bldg1', 'bldg1'])
+        self.assertEqual(len(self.cache), 3)
+        main(['batch', hpxml_filenames[0], '-o', outdir, '-j', '0', '--result-cache', self.cache.filename])
+        self.assertEqual(len(self.cache), 3)
+
+
+class TestSyntheticHouses(unittest.TestCase):
+
+    def test_deterministic(self):
+        for hpxml_version in (2, 3):
+            doc = etree.tostring(generate_house(20, seed=5, hpxml_version=hpxml_version))
+            self.assertEqual(doc, etree.tostring(generate_house(20, seed=5, hpxml_version=hpxml_version)))
+            self.assertNotEqual(doc, etree.tostring(generate_house(20, seed=6, hpxml_version=hpxml_version)))
+
+    def test_translate(self):
+        for hpxml_version in (2, 3):
+            for size in (1, 4, 50):
+                hpxmldoc = generate_house(size, hpxml_version=hpxml_version)
+                ns = {'h': etree.QName(hpxmldoc.getroot()).namespace}
+                self.assertEqual(len(hpxmldoc.xpath('//h:Skylight', namespaces=ns)), size)
+                self.assertEqual(len(hpxmldoc.xpath('//h:HeatingSystem', namespaces=ns)), size)
+                translator_class = get_translator_class(HPXMLtoHEScoreTranslatorBase.detect_hpxml_version(hpxmldoc))
+                res = translator_class(hpxmldoc).hpxml_to_hescore()
+                self.assertEqual(
+                    sorted(wall['side'] for wall in res['zone']['zone_wall']),
+                    ['back', 'front', 'left', 'right']
+                )
+
+    def test_iter_houses(self):
+        docs = [etree.tostring(hpxmldoc) for hpxmldoc in iter_houses(3, size=2, seed=10)]
+        self.assertEqual(docs, [etree.tostring(generate_house(2, seed=seed)) for seed in (10, 11, 12)])
+
+    def test_bad_size(self):
+        self.assertRaises(ValueError, generate_house, 0)
+        self.assertRaises(ValueError, generate_house, 1, hpxml_version=4)
+
 
 class TestOtherHouses(unittest.TestCase, ComparatorBase):
     def test_hescore_min(self):
@@ -1625,8 +2729,8 @@ class TestHVACFractions(unittest.TestCase, ComparatorBase):
         el.text = '0.3'
         aircond.insert(-1, el)
 
-        b = self.xpath('h:Building[1]')
-        hvac_systems = tr.get_hvac(b, {"conditioned_floor_area": 3213})
+        ctx = next(tr.get_building_contexts())
+        hvac_systems = tr.get_hvac(ctx, {"conditioned_floor_area": 3213})
         hvac_systems.sort(key=lambda x: x['hvac_fraction'])
 
         hvac1 = hvac_systems[0]
@@ -1675,8 +2779,8 @@ class TestHVACFractions(unittest.TestCase, ComparatorBase):
         ducts.getparent().append(ducts2)
         tr.xpath(ducts2, 'h:SystemIdentifier').attrib['id'] = 'ducts2'
 
-        b = self.xpath('h:Building[1]')
-        hvac_systems = tr.get_hvac(b, {"conditioned_floor_area": 2600})
+        ctx = next(tr.get_building_contexts())
+        hvac_systems = tr.get_hvac(ctx, {"conditioned_floor_area": 2600})
         hvac_systems.sort(key=lambda x: x['hvac_fraction'])
 
         hvac1 = hvac_systems[0]
@@ -1721,8 +2825,8 @@ class TestHVACFractions(unittest.TestCase, ComparatorBase):
         clgsys_floor_area_el = self.xpath('//h:CoolingSystem[h:SystemIdentifier/@id="centralair"]/h:FloorAreaServed')
         clgsys_floor_area_el.text = str(total_floor_area)
 
-        b = self.xpath('h:Building[1]')
-        hvac_systems = tr.get_hvac(b, {"conditioned_floor_area": 2600})
+        ctx = next(tr.get_building_contexts())
+        hvac_systems = tr.get_hvac(ctx, {"conditioned_floor_area": 2600})
         hvac_systems.sort(key=lambda x: x['hvac_fraction'])
 
         hvac1 = hvac_systems[0]
@@ -1771,8 +2875,8 @@ class TestHVACFractions(unittest.TestCase, ComparatorBase):
         heat_pump_floor_area_el.text = str(0.3 * total_floor_area)
 
         # Get HEScore inputs and sort by fraction
-        b = self.xpath('h:Building[1]')
-        hvac_systems = tr.get_hvac(b, {"conditioned_floor_area": 2600})
+        ctx = next(tr.get_building_contexts())
+        hvac_systems = tr.get_hvac(ctx, {"conditioned_floor_area": 2600})
         hvac_systems.sort(key=lambda x: x['hvac_fraction'])
 
         hvac1 = hvac_systems[0]
@@ -1794,8 +2898,8 @@ class TestHVACFractions(unittest.TestCase, ComparatorBase):
         frac_cool_load_served = etree.Element(tr.addns('h:FractionCoolLoadServed'))
         frac_cool_load_served.text = '1.0'
         clg_sys_eff.addprevious(frac_cool_load_served)
-        b = self.xpath('h:Building[1]')
-        tr.get_hvac(b, {"conditioned_floor_area": 2400})
+        ctx = next(tr.get_building_contexts())
+        tr.get_hvac(ctx, {"conditioned_floor_area": 2400})
 
     def test_different_weighting_factors(self):
         tr = self._load_xmlfile('hescore_min')
@@ -1808,8 +2912,8 @@ class TestHVACFractions(unittest.TestCase, ComparatorBase):
         frac_cool_load_served = etree.Element(tr.addns('h:FractionCoolLoadServed'))
         frac_cool_load_served.text = '1.0'
         clg_sys_eff.addprevious(frac_cool_load_served)
-        b = self.xpath('h:Building[1]')
-        tr.get_hvac(b, {"conditioned_floor_area": 2400})
+        ctx = next(tr.get_building_contexts())
+        tr.get_hvac(ctx, {"conditioned_floor_area": 2400})
 
 
 class TestPhotovoltaics(unittest.TestCase, ComparatorBase):
@@ -3466,6 +4570,109 @@ class TestHEScoreV3(unittest.TestCase, ComparatorBase):
     def test_house9(self):
         self._do_full_compare('house9')
 
+    def test_attached_ids_match_exactly(self):
+        tr = self._load_xmlfile('house3_v3')
+        expected = tr.hpxml_to_hescore()
+        slab = self.xpath('//h:Slab')
+        slab_2 = deepcopy(slab)
+        slab.find('h:SystemIdentifier', tr.ns).set('id', 'slab10')
+        slab.find('h:PerimeterInsulation/h:SystemIdentifier', tr.ns).set('id', 'slab10perimeterins')
+        self.xpath('//h:Foundation/h:AttachedToSlab').set('idref', 'slab10')
+        slab_2.find('h:PerimeterInsulation/h:Layer/h:NominalRValue', tr.ns).text = '20'
+        slab.addnext(slab_2)
+        tr.invalidate()
+        self.assertEqual(tr.hpxml_to_hescore(), expected)
+
+        ctx = next(tr.get_building_contexts())
+        fnd = self.xpath('//h:Foundation')
+        self.assertEqual([s.element for s in tr.get_foundation_slabs(ctx.get_component(fnd), ctx)], [slab])
+        self.assertIs(ctx.id_index['slab1'][1], slab_2)
+        self.assertIs(ctx.id_index, ctx.id_index)
+        self.xpath('//h:Foundation/h:AttachedToSlab').set('idref', 'slab10perimeterins')
+        tr.invalidate()
+        ctx = next(tr.get_building_contexts())
+        self.assertRaises(ElementNotFoundError, tr.get_foundation_slabs, ctx.get_component(fnd), ctx)
+
+    def test_building_components(self):
+        tr = self._load_xmlfile('house4_v3')
+        ctx = next(tr.get_building_contexts())
+        components = ctx.components
+        self.assertIs(components, ctx.components)
+
+        def ids(kind):
+            return [c.id for c in getattr(components, kind)]
+
+        self.assertEqual(ids('attics'), ['attic1', 'attic2'])
+        self.assertEqual([c.roof_idrefs for c in components.attics], [['roof1'], ['roof2']])
+        self.assertEqual(ids('roofs'), ['roof1', 'roof2'])
+        self.assertEqual(ids('foundations'), ['fnd1', 'fnd2'])
+        self.assertEqual(ids('skylights'), ['skylights'])
+        self.assertEqual(components.skylights[0].roof_idrefs, [])
+        self.assertEqual(len(components.windows), len(self.xpath('//h:Window', aslist=True)))
+        self.assertEqual(ids('heating_systems'), ['boiler1', 'heatpump1'])
+        self.assertEqual(ids('cooling_systems'), ['centralair1', 'heatpump1'])
+        self.assertIs(components.heating_systems[1], components.cooling_systems[1])
+        self.assertEqual(ids('hvac_distributions'), ['aircondducts', 'boilerhydronic'])
+        self.assertEqual(ids('water_heating_systems'), ['dhw1'])
+        self.assertEqual(components.pv_systems, [])
+        self.assertIs(ctx.id_index['roof2'][1], components.roofs[1].element)
+
+        el = self.xpath('//h:Roof[2]/h:SystemIdentifier')
+        el.getparent().remove(el)
+        roof = BuildingContext(ctx.building, None, None, None).components.roofs[1]
+        self.assertIsNone(roof.id)
+        with self.assertRaises(ElementNotFoundError) as cm:
+            roof.get_id()
+        self.assertIn('Roof[2]/SystemIdentifier/@id', str(cm.exception))
+
+    def test_building_component_fields(self):
+        tr = self._load_xmlfile('house4_v3')
+        components = next(tr.get_building_contexts()).components
+
+        wall = components.walls[1]
+        self.assertEqual(wall.id, 'wall2front')
+        self.assertEqual((wall.wall_type, wall.exterior_adjacent_to, wall.assembly_rvalue),
+                         ('WoodStud', 'outside', None))
+        self.assertEqual([(x.nominal_rvalue, x.installation_type, x.rigid) for x in wall.layers],
+                         [('21', 'cavity', None)])
+        self.assertEqual(
+            [(x.id, x.foundation_type, x.slab_idrefs, x.frame_floor_idrefs, x.foundation_wall_idrefs)
+             for x in components.foundations],
+            [('fnd1', 'Crawlspace', [], ['crawlflr'], ['crawlwall']), ('fnd2', 'SlabOnGrade', ['slab'], [], [])]
+        )
+        self.assertEqual([(x.id, x.area) for x in components.slabs], [('slab', '600')])
+        self.assertEqual(components.attics[0].attic_type_names, ('Attic',))
+        self.assertEqual(components.roofs[0].roof_color, 'reflective')
+        window = components.windows[1]
+        self.assertEqual(
+            (window.id, window.frame_type, window.glass_layers, window.area, window.wall_idref),
+            ('frontwindows2', 'Vinyl', 'double-pane', '16', None)
+        )
+
+        heatpump = components.heating_systems[1]
+        self.assertTrue(heatpump.is_heat_pump)
+        self.assertEqual(heatpump.heat_pump_type, 'mini-split')
+        self.assertEqual([(x.units, x.value) for x in heatpump.heating_efficiencies], [('HSPF', '8.2')])
+        self.assertEqual([(x.units, x.value) for x in heatpump.cooling_efficiencies], [('SEER', '15')])
+        hvacd = components.hvac_distributions[0]
+        self.assertEqual(hvacd.duct_system_sealed, 'true')
+        duct = hvacd.air_distributions[0].ducts[0]
+        self.assertEqual((duct.location, duct.fraction_duct_area, duct.is_insulated),
+                         ('crawlspace - unvented', '1', False))
+        self.assertIsNone(hvacd.air_distributions[0].get_leakage_to_outside(None))
+
+        # A missing type is '' like name() in XPath, a missing value is None
+        el = self.xpath('//h:Wall[2]/h:WallType')
+        el.getparent().remove(el)
+        el = self.xpath('//h:Wall[2]/h:Area')
+        el.getparent().remove(el)
+        wall = next(tr.get_building_contexts()).components.walls[1]
+        self.assertEqual(wall.wall_type, '')
+        self.assertIsNone(wall.area)
+        with self.assertRaises(ElementNotFoundError) as cm:
+            wall.require('area')
+        self.assertIn('Wall[2]/Area/text()', str(cm.exception))
+
     def test_attic_with_multiple_roofs(self):
         tr = self._load_xmlfile('hescore_min_v3')
         el = self.xpath('//h:Attic/h:AttachedToRoof')